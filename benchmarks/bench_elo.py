@@ -0,0 +1,58 @@
+'''Benchmark for the ELO backends: main.calculate_elo (python) and eloarray.calculate_elo_arrays (numpy).
+Pool of 10000 debaters goes through 100 tournaments of 5 BP rounds, both backends get the same pairs.
+Run from the repository root: python benchmarks/bench_elo.py'''
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import main
+import eloarray
+
+def make_tournament(rng:random.Random, pool:list[str], no_of_teams:int, no_of_rounds:int):
+    '''Makes speaker tab and pairs of debaters for every round of one synthetic tournament.'''
+    debaters = rng.sample(pool, 2*no_of_teams)
+    speakers = {}
+    for i, name in enumerate(debaters):
+        speakers[name] = (f'team {i//2}', [rng.randint(65,85) for _ in range(no_of_rounds)], 75.0)
+    team_roster = main.build_team_roster({name: data[0] for name, data in speakers.items()})
+    rounds = []
+    for _ in range(no_of_rounds):
+        teams = list(team_roster)
+        rng.shuffle(teams)
+        debates_teams = [set(teams[i:i+4]) for i in range(0, len(teams), 4)]
+        teams_ranks = {team: i%4+1 for i, team in enumerate(teams)}
+        pairs_teams = main.generate_pairs_teams(teams_ranks, debates_teams)
+        rounds.append(main.generate_pairs_debaters(pairs_teams, {}, team_roster))
+    return speakers, main.build_speaker_deltas(speakers), rounds
+
+def run(no_of_debaters:int=10000, no_of_tournaments:int=100, no_of_teams:int=200, no_of_rounds:int=5)->None:
+    rng = random.Random(2025)
+    pool = [f'debater {i}' for i in range(no_of_debaters)]
+    tournaments = [make_tournament(rng, pool, no_of_teams, no_of_rounds) for _ in range(no_of_tournaments)]
+    start_elo = {name: (1000, 0) for name in pool}
+
+    elo_debaters = start_elo
+    start = time.perf_counter()
+    for speakers, speaker_deltas, rounds in tournaments:
+        for round_no, pairs_debaters in enumerate(rounds, start=1):
+            elo_debaters = main.calculate_elo(pairs_debaters, elo_debaters, speakers, round_no, speaker_deltas)
+    python_time = time.perf_counter()-start
+
+    start = time.perf_counter()
+    state = eloarray.EloArrays.from_dict(start_elo)
+    for speakers, speaker_deltas, rounds in tournaments:
+        for round_no, pairs_debaters in enumerate(rounds, start=1):
+            eloarray.calculate_elo_arrays(pairs_debaters, state, speaker_deltas, round_no)
+    numpy_elo = state.to_dict()
+    numpy_time = time.perf_counter()-start
+
+    max_diff = max(abs(numpy_elo[name][0]-elo_debaters[name][0]) for name in pool)
+    pairs = sum(len(pairs_debaters) for _, _, rounds in tournaments for pairs_debaters in rounds)
+    print(f'{no_of_debaters} debaters, {no_of_tournaments} tournaments, {pairs} pairs of debaters')
+    print(f'python: {python_time:8.3f} s')
+    print(f'numpy:  {numpy_time:8.3f} s ({python_time/numpy_time:.1f}x)')
+    print(f'largest rating difference between backends: {max_diff:.2e}')
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,69 @@
+'''Benchmark for pairing and rating one round of a large two team league (WSDC, three speakers per team),
+from 500 to 4000 debates in the round. Pairs are made with main.generate_pairs_teams and main.generate_pairs_debaters,
+with formats.expand_round in one pass, and as arrays of ids with eloarray.expand_pairs.
+Rating is main.elo_updates and eloarray.calculate_elo_arrays over pairs of names, and eloarray.calculate_elo_ids over pairs of ids.
+Run from the repository root: python benchmarks/bench_formats.py'''
+import os
+import random
+import sys
+import timeit
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import eloarray
+import formats
+import main
+
+def make_league(no_of_debates:int, rng:random.Random):
+    '''Returns ratings, speaker tab, team roster, ranks and debates of one round of a league of two team debates.'''
+    elo_debaters = {}
+    speakers = {}
+    debates = []
+    ranks = {}
+    for i in range(no_of_debates):
+        debate = (f'team {2*i}', f'team {2*i+1}')
+        debates.append(set(debate))
+        winner = rng.randrange(2)
+        for place, team in enumerate(debate):
+            ranks[team] = 1 if place == winner else 2
+            for j in range(3):
+                name = f'{team} speaker {j}'
+                elo_debaters[name] = (rng.uniform(900, 1600), rng.randint(0, 40))
+                speakers[name] = (team, [rng.randint(68, 80)], 74.0)
+    return elo_debaters, speakers, main.build_team_roster({name: data[0] for name, data in speakers.items()}), ranks, debates
+
+def run(sizes:tuple[int,...]=(500, 1000, 2000, 4000), repeat:int=5)->None:
+    rng = random.Random(22)
+    debate_format = formats.WSDC
+    print(f'{"debates":>8}{"pairs":>8}{"team pairs ms":>15}{"one pass ms":>13}{"arrays ms":>11}{"rate ms":>10}{"rate arrays ms":>16}{"rate ids ms":>13}')
+    for size in sizes:
+        elo_debaters, speakers, team_roster, ranks, debates = make_league(size, rng)
+        speaker_deltas = main.build_speaker_deltas(speakers)
+        round_points = formats.points_in_round(speakers, 1)
+        state = eloarray.EloArrays.from_dict(elo_debaters)
+
+        def team_pairs():
+            return main.generate_pairs_debaters(main.generate_pairs_teams(ranks, debates), {}, team_roster, debate_format, round_points)
+        def one_pass():
+            rosters = formats.team_rosters(team_roster, debate_format, round_points)
+            return formats.expand_round(formats.rank_debates(ranks, debates, debate_format), rosters, debate_format)
+        def arrays():
+            rosters = formats.team_rosters(team_roster, debate_format, round_points)
+            ranked = formats.rank_debates(ranks, debates, debate_format)
+            return eloarray.expand_pairs(*eloarray.round_arrays(ranked, rosters, state, debate_format.speakers))
+        pairs = one_pass()
+        winner_ids, loser_ids = arrays()
+        assert pairs == team_pairs() and winner_ids.tolist() == state.lookup([pair[0] for pair in pairs]).tolist()
+        deltas = eloarray.delta_array(state, speaker_deltas[0])
+        def restored(rate):
+            def run_once(): # Every run starts from the same ratings
+                ratings, debates_had = state.ratings.copy(), state.debates.copy()
+                rate()
+                state.ratings, state.debates = ratings, debates_had
+            return run_once
+        times = [min(timeit.repeat(function, number=1, repeat=repeat))*1000 for function in
+                 (team_pairs, one_pass, arrays, lambda: main.elo_updates(pairs, elo_debaters, speakers, 1, speaker_deltas),
+                  restored(lambda: eloarray.calculate_elo_arrays(pairs, state, speaker_deltas, 1)),
+                  restored(lambda: eloarray.calculate_elo_ids(winner_ids, loser_ids, state, deltas, 1)))]
+        print(f'{size:8}{len(pairs):8}' + ''.join(f'{t:{w}.2f}' for t, w in zip(times, (15, 13, 11, 10, 16, 13))))
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,40 @@
+'''Benchmark for resolving names of a speaker tab against a large rating pool with identity.NameIndex,
+compared with comparing every name with the whole pool. Pool of synthetic names (tabgen) from 10000 to 100000 debaters,
+a tab of 200 names where half have a typo and the order of name and surname swapped.
+Run from the repository root: python benchmarks/bench_identity.py'''
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import csvio
+import identity
+import tabgen
+
+def with_typo(rng:random.Random, name:str)->str:
+    first, last = name.split(' ', 1)
+    i = rng.randrange(1, len(last)-1)
+    return f'{last[:i]}{"x" if last[i] != "x" else "y"}{last[i+1:]} {first}'
+
+def run(sizes:tuple[int,...]=(10000, 30000, 100000), tab_size:int=200, linear_queries:int=3)->None:
+    rng = random.Random(21)
+    print(f'{"pool":>8}{"index s":>10}{"ms/name":>10}{"linear ms/name":>16}{"found":>8}')
+    for size in sizes:
+        names = [csvio.clean_name(name) for name in tabgen.make_pool(size, cyrillic_share=0, seed=size)]
+        start = time.perf_counter()
+        index = identity.NameIndex(names)
+        build = time.perf_counter()-start
+        originals = rng.sample(names, tab_size)
+        tab = [with_typo(rng, name) if i % 2 else name for i, name in enumerate(originals)]
+        start = time.perf_counter()
+        matched = [index.best_match(name)[0] if name not in index else name for name in tab]
+        indexed = (time.perf_counter()-start)/tab_size
+        start = time.perf_counter()
+        for name in tab[1:2*linear_queries:2]: # Only names with typos, every one compared with the whole pool
+            max(names, key=lambda other: identity.similarity(name, other))
+        linear = (time.perf_counter()-start)/linear_queries
+        found = sum(a == b for a, b in zip(matched, originals))
+        print(f'{size:8}{build:10.2f}{indexed*1000:10.3f}{linear*1000:16.1f}{found:>5}/{tab_size}')
+
+if __name__ == '__main__':
+    run()
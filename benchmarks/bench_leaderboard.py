@@ -0,0 +1,52 @@
+'''Benchmark for the leaderboard with 100000 rated debaters: building it, applying 100000 rating updates,
+and top 50, rank, percentile and range queries, compared with sorting the whole rating dict for every query.
+Run from the repository root: python benchmarks/bench_leaderboard.py'''
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import leaderboard
+
+def run(no_of_debaters:int=100000, no_of_updates:int=100000, no_of_queries:int=10000)->None:
+    rng = random.Random(13)
+    names = [f'debater_{i}' for i in range(no_of_debaters)]
+    elo_debaters = {name: (rng.uniform(800, 1800), rng.randint(0, 80)) for name in names}
+
+    start = time.perf_counter()
+    board = leaderboard.Leaderboard(elo_debaters)
+    build_time = time.perf_counter()-start
+
+    start = time.perf_counter()
+    for _ in range(no_of_updates):
+        name = rng.choice(names)
+        elo, debates = elo_debaters[name]
+        elo_debaters[name] = (elo+rng.uniform(-20, 20), debates+1)
+        board.update(name, *elo_debaters[name])
+    update_time = (time.perf_counter()-start)/no_of_updates
+
+    queried = rng.sample(names, no_of_queries)
+    start = time.perf_counter()
+    for name in queried:
+        board.top(50)
+        board.rank(name)
+        board.percentile(name)
+        board.between(1300, 1310)
+    query_time = (time.perf_counter()-start)/no_of_queries
+
+    start = time.perf_counter()
+    for name in queried[:20]:
+        ranked = sorted(elo_debaters, key=lambda n: (-elo_debaters[n][0], n))
+        ranked[:50]
+        ranked.index(name)
+    sort_time = (time.perf_counter()-start)/20
+    assert [entry[0] for entry in board.top(50)] == ranked[:50]
+
+    print(f'{no_of_debaters} debaters')
+    print(f'build:                        {build_time*1000:8.1f} ms')
+    print(f'update:                       {update_time*1e6:8.1f} us')
+    print(f'top 50 + rank + pct + range:  {query_time*1e6:8.1f} us')
+    print(f'sorting the dict per query:   {sort_time*1000:8.1f} ms')
+
+if __name__ == '__main__':
+    run()
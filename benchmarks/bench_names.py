@@ -0,0 +1,45 @@
+'''Benchmark for loading a historical rating file: csvio.load_debater_elo with 20000 rows,
+compared with just reading the file, with cold and warm clean_name cache.
+Run from the repository root: python benchmarks/bench_names.py'''
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import csvio
+
+FIRST = ['Никола', 'Marko', 'Đorđe', 'Ана', 'Jelena', 'Milica', 'Čedomir', 'Šejla', 'Luka', 'Sara']
+LAST = ['Николић', 'Marković', 'Žižić', 'Анић', 'Jović', 'Ćirić', 'Petrović', 'Đurić', 'Lukić', 'Sarić']
+
+def run(no_of_rows:int=20000)->None:
+    rng = random.Random(8)
+    with tempfile.TemporaryDirectory() as tmp:
+        file_name = os.path.join(tmp, 'elo.csv')
+        with open(file_name, 'w', newline='\n', encoding='utf-8') as f:
+            writer = csv.writer(f, delimiter=' ')
+            for i in range(no_of_rows):
+                writer.writerow([f'{rng.choice(FIRST)}_{rng.choice(LAST)}_{i}', rng.uniform(800, 1800), rng.randint(0, 80)])
+
+        start = time.perf_counter()
+        with open(file_name, newline='\n', encoding='utf-8') as f:
+            rows = sum(1 for _ in csv.reader(f, delimiter=' '))
+        read_time = time.perf_counter()-start
+
+        csvio.clean_name.cache_clear()
+        start = time.perf_counter()
+        csvio.load_debater_elo(file_name)
+        cold_time = time.perf_counter()-start
+        start = time.perf_counter()
+        csvio.load_debater_elo(file_name)
+        warm_time = time.perf_counter()-start
+
+    print(f'{rows} rows')
+    print(f'reading only:          {read_time*1000:8.1f} ms')
+    print(f'load, cold name cache: {cold_time*1000:8.1f} ms')
+    print(f'load, warm name cache: {warm_time*1000:8.1f} ms')
+    print(csvio.clean_name.cache_info())
+
+if __name__ == '__main__':
+    run()
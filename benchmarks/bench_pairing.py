@@ -0,0 +1,32 @@
+'''Benchmark for generate_pairs_debaters.
+Number of team pairs is fixed, while the speaker tab grows, so the time per round should stay flat.
+Run from the repository root: python benchmarks/bench_pairing.py'''
+import os
+import sys
+import timeit
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import main
+
+NO_OF_PAIRS = 6*75 # One round of a 300 team BP tournament (75 rooms, 6 pairs of teams per room)
+
+def make_speakers(no_of_teams:int)->dict[str,str]:
+    '''Makes a speaker tab with two speakers per team.'''
+    speakers_teams = {}
+    for i in range(no_of_teams):
+        speakers_teams[f'speaker {i} a'] = f'team {i}'
+        speakers_teams[f'speaker {i} b'] = f'team {i}'
+    return speakers_teams
+
+def run(sizes:tuple[int,...]=(300,3000,30000,300000), repeat:int=5)->None:
+    pairs_teams = [(f'team {i}', f'team {i+1}') for i in range(0, 2*NO_OF_PAIRS, 2)]
+    print(f'{"speakers":>10} {"roster (ms)":>12} {"round (ms)":>12}')
+    for no_of_teams in sizes:
+        speakers_teams = make_speakers(no_of_teams)
+        roster_time = min(timeit.repeat(lambda: main.build_team_roster(speakers_teams), number=1, repeat=repeat))
+        team_roster = main.build_team_roster(speakers_teams)
+        round_time = min(timeit.repeat(lambda: main.generate_pairs_debaters(pairs_teams, speakers_teams, team_roster),
+                                       number=1, repeat=repeat))
+        print(f'{len(speakers_teams):>10} {roster_time*1000:>12.3f} {round_time*1000:>12.3f}')
+
+if __name__ == '__main__':
+    run()
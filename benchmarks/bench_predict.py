@@ -0,0 +1,53 @@
+'''Benchmark for predicting placements of every room of a BP draw with predict.forecast_draw,
+from 200 to 2000 teams, compared with Plackett-Luce calculated room by room and order by order in Python.
+Run from the repository root: python benchmarks/bench_predict.py'''
+import itertools
+import os
+import random
+import sys
+import timeit
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import predict
+
+def make_draw(no_of_teams:int, rng:random.Random):
+    '''Returns ratings, team roster and rooms of a BP draw of teams of two rated debaters.'''
+    elo_debaters = {}
+    team_roster = {}
+    for i in range(no_of_teams):
+        team_roster[f'team {i}'] = [f'team {i} speaker {j}' for j in range(2)]
+        for name in team_roster[f'team {i}']:
+            elo_debaters[name] = (rng.uniform(900, 1700), rng.randint(0, 60))
+    teams = list(team_roster)
+    rng.shuffle(teams)
+    return elo_debaters, team_roster, [set(teams[i:i+4]) for i in range(0, no_of_teams, 4)]
+
+def room_by_room(debates_teams, team_roster, elo_debaters, rating_scale:float=400):
+    '''Same placements as predict.forecast_draw, one order of one room at a time.'''
+    forecasts = []
+    for debate in debates_teams:
+        teams = sorted(debate)
+        weights = [10 ** (predict.team_strength(team_roster[team], elo_debaters) / rating_scale) for team in teams]
+        placements = [[0.0]*len(teams) for _ in teams]
+        for order in itertools.permutations(range(len(teams))):
+            probability = 1.0
+            for place, team in enumerate(order):
+                probability *= weights[team] / sum(weights[other] for other in order[place:])
+            for place, team in enumerate(order):
+                placements[team][place] += probability
+        forecasts.append(placements)
+    return forecasts
+
+def run(sizes:tuple[int,...]=(200, 500, 1000, 2000), repeat:int=5)->None:
+    rng = random.Random(25)
+    print(f'{"teams":>8}{"rooms":>8}{"forecast ms":>13}{"python ms":>11}')
+    for size in sizes:
+        elo_debaters, team_roster, debates = make_draw(size, rng)
+        forecasts = predict.forecast_draw(debates, team_roster, elo_debaters)
+        expected = room_by_room(debates, team_roster, elo_debaters)
+        assert all(abs(a-b) < 1e-9 for forecast, room in zip(forecasts, expected) for a, b in zip(forecast.placements.ravel(), sum(room, [])))
+        times = [min(timeit.repeat(function, number=1, repeat=repeat))*1000 for function in
+                 (lambda: predict.forecast_draw(debates, team_roster, elo_debaters), lambda: room_by_room(debates, team_roster, elo_debaters))]
+        print(f'{size:8}{len(debates):8}{times[0]:13.2f}{times[1]:11.2f}')
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,72 @@
+'''Benchmark for memory of large pools: ratings and speaker points in dictionaries and lists
+compared with registry.DebaterRegistry and registry.PointsTable, at 100000 debaters with points for 50 rounds.
+Also compares peak memory of rating 50 rounds (1000 pairs each) with main.calculate_elo, which copies the ratings
+every round, and with main.elo_updates applied in place.
+Memory is measured with tracemalloc, so times are slower than without it.
+Run from the repository root: python benchmarks/bench_registry.py [debaters] [rounds]'''
+import os
+import random
+import sys
+import time
+import tracemalloc
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import main
+import registry
+
+def traced(function):
+    '''Returns the result of the function, memory it still holds after returning and its peak, in bytes.'''
+    tracemalloc.start()
+    result = function()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+def run(no_of_debaters:int=100000, no_of_rounds:int=50, pairs_per_round:int=1000)->None:
+    rng = random.Random(19)
+    names = [f'debater {i}' for i in range(no_of_debaters)]
+    ratings = [(rng.uniform(800, 1800), rng.randint(0, 80)) for _ in names]
+    points = [[rng.randint(60, 85) for _ in range(no_of_rounds)] for _ in names]
+    rounds = [[tuple(rng.sample(names, 2)) for _ in range(pairs_per_round)] for _ in range(no_of_rounds)]
+
+    def dict_tables():
+        elo_debaters = dict(zip(names, ratings))
+        speakers = {name: (f'team {i//2}', list(row), 75.0) for i, (name, row) in enumerate(zip(names, points))}
+        return elo_debaters, speakers, main.build_speaker_deltas(speakers)
+    def packed_tables():
+        elo_debaters = registry.DebaterRegistry()
+        table = registry.PointsTable(no_of_rounds)
+        for i, (name, elo, row) in enumerate(zip(names, ratings, points)):
+            elo_debaters[name] = elo
+            table.add(name, f'team {i//2}', row, 75.0)
+        return elo_debaters, table, table.deltas()
+    (elo_dict, speakers, deltas), dict_size, dict_peak = traced(dict_tables)
+    (elo_packed, table, packed_deltas), packed_size, packed_peak = traced(packed_tables)
+    print(f'{no_of_debaters} debaters, {no_of_rounds} rounds')
+    print(f'dictionaries: {dict_size/2**20:8.1f} MB held, {dict_peak/2**20:8.1f} MB peak')
+    print(f'packed:       {packed_size/2**20:8.1f} MB held, {packed_peak/2**20:8.1f} MB peak ({dict_size/packed_size:.1f}x less held)')
+
+    def rate(step):
+        def run_rounds():
+            elo_debaters = elo_dict
+            for round_no, pairs in enumerate(rounds, start=1):
+                elo_debaters = step(pairs, elo_debaters, round_no)
+            return elo_debaters
+        start = time.perf_counter()
+        result, _, peak = traced(run_rounds)
+        return result, peak, time.perf_counter()-start
+    def shallow_copy(pairs, elo_debaters, round_no):
+        return main.calculate_elo(pairs, elo_debaters, speakers, round_no, deltas)
+    def in_place(pairs, elo_debaters, round_no):
+        elo_packed.update(main.elo_updates(pairs, elo_packed, table, round_no, packed_deltas))
+        return elo_packed
+    print(f'rating {no_of_rounds} rounds of {pairs_per_round} pairs (peak above the tables):')
+    expected = None
+    for label, step in (('calculate_elo', shallow_copy), ('elo_updates in place', in_place)):
+        result, peak, seconds = rate(step)
+        if expected is None:
+            expected = result
+        same = all(abs(result[name][0]-expected[name][0]) < 1e-9 for name in names)
+        print(f'{label:22}{peak/2**20:8.1f} MB {seconds:8.2f} s  same ratings: {same}')
+
+if __name__ == '__main__':
+    run(*(int(arg) for arg in sys.argv[1:]))
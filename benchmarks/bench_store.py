@@ -0,0 +1,51 @@
+'''Benchmark for the rating store compared with elo.csv, at 100000 debaters.
+Measures loading, writing all ratings, and saving a tournament where 1000 debaters changed
+(CSV rewrites the whole file and the archival copy, the store writes only the changes).
+Run from the repository root: python benchmarks/bench_store.py'''
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import csvio
+import ratingstore
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter()-start
+
+def run(no_of_debaters:int=100000, no_of_changed:int=1000)->None:
+    rng = random.Random(10)
+    elo_debaters = {f'debater_{i}': (rng.uniform(800, 1800), rng.randint(0, 80)) for i in range(no_of_debaters)}
+    changed = dict(elo_debaters)
+    for name in rng.sample(list(elo_debaters), no_of_changed):
+        changed[name] = (changed[name][0]+10, changed[name][1]+1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = os.path.join(tmp, 'elo.csv')
+        _, csv_write = timed(csvio.export_debater_elo, elo_debaters, csv_file)
+        _, csv_load = timed(csvio.load_debater_elo, csv_file)
+        start = time.perf_counter()
+        csvio.export_debater_elo(changed, csv_file)
+        csv_file_size = os.path.getsize(csv_file)
+        csvio.export_debater_elo(changed, os.path.join(tmp, 'new_elo_file_1.csv'))
+        csv_tournament = time.perf_counter()-start
+
+        store = ratingstore.RatingStore(os.path.join(tmp, 'elo.db'))
+        _, store_write = timed(store.save, elo_debaters)
+        _, store_load = timed(store.load)
+        _, store_tournament = timed(store.save, changed, 'tournament')
+        store.close()
+        store_size = os.path.getsize(os.path.join(tmp, 'elo.db'))
+
+    print(f'{no_of_debaters} debaters, {no_of_changed} changed by the tournament')
+    print(f'{"":22}{"csv":>10}{"store":>10}')
+    print(f'{"load (ms)":22}{csv_load*1000:10.1f}{store_load*1000:10.1f}')
+    print(f'{"write all (ms)":22}{csv_write*1000:10.1f}{store_write*1000:10.1f}')
+    print(f'{"save tournament (ms)":22}{csv_tournament*1000:10.1f}{store_tournament*1000:10.1f}')
+    print(f'{"size (kB)":22}{2*csv_file_size/1024:10.0f}{store_size/1024:10.0f}')
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,138 @@
+'''Benchmark harness over synthetic tournaments (tabgen), runs offline.
+For every size a tournament is written to a temporary directory and every stage of rating it is measured:
+generate (writing the tab), parse (csvio loaders), pairs (generate_pairs_teams and generate_pairs_debaters),
+elo (calculate_elo) and export (export_debater_elo of the whole rating pool).
+Time is the best of --repeats runs, peak memory is measured in a separate run under tracemalloc.
+Results are compared with benchmarks/baselines.json, and a stage is reported as a regression if it is slower
+than --tolerance times its baseline, or takes 25% more memory. Baselines depend on the machine, save your own
+with --save before comparing changes.
+Run from the repository root:
+python benchmarks/run_benchmarks.py                     compare with the baselines
+python benchmarks/run_benchmarks.py --save              store the results as the new baselines
+python benchmarks/run_benchmarks.py --sizes small --check   exit with status 1 if anything regressed'''
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import csvio
+import main
+import tabgen
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+SIZES = { # teams on the tab, inrounds, debaters rated before the tournament
+    'small': (32, 5, 1000),
+    'medium': (256, 5, 10000),
+    'large': (1024, 7, 50000),
+}
+MEMORY_TOLERANCE = 1.25
+
+def measure(function, repeats:int)->tuple[float,int,object]:
+    '''Returns best time of repeats runs in seconds, peak memory of one more run in bytes, and the result of the function.'''
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter()-start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+def run_size(no_of_teams:int, no_of_rounds:int, pool_size:int, repeats:int)->dict[str,dict]:
+    '''Measures all stages for one tournament size, returns {stage: {seconds, peak_kb, items, per_second}}.'''
+    results = {}
+    def record(stage, function, items_of):
+        seconds, peak, result = measure(function, repeats)
+        items = items_of(result)
+        results[stage] = {'seconds': seconds, 'peak_kb': peak//1024, 'items': items, 'per_second': items/seconds if seconds else 0}
+        return result
+
+    pool = tabgen.make_pool(max(pool_size, 2*no_of_teams))
+    elo_debaters = {csvio.clean_name(name): (1000+i%700, i%40) for i, name in enumerate(pool)}
+    with tempfile.TemporaryDirectory() as tab_dir:
+        record('generate', lambda: tabgen.generate_tournament(tab_dir, no_of_teams, no_of_rounds, pool=pool),
+               lambda info: info['debaters'])
+
+        def parse():
+            tab = csvio.load_speaker_tab(os.path.join(tab_dir, 'speakers.csv'), no_of_rounds)
+            rounds = [(csvio.load_team_ranks(os.path.join(tab_dir, f'teams_ranks_round_{i}.csv')),
+                       csvio.load_debates(os.path.join(tab_dir, f'teams_debates_round_{i}.csv'))) for i in range(1, no_of_rounds+1)]
+            return tab, rounds
+        tab, rounds = record('parse', parse, lambda result: len(result[0].names) + sum(len(ranks) for ranks, _ in result[1]))
+
+    tab.add_to_elo(elo_debaters)
+    speakers_teams = tab.speaker_teams()
+    speaker_pts = tab.speaker_points()
+    speaker_deltas = main.build_speaker_deltas(speaker_pts)
+
+    def pairs():
+        roster = main.build_team_roster(speakers_teams)
+        return [main.generate_pairs_debaters(main.generate_pairs_teams(ranks, debates), speakers_teams, roster) for ranks, debates in rounds]
+    pairs_by_round = record('pairs', pairs, lambda result: sum(len(p) for p in result))
+
+    def elo():
+        ratings = elo_debaters
+        for round_no, pairs_debaters in enumerate(pairs_by_round, start=1):
+            ratings = main.calculate_elo(pairs_debaters, ratings, speaker_pts, round_no, speaker_deltas)
+        return ratings
+    ratings = record('elo', elo, lambda _: sum(len(p) for p in pairs_by_round))
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        record('export', lambda: csvio.export_debater_elo(ratings, os.path.join(out_dir, 'elo.csv')), lambda _: len(ratings))
+    return results
+
+def compare(results:dict, baselines:dict, tolerance:float)->list[str]:
+    '''Returns descriptions of stages that are slower or take more memory than their baselines allow.'''
+    regressions = []
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            baseline = baselines.get(size, {}).get(stage)
+            if baseline is None:
+                continue
+            if result['seconds'] > tolerance*baseline['seconds']:
+                regressions.append(f'{size}/{stage}: {result["seconds"]*1000:.1f} ms, baseline {baseline["seconds"]*1000:.1f} ms')
+            if result['peak_kb'] > MEMORY_TOLERANCE*baseline['peak_kb'] + 64: # Small stages vary by a few kB
+                regressions.append(f'{size}/{stage}: peak {result["peak_kb"]} kB, baseline {baseline["peak_kb"]} kB')
+    return regressions
+
+def print_results(results:dict, baselines:dict)->None:
+    print(f'{"":16}{"ms":>10}{"items/s":>12}{"peak kB":>10}{"vs baseline":>13}')
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            baseline = baselines.get(size, {}).get(stage)
+            ratio = f'{result["seconds"]/baseline["seconds"]:.2f}x' if baseline and baseline['seconds'] else '-'
+            print(f'{size+"/"+stage:16}{result["seconds"]*1000:10.1f}{result["per_second"]:12.0f}{result["peak_kb"]:10}{ratio:>13}')
+
+def run(argv:list[str]=None)->int:
+    parser = argparse.ArgumentParser(description='Benchmarks of rating a tournament, on synthetic tabs.')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=1.5, help='slowdown against the baseline reported as a regression')
+    parser.add_argument('--baselines', default=BASELINES)
+    parser.add_argument('--save', action='store_true', help='store the results as the new baselines')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 if anything regressed')
+    args = parser.parse_args(argv)
+    try:
+        with open(args.baselines, encoding='utf-8') as f:
+            baselines = json.load(f)
+    except FileNotFoundError:
+        baselines = {}
+    results = {size: run_size(*SIZES[size], args.repeats) for size in args.sizes}
+    print_results(results, baselines)
+    regressions = compare(results, baselines, args.tolerance)
+    for regression in regressions:
+        print('REGRESSION', regression)
+    if args.save:
+        baselines.update({size: {stage: {'seconds': round(r['seconds'], 6), 'peak_kb': r['peak_kb']} for stage, r in stages.items()}
+                          for size, stages in results.items()})
+        with open(args.baselines, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=1)
+    return 1 if args.check and regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(run())
@@ -1,6 +1,18 @@
 import csv # Za obradu CSV datoteka
 import cyrtranslit # Za transliteraciju ćirilice u latinicu za potrebe namena
 import re # Za obradu namena tj. uklanjanje suvišnih reči
+import functools # Za pamćenje već očišćenih imena
+from typing import Iterator, NamedTuple
+
+NAME_CACHE_SIZE = 1 << 16 # Number of distinct names clean_name remembers
+DIACRITICS = str.maketrans({'č':'c', 'š':'s', 'ž':'z', 'ć':'c', 'đ':'d'})
+MIDDLE_PARTS = re.compile(r' .+? ')
+ORDINAL = re.compile(r'(\d+)(?:st|nd|rd|th)')
+ROUND_COLUMN = re.compile(r'(?:r|round ?)?\d+') # R1, Round 1 or just 1
+RESULTS_WON_LOST = {'won': 1, 'win': 1, 'lost': 2, 'loss': 2, # Results of the two team formats
+                    'advancing': 1, 'advanced': 1, 'advances': 1, 'eliminated': 2} # and of BP outrounds
+SIDE_COLUMNS = {'og', 'oo', 'cg', 'co', 'gov', 'opp', 'prop', 'aff', 'neg',
+                'government', 'opposition', 'proposition', 'affirmative', 'negative'}
 
 
 def load_debater_elo(file_name:str,alt_mod:bool=False)->dict[str,(float,int)]:
@@ -26,8 +38,11 @@ def load_debater_elo(file_name:str,alt_mod:bool=False)->dict[str,(float,int)]:
         pass # If no file exists, simply return empty dictionary of "already existing" debaters
     return elo_debaters
 
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
 def clean_name(name:str)->str:
     '''Function cleans names so Nikola Nikolić, Nikola nikolic and Никола Николић are the same person.
+    Results are remembered (up to NAME_CACHE_SIZE names), since the same names are cleaned by every loader,
+    clean_name.cache_info() shows hits and misses.
     Inputs: 
     name: full name exactly as it appears on speaker tab
     Outputs:
@@ -35,97 +50,55 @@ def clean_name(name:str)->str:
     name = name.lower()
     name = name.strip() # Remove empty spaces at the start and end of string
     name = cyrtranslit.to_latin(name, 'sr') # Cyrilic to latin
-    name = name.replace('č', 'c')
-    name = name.replace('š', 's')
-    name = name.replace('ž', 'z')
-    name = name.replace('ć', 'c')
-    name = name.replace('đ', 'd')
-    name = re.sub(r' .+? ', ' ', name) # Remove everything between first and last string
+    name = name.translate(DIACRITICS) # č, š, ž, ć, đ to c, s, z, c, d in one pass
+    name = MIDDLE_PARTS.sub(' ', name) # Remove everything between first and last string
     return name
 
-def load_teams_participants(file_name:str,speaker_csv_mode:bool=False,ignore_1:bool=True,no_of_rounds:int=5)->dict[str,str]:
+def load_teams_participants(file_name:str,speaker_csv_mode:bool=False,ignore_1:bool=True,no_of_rounds:int=None)->dict[str,str]:
     '''Function loads names of debaters from CSV files and returns their names and teams. If the file doesn't exist, empty dictionary is returned.
     Inputs:
     file_name: name of the file from which teams will be loaded
-    speaker_csv_mode: toggle True if the data is being loaded from exported speaker tab
-    ignore_1: toggle True to ignore first row (headers), toggle False if your file is just data and no headers
+    speaker_csv_mode: not needed anymore, team column is found from the header, kept so old calls keep working
+    ignore_1: toggle True if the first row is the header, toggle False if your file is just data and no headers
     no_of_rounds: number of the in-round in the tournament
     Output:
     dictionary whose keys are names of the debaters, and values are team names for the debater'''
-    speakers_teams = {}
-    first_row = True
     try:
-        with open(file_name, newline='\n', encoding='utf-8') as csvdat:
-            reader = csv.reader(csvdat, delimiter='\t')
-            # Tab is the delimeter because that's default Tabbycat CSV format
-            for row in reader:
-                if len(row) == no_of_rounds+6:
-                    speaker_csv_mode=True
-                if ignore_1==False or first_row==False:
-                    if speaker_csv_mode:
-                        name_debater = clean_name(row[1])
-                        speakers_teams[name_debater]=row[2]
-                    else:
-                        name_debater = clean_name(row[1])
-                        speakers_teams[name_debater]=row[3]
-                first_row=False
-        return speakers_teams
+        return {row.name: row.team for row in iter_speakers(file_name,no_of_rounds,ignore_1)}
     except FileNotFoundError:
-        return speakers_teams
+        return {}
+
 def load_team_ranks(file_name:str,ignore_1:bool=True,alt_instit:bool=False)->dict[str,int]:
     '''Load names of the teams and their ranks (without data abut their debates)
     Inputs:
     file_name: name of the file from which the data is being loaded
-    ignore_1: toggle true if the first row of your file is columns, false if it's just data
-    alt_instit: toggle true if the names of the institutions are not included in the export.
+    ignore_1: toggle true if the first row of your file is the header, false if it's just data
+    alt_instit: only for files without the header, toggle true if the names of the institutions are not included in the export
     Outputs:
     dictionary whose keys are team names and values are places in the debate'''
-    teams_positions = {}
-    first_row = True
-    location = 2
-    if alt_instit:
-        location = 1
-    with open(file_name, newline='\n',encoding='utf-8') as csvdat:
-        reader = csv.reader(csvdat, delimiter='\t')
-        for row in reader:
-            if ignore_1==False or first_row==False:
-                teams_positions[row[0]]=convert_rank(row[location])
-            first_row=False
-    return teams_positions
+    return {row.team: row.rank for row in iter_team_ranks(file_name,ignore_1,alt_instit)}
 
 def convert_rank(rank:str)->int:
-    ''' Converts ranks into numbers. e.g. 1st into 1'''
-    if rank == '1st':
-        return 1
-    elif rank == '2nd':
-        return 2
-    elif rank == '3rd':
-        return 3
-    elif rank == '4th':
-        return 4 
+    ''' Converts ranks into numbers, e.g. 1st into 1 and 12th into 12. Won and lost (two team formats) are 1 and 2,
+    so are advancing and eliminated (BP outrounds).
+    Throws ValueError for anything else.'''
+    rank = rank.strip().lower()
+    match = ORDINAL.fullmatch(rank)
+    if match:
+        return int(match.group(1))
+    if rank in RESULTS_WON_LOST:
+        return RESULTS_WON_LOST[rank]
+    raise ValueError(f'Unknown rank {rank!r}')
     
 def load_debates(file_name:str,ignore_1:bool=True)->list[set[str]]:
     '''Function loads debates from a CSV file, but not the ranking of teams within the debates.
     Inputs:
     file_name: name of the CSV file, including the .CSV extension
-    ignore_1: boolean that signifies whether first row is data or headers
+    ignore_1: boolean that signifies whether first row is the header or data
     Outputs:
     list of sets where each sets contains all the teams within single debate,
     e.g. [(teamA,teamB,teamC,teamD),(teamE,teamF,teamG,teamH)...]'''
-    debate_teams = []
-    first_row=True
-    with open(file_name, newline='\n', encoding='utf-8') as csvdat:
-        reader = csv.reader(csvdat, delimiter='\t')
-        for row in reader:
-            if first_row==False or ignore_1==False:
-                myset = set()
-                myset.add(row[1])
-                myset.add(row[2])
-                myset.add(row[3])
-                myset.add(row[4])
-                debate_teams.append(myset)
-            first_row=False
-    return debate_teams
+    return [set(debate.teams) for debate in iter_debates(file_name,ignore_1)]
 
 def export_debater_elo(debater_elo:dict[str,(float,int)], file_name:str)->None:
     '''Function writes ELO ratings to a file.
@@ -142,37 +115,188 @@ def export_debater_elo(debater_elo:dict[str,(float,int)], file_name:str)->None:
         for name, elo in debater_elo.items():
             writer.writerow([name, elo[0], elo[1]])  # Upisujemo name, ELO rejting i broj debata
 
-def uvezi_spikere(file_name:str,no_of_rounds:int=5,ignore_1:bool=True)->dict[str, (str, list[int],float)]:
+
+class TabbycatSchemaError(ValueError):
+    '''Thrown when a Tabbycat CSV file doesn't have the columns it should, or a row doesn't fit its header.'''
+
+class SpeakerRow(NamedTuple):
+    '''One debater from the speaker tab.'''
+    name: str # Sanitized name
+    institution: str # Empty if the tab doesn't show institutions
+    team: str # Team name (unsanitized)
+    points: list[int] # Speaker points by rounds, 0 for rounds without points
+    average: float
+
+class TeamRank(NamedTuple):
+    '''Place of a team in its debate in one round.'''
+    team: str
+    rank: int
+
+class Debate(NamedTuple):
+    '''Teams of one debate in one round, in the order of their sides.'''
+    teams: tuple[str, ...]
+
+def read_tab(file_name:str,ignore_1:bool=True)->Iterator[tuple[list[str],list[str]]]:
+    '''Generator over rows of a tab separated Tabbycat CSV file, reading one row at a time.
+    Yields tuples (header, row) where header is the first row in lower case and without surrounding spaces,
+    or None if ignore_1 is False (file is just data). Empty rows are skipped.'''
+    with open(file_name, newline='\n', encoding='utf-8') as csvdat:
+        reader = csv.reader(csvdat, delimiter='\t') # Tab is the delimeter because that's default Tabbycat CSV format
+        header = None
+        if ignore_1:
+            header = [title.strip().lower() for title in next(reader, [])]
+        for row in reader:
+            if row:
+                yield header, row
+
+def find_column(header:list[str],titles:set[str],file_name:str,required:bool=True)->int:
+    '''Returns index of the first column whose title is one of titles, or None if there is none and it isn't required.
+    Throws TabbycatSchemaError if a required column is missing.'''
+    for i, title in enumerate(header):
+        if title in titles:
+            return i
+    if required:
+        raise TabbycatSchemaError(f'{file_name}: no column named {" or ".join(sorted(titles))} in the header {header}')
+    return None
+
+def check_row(row:list[str],width:int,file_name:str)->None:
+    '''Throws TabbycatSchemaError if the row is too short to have all the columns that are read.'''
+    if len(row) < width:
+        raise TabbycatSchemaError(f'{file_name}: row {row} has {len(row)} columns, at least {width} are needed')
+
+def iter_speakers(file_name:str,no_of_rounds:int=None,ignore_1:bool=True)->Iterator[SpeakerRow]:
+    '''Generator over debaters of the speaker tab, columns are found from the header.
+    Round columns are R1, R2... (or Round 1, 1...), the first no_of_rounds of them are read, all of them if it's None.
+    Points which aren't numbers (debater didn't speak) are read as 0. If there is no Avg column, average is made
+    from the rounds with points. Files without the header must have columns
+    rank, name, institution, team, points of every round (5 if no_of_rounds is None) and average.
+    Throws TabbycatSchemaError if the name, team or enough round columns are missing.'''
+    columns = None
+    for header, row in read_tab(file_name,ignore_1):
+        if columns is None: # Columns are found once, from the first row
+            if header is None:
+                rounds = list(range(4, 4+(no_of_rounds if no_of_rounds is not None else 5)))
+                columns = (1, 2, 3, rounds, 4+len(rounds), 2)
+            else:
+                rounds = [i for i, title in enumerate(header) if ROUND_COLUMN.fullmatch(title)]
+                if no_of_rounds is not None:
+                    if len(rounds) < no_of_rounds:
+                        raise TabbycatSchemaError(f'{file_name}: {no_of_rounds} rounds expected, header {header} has {len(rounds)}')
+                    rounds = rounds[:no_of_rounds]
+                name = find_column(header, {'name', 'speaker'}, file_name)
+                team = find_column(header, {'team'}, file_name)
+                institution = find_column(header, {'institution', 'inst'}, file_name, required=False)
+                average = find_column(header, {'avg', 'average'}, file_name, required=False)
+                columns = (name, institution, team, rounds, average, max([name, team]+rounds)+1)
+        name, institution, team, rounds, average, width = columns
+        check_row(row, width, file_name)
+        points = []
+        for i in rounds:
+            try:
+                points.append(int(row[i]))
+            except (ValueError, IndexError):
+                points.append(0)
+        try:
+            avg = float(row[average])
+        except (TypeError, ValueError, IndexError): # No average column, or it's empty
+            spoken = [p for p in points if p]
+            avg = sum(spoken)/len(spoken) if spoken else 0.0
+        yield SpeakerRow(clean_name(row[name]), row[institution] if institution is not None and institution < len(row) else '',
+                         row[team] if team < len(row) else '', points, avg) # Team is missing only in files without the header
+
+def iter_team_ranks(file_name:str,ignore_1:bool=True,alt_instit:bool=False)->Iterator[TeamRank]:
+    '''Generator over teams and their places from the team results of one round (Team and Result columns).
+    Files without the header have the team in the first column and the result in the third,
+    or in the second if alt_instit is True. Throws TabbycatSchemaError if a column is missing
+    and ValueError if a result isn't a place (see convert_rank).'''
+    columns = None
+    for header, row in read_tab(file_name,ignore_1):
+        if columns is None:
+            if header is None:
+                columns = (0, 1 if alt_instit else 2)
+            else:
+                columns = (find_column(header, {'team'}, file_name), find_column(header, {'result', 'place', 'rank'}, file_name))
+        team, result = columns
+        check_row(row, max(columns)+1, file_name)
+        yield TeamRank(row[team], convert_rank(row[result]))
+
+def iter_debates(file_name:str,ignore_1:bool=True)->Iterator[Debate]:
+    '''Generator over debates of one round, teams are read from the side columns (OG, OO, CG, CO, Gov, Opp, Aff, Neg...).
+    Files without the header have the venue in the first column and four teams after it.
+    Empty side cells are skipped. Throws TabbycatSchemaError if there are no side columns.'''
+    sides = None
+    for header, row in read_tab(file_name,ignore_1):
+        if sides is None:
+            if header is None:
+                sides = [1, 2, 3, 4]
+            else:
+                sides = [i for i, title in enumerate(header) if title in SIDE_COLUMNS]
+                if not sides:
+                    raise TabbycatSchemaError(f'{file_name}: no side columns ({", ".join(sorted(SIDE_COLUMNS))}) in the header {header}')
+        check_row(row, sides[-1]+1, file_name)
+        yield Debate(tuple(row[i] for i in sides if row[i]))
+
+class SpeakerTab:
+    '''Speaker tab of one tournament, read from the file once by load_speaker_tab.
+    All lists are in the order of the tab, element i of every list belongs to the same debater.
+    names: sanitized names of debaters
+    institutions: institutions of debaters, empty strings if the tab doesn't show them
+    teams: team names (unsanitized)
+    points: speaker points of every debater, list of ints by rounds
+    averages: average speaker points over all inrounds'''
+    __slots__ = ('names', 'institutions', 'teams', 'points', 'averages')
+
+    def __init__(self):
+        self.names = []
+        self.institutions = []
+        self.teams = []
+        self.points = []
+        self.averages = []
+
+    def speaker_teams(self)->dict[str,str]:
+        '''Returns dictionary whose keys are names of the debaters and values are their teams (same teams as in speaker_points).'''
+        return dict(zip(self.names, self.teams))
+
+    def speaker_points(self)->dict[str, (str, list[int],float)]:
+        '''Returns speaker tab in the format of uvezi_spikere.'''
+        return {name: (team, points, average) for name, team, points, average in zip(self.names, self.teams, self.points, self.averages)}
+
+    def add_to_elo(self, elo_debaters:dict[str,(float,int)])->None:
+        '''Adds debaters who aren't in elo_debaters with default rating and number of debates, same as add_debaters.'''
+        for name in self.names:
+            if name not in elo_debaters:
+                elo_debaters[name]=(1000,0)
+
+def load_speaker_tab(file_name:str,no_of_rounds:int=None,ignore_1:bool=True)->SpeakerTab:
+    '''Function reads the speaker tab in a single pass, cleaning every name once.
+    add_debaters, load_teams_participants and uvezi_spikere are all made from it.
+    Inputs:
+    file_name: name of the .csv file where the speakers are stored, including the .csv extension
+    no_of_rounds: total number of the inrounds of the tournament, None to read all round columns
+    ignore_1: boolean that determines if the first row is the header or data (see iter_speakers)
+    Outputs:
+    SpeakerTab object'''
+    tab = SpeakerTab()
+    for row in iter_speakers(file_name,no_of_rounds,ignore_1):
+        tab.names.append(row.name)
+        tab.institutions.append(row.institution)
+        tab.teams.append(row.team)
+        tab.points.append(row.points)
+        tab.averages.append(row.average)
+    return tab
+
+def uvezi_spikere(file_name:str,no_of_rounds:int=None,ignore_1:bool=True)->dict[str, (str, list[int],float)]:
     '''Function loads speaker points from a .CSV file and converts them to a dictionary
     Inputs:
     file_name: name of the .csv file where the speakers are stored, including the .csv extension
-    no_of_rouds: total number of the inrounds of the tournament
+    no_of_rouds: total number of the inrounds of the tournament, None to read all round columns
     ignore_1: boolean that determines if the first row should be ignored (it is a header) or not (it is data)
     Outputs:
     dictionary whose keys are sanitized debaters' names, and values are tuples,
     first member of the tuple is team name (unsanitized),
     second member is a list of ints (speaker points for a given round),
     third is average speaker points over all inrounds.'''
-    speakers = {}
-    first_row=True
-    with open(file_name, newline='\n', encoding='utf-8') as csvdat:
-        reader = csv.reader(csvdat, delimiter='\t')
-        for row in reader:
-            if first_row==False or ignore_1==False:    
-                try:
-                    average = float(row[no_of_rounds+4])
-                except ValueError:
-                    average = 0.0
-
-                templist = []
-                for i in range(4, 4+no_of_rounds): # Where the speaker points are depends on no of rounds
-                    try:
-                        templist.append(int(row[i]))
-                    except ValueError:
-                        templist.append(0)
-                speakers[clean_name(row[1])] = (row[3],templist, average)  # Uzimamo namena i njihove rezultate
-            first_row=False
-        return speakers
+    return load_speaker_tab(file_name,no_of_rounds,ignore_1).speaker_points()
     
 def add_debaters(elo_debaters:dict[str,(float,int)], file_name:str, ignore_1:bool=True):
     '''Add debaters to an ELO dictionary from a file (if they aren't on the ELO list already).
@@ -184,20 +308,10 @@ def add_debaters(elo_debaters:dict[str,(float,int)], file_name:str, ignore_1:boo
     Output:
     Nothing, updates dictionary by reference
     '''
-    first_row=True
     try:
-        with open(file_name, newline='\n', encoding='utf-8') as csvdat:
-            reader = csv.reader(csvdat, delimiter='\t')
-            for row in reader:
-                if first_row==False or ignore_1 == False:
-                    if clean_name(row[1]) not in elo_debaters.keys():
-                        elo_debaters[clean_name(row[1])]=(1000,0)  
-                        # If debater isn't already on the list, assign defualt rating and debate numbber
-                first_row=False
-        print('majmun')
-        print(elo_debaters)
-        print('majmun')
+        tab = load_speaker_tab(file_name,ignore_1=ignore_1)
     except FileNotFoundError:
-        pass
+        return
+    tab.add_to_elo(elo_debaters)
     '''NOTE: Dictionary is updated by reference, since python only gives out reference 
-    when an argument of a called function is a complex data structure like this dictionary.'''
\ No newline at end of file
+    when an argument of a called function is a complex data structure like this dictionary.'''
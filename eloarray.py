@@ -0,0 +1,225 @@
+import numpy as np # Za računanje ELO rejtinga nad nizovima umesto petlje po parovima
+import metrics
+from eloparams import EloParams, DEFAULT_PARAMS
+
+class EloArrays:
+    '''ELO ratings kept in NumPy arrays instead of a dictionary.
+    Every debater gets an integer id (position in the arrays) when they are added.
+    ratings: array of current ELO ratings, indexed by id
+    debates: array of number of debates had so far, indexed by id
+    ids: dictionary whose keys are sanitized names of debaters and values are their ids
+    names: list of sanitized names of debaters, indexed by id'''
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.ratings = np.empty(0, dtype=np.float64)
+        self.debates = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_dict(cls, elo_debaters:dict[str,(float,int)])->'EloArrays':
+        '''Makes arrays from the dictionary returned by csvio.load_debater_elo.'''
+        state = cls()
+        state.names = list(elo_debaters.keys())
+        state.ids = {name: i for i, name in enumerate(state.names)}
+        state.ratings = np.fromiter((elo[0] for elo in elo_debaters.values()), dtype=np.float64, count=len(state.names))
+        state.debates = np.fromiter((elo[1] for elo in elo_debaters.values()), dtype=np.int64, count=len(state.names))
+        return state
+
+    def to_dict(self)->dict[str,(float,int)]:
+        '''Returns ratings in the same format as csvio.load_debater_elo, so they can be exported.'''
+        return {name: (float(elo), int(debates)) for name, elo, debates in zip(self.names, self.ratings, self.debates)}
+
+    def add(self, name:str, elo:float=1000, debates:int=0)->int:
+        '''Adds a debater if they aren't already in the arrays and returns their id.'''
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.ratings = np.append(self.ratings, float(elo))
+            self.debates = np.append(self.debates, int(debates))
+        return self.ids[name]
+
+    def lookup(self, names:list[str])->np.ndarray:
+        '''Returns ids of given debaters, -1 for debaters who aren't in the arrays (most likely swings).'''
+        ids = self.ids
+        return np.fromiter((ids.get(name, -1) for name in names), dtype=np.int64, count=len(names))
+
+def k_factors(ratings:np.ndarray, debates:np.ndarray, params:EloParams=DEFAULT_PARAMS)->np.ndarray:
+    '''Array version of main.calculate_k_factor, returns k factor for every rating and number of debates.'''
+    base_k = np.full(len(ratings), float(params.base_k))
+    for rating, cut in reversed(params.rating_cuts): # Highest rating is applied last, so it's the one that counts
+        base_k = np.where(ratings > rating, params.base_k-cut, base_k)
+    multiplier = np.ones(len(debates))
+    for debates_below, value in reversed(params.debate_multipliers):
+        multiplier = np.where(debates < debates_below, value, multiplier)
+    return (base_k*multiplier).astype(np.int64) # Truncated the same way int() does
+
+def speaker_modifiers(delta_speak:np.ndarray, winner:bool, params:EloParams=DEFAULT_PARAMS)->np.ndarray:
+    '''Array version of main.speaker_modifier, with the same floor and cap.'''
+    preelim_modifier = 1+(delta_speak/params.speaker_scale) if winner else 1-(delta_speak/params.speaker_scale)
+    return np.where(preelim_modifier > params.modifier_max, float(params.modifier_max),
+                    np.where(preelim_modifier < 0, params.modifier_floor, preelim_modifier))
+
+def round_modifiers(names:list[str], speaker_deltas:dict[str,int], winner:bool, params:EloParams=DEFAULT_PARAMS)->np.ndarray:
+    '''Returns speaker modifier for every given debater in one round,
+    1.0 for debaters who aren't on the speaker tab, same as main.apply_speaker_modifier.
+    speaker_deltas: dictionary for one round from main.build_speaker_deltas'''
+    present = np.fromiter((name in speaker_deltas for name in names), dtype=bool, count=len(names))
+    delta_speak = np.fromiter((speaker_deltas.get(name, 0) for name in names), dtype=np.float64, count=len(names))
+    return np.where(present, speaker_modifiers(delta_speak, winner, params), 1.0)
+
+PADDING = -2 # Empty place in a row of round_arrays, pairs with it are left out (-1 is a debater who isn't rated, e.g. a swing)
+
+def round_arrays(ranked:list[tuple[str,...]], rosters:dict[str,tuple[str,...]], state:EloArrays,
+no_of_swing_speakers:int)->tuple[np.ndarray,np.ndarray]:
+    '''Packs one round into arrays for expand_pairs.
+    Inputs:
+    ranked: teams of every debate in the order of places, from formats.rank_debates
+    rosters: paired speakers of every team, from formats.team_rosters; teams that aren't in it are swings
+    state: EloArrays whose ids are used
+    no_of_swing_speakers: number of debaters of a swing team (formats.DebateFormat.speakers)
+    Outputs:
+    tuple where first member is an array with a row for every debate and a column for every place, values are rows
+    of the second member, which has a row for every team with ids of its paired speakers (-1 for debaters who aren't rated),
+    followed by a row of a swing team and an empty row for places of debates with fewer teams, rows are padded with PADDING'''
+    width = max([no_of_swing_speakers, *map(len, rosters.values())])
+    swing_row, empty_row = len(rosters), len(rosters)+1
+    ids = np.full((len(rosters)+2, width), PADDING, dtype=np.int64)
+    ids[swing_row, :no_of_swing_speakers] = -1
+    sizes = np.fromiter(map(len, rosters.values()), dtype=np.int64, count=len(rosters))
+    rows = np.repeat(np.arange(len(rosters)), sizes)
+    ids[rows, np.arange(len(rows)) - np.repeat(np.cumsum(sizes)-sizes, sizes)] = state.lookup(
+        [name for speakers in rosters.values() for name in speakers])
+
+    team_rows = {team: i for i, team in enumerate(rosters)}
+    places = max(map(len, ranked), default=0)
+    debates = np.full((len(ranked), places), empty_row, dtype=np.int64)
+    sizes = np.fromiter(map(len, ranked), dtype=np.int64, count=len(ranked))
+    rows = np.repeat(np.arange(len(ranked)), sizes)
+    debates[rows, np.arange(len(rows)) - np.repeat(np.cumsum(sizes)-sizes, sizes)] = np.fromiter(
+        (team_rows.get(team, swing_row) for debate in ranked for team in debate), dtype=np.int64, count=len(rows))
+    return debates, ids
+
+def expand_pairs(debates:np.ndarray, ids:np.ndarray)->tuple[np.ndarray,np.ndarray]:
+    '''Array version of formats.expand_round: makes ids of all pairs of debaters of one round at once,
+    in the same order (see formats.pairing_order).
+    Inputs:
+    debates, ids: arrays from round_arrays
+    Outputs:
+    tuple of arrays, ids of winners and ids of losers of the pairs'''
+    above, below = np.triu_indices(debates.shape[1], k=1) # Every place beat every place below it
+    winner_rows = debates[:, above].ravel()
+    loser_rows = debates[:, below].ravel()
+    width = ids.shape[1]
+    sizes = (ids != PADDING).sum(axis=1)
+    no_of_winners = sizes[winner_rows][:, None, None]
+    no_of_losers = sizes[loser_rows][:, None, None]
+    a = np.arange(width)[None, :, None] # Position of the winner's speaker
+    b = np.arange(width)[None, None, :] # Position of the loser's speaker
+    valid = (a < no_of_winners) & (b < no_of_losers)
+    order = ((b-a) % np.maximum(no_of_losers, 1))*no_of_winners + a + np.arange(len(winner_rows))[:, None, None]*width*width
+    winners = np.broadcast_to(ids[winner_rows][:, :, None], valid.shape)[valid]
+    losers = np.broadcast_to(ids[loser_rows][:, None, :], valid.shape)[valid]
+    order = np.argsort(order[valid])
+    return winners[order], losers[order]
+
+def delta_array(state:EloArrays, round_deltas:dict[str,int])->np.ndarray:
+    '''Returns speaker deltas of one round (dictionary from main.build_speaker_deltas) indexed by debater id,
+    NaN for debaters who have none. The array has one more element (NaN) at the end, so id -1 of a swing gives NaN.'''
+    deltas = np.full(len(state.names)+1, np.nan)
+    deltas[state.lookup(list(round_deltas))] = np.fromiter(round_deltas.values(), dtype=np.float64, count=len(round_deltas))
+    deltas[-1] = np.nan # Debaters on the speaker tab who aren't in the arrays
+    return deltas
+
+def id_modifiers(ids:np.ndarray, deltas:np.ndarray, winner:bool, params:EloParams=DEFAULT_PARAMS)->np.ndarray:
+    '''Same as round_modifiers, for debaters given by ids and deltas from delta_array.'''
+    delta_speak = deltas[ids]
+    present = ~np.isnan(delta_speak)
+    return np.where(present, speaker_modifiers(np.where(present, delta_speak, 0), winner, params), 1.0)
+
+def calculate_elo_arrays(pairs_debaters:list[tuple[str,str]], state:EloArrays,
+speaker_deltas:list[dict[str,int]], round_no:int, events:list=None, params:EloParams=DEFAULT_PARAMS, weight:float=1.0)->None:
+    '''Array version of main.calculate_elo, updates ratings in state for one round.
+    All pairs of a round are calculated from ratings before the round, and if a debater is in more than one pair
+    the last pair is the one that counts, same as main.calculate_elo.
+    Throws value error if loser gains rating or winner loses rating.
+    Inputs:
+    pairs_debaters: list of tuples where the first debater won over second debater
+    state: EloArrays with current ratings, updated in place
+    speaker_deltas: table made by main.build_speaker_deltas for this tournament
+    round_no: number of the round being calculated
+    events: optional list to which rating changes are appended, same as in main.calculate_elo
+    params: settings of the calculation, see eloparams.EloParams
+    weight: every rating change of the round is multiplied by it, same as in main.elo_updates'''
+    if not pairs_debaters or not state.names:
+        return # Nobody whose rating could change
+    winners = [pair[0] for pair in pairs_debaters]
+    losers = [pair[1] for pair in pairs_debaters]
+    round_deltas = speaker_deltas[round_no-1] if round_no <= len(speaker_deltas) else {}
+    apply_round(state.lookup(winners), state.lookup(losers), round_modifiers(winners, round_deltas, True, params),
+                round_modifiers(losers, round_deltas, False, params), state, round_no, events, params, weight)
+
+def calculate_elo_ids(winner_ids:np.ndarray, loser_ids:np.ndarray, state:EloArrays, deltas:np.ndarray,
+round_no:int, events:list=None, params:EloParams=DEFAULT_PARAMS, weight:float=1.0)->None:
+    '''Same as calculate_elo_arrays, for pairs given by ids (from expand_pairs) and speaker deltas of the round from delta_array.'''
+    if not len(winner_ids) or not state.names:
+        return
+    apply_round(winner_ids, loser_ids, id_modifiers(winner_ids, deltas, True, params),
+                id_modifiers(loser_ids, deltas, False, params), state, round_no, events, params, weight)
+
+def apply_round(winner_ids:np.ndarray, loser_ids:np.ndarray, modifier_winner:np.ndarray, modifier_loser:np.ndarray,
+state:EloArrays, round_no:int, events:list=None, params:EloParams=DEFAULT_PARAMS, weight:float=1.0)->None:
+    '''Updates ratings in state for pairs of one round, given by ids of debaters (-1 for debaters who aren't rated)
+    and their speaker modifiers, see calculate_elo_arrays.'''
+    known_winners = winner_ids >= 0
+    known_losers = loser_ids >= 0
+    metrics.count('swings_defaulted', len(winner_ids)*2 - int(known_winners.sum()) - int(known_losers.sum()))
+
+    # Debaters who aren't on the list of debaters (swings) have default rating and k factor 0
+    elo_winner = np.where(known_winners, state.ratings[winner_ids], 1000.0)
+    elo_loser = np.where(known_losers, state.ratings[loser_ids], 1000.0)
+    k_winner = np.where(known_winners, k_factors(elo_winner, state.debates[winner_ids], params), 0)
+    k_loser = np.where(known_losers, k_factors(elo_loser, state.debates[loser_ids], params), 0)
+
+    expected = 1 - (1 / (1 + 10 ** ((elo_winner - elo_loser) / params.rating_scale))) # ELO mathematical formula
+    delta_winner = expected*(k_winner*modifier_winner*weight)
+    delta_loser = expected*(k_loser*modifier_loser*weight)
+    if (delta_winner < 0).any() or (delta_loser < 0).any():
+        raise ValueError(f'Winner or loser delta below 0!\nloser={delta_loser.min()} winner={delta_winner.min()}')
+
+    # Updates in the order main.calculate_elo applies them (winner then loser of each pair), only the last one counts
+    update_ids = np.empty(2*len(winner_ids), dtype=np.int64)
+    update_ids[0::2] = winner_ids
+    update_ids[1::2] = loser_ids
+    update_elo = np.empty(2*len(winner_ids), dtype=np.float64)
+    update_elo[0::2] = elo_winner + delta_winner
+    update_elo[1::2] = elo_loser - delta_loser
+    known = update_ids >= 0
+    update_ids = update_ids[known][::-1]
+    update_elo = update_elo[known][::-1]
+    updated, last = np.unique(update_ids, return_index=True) # First in reversed order is the last one applied
+    before = state.ratings[updated]
+    state.ratings[updated] = update_elo[last]
+    state.debates[updated] += 1
+    if events is not None:
+        update_k = np.empty(2*len(winner_ids), dtype=np.int64)
+        update_k[0::2] = k_winner
+        update_k[1::2] = k_loser
+        update_modifier = np.empty(2*len(winner_ids), dtype=np.float64)
+        update_modifier[0::2] = modifier_winner
+        update_modifier[1::2] = modifier_loser
+        update_k = update_k[known][::-1][last]
+        update_modifier = update_modifier[known][::-1][last]
+        names = state.names
+        for i, debater in enumerate(updated.tolist()):
+            events.append((names[debater], round_no, float(before[i]), float(state.ratings[debater]), int(state.debates[debater]),
+                           int(update_k[i]), float(update_modifier[i])))
+
+def calculate_elo(pairs_debaters:list[tuple[str,str]], elo_debaters:dict[str,(float,int)],
+speaker_deltas:list[dict[str,int]], round_no:int, params:EloParams=DEFAULT_PARAMS)->dict[str,(float,int)]:
+    '''Same as main.calculate_elo, but calculated with arrays. Takes and returns dictionaries, so it's slower than
+    keeping an EloArrays for the whole tournament and calling calculate_elo_arrays.
+    speaker_deltas: table made by main.build_speaker_deltas for this tournament'''
+    state = EloArrays.from_dict(elo_debaters)
+    calculate_elo_arrays(pairs_debaters, state, speaker_deltas, round_no, params=params)
+    return state.to_dict()
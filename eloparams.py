@@ -0,0 +1,36 @@
+import dataclasses
+
+@dataclasses.dataclass(frozen=True)
+class EloParams:
+    '''Settings of the ELO calculation, defaults are the ones the ratings were always calculated with.
+    base_k: k factor before the cuts and multipliers
+    rating_cuts: tuples (rating, cut), k factor is lowered by the cut of the first rating the debater is above
+    debate_multipliers: tuples (debates, multiplier), k factor is multiplied by the multiplier of the first number of debates
+    the debater has fewer of, so newcomers' ratings move faster
+    speaker_scale: difference between partners' speaker points which doubles (or cancels) the rating change
+    modifier_max: largest speaker modifier
+    modifier_floor: speaker modifier used when it would be below zero
+    rating_scale: rating difference at which the stronger debater is expected to win 10 times more often
+    round_weights: tuples (stage, weight), rating changes of outrounds of the stage (see tabrounds.STAGES) are multiplied
+    by the weight, inrounds and stages that aren't listed have weight 1'''
+    base_k: float = 30
+    rating_cuts: tuple[tuple[float,float], ...] = ((1500, 10), (1250, 5))
+    debate_multipliers: tuple[tuple[int,float], ...] = ((5, 3), (10, 2), (20, 1.5))
+    speaker_scale: float = 10
+    modifier_max: float = 2
+    modifier_floor: float = 0.1
+    rating_scale: float = 400
+    round_weights: tuple[tuple[str,float], ...] = (('break', 1.0), ('semifinal', 1.0), ('final', 1.0))
+
+    def replace(self, **changes)->'EloParams':
+        '''Returns a copy with the given settings changed.'''
+        return dataclasses.replace(self, **changes)
+
+    def round_weight(self, stage:str)->float:
+        '''Returns the weight of rating changes in rounds of the stage.'''
+        for weighted_stage, weight in self.round_weights:
+            if weighted_stage == stage:
+                return weight
+        return 1.0
+
+DEFAULT_PARAMS = EloParams()
@@ -0,0 +1,122 @@
+import dataclasses
+import functools
+from operator import itemgetter
+
+@dataclasses.dataclass(frozen=True)
+class DebateFormat:
+    '''How debates of a tournament are turned into pairs of debaters.
+    name: name used on the command line
+    teams: number of teams in a debate, 0 for any number
+    speakers: number of speakers of a team in a debate, swing teams (teams that aren't on the speaker tab) get this many placeholders
+    roster: which debaters of a team are paired in a round:
+    'fixed' - first speakers debaters of the team in speaker tab order, missing ones are placeholders (how BP was always rated)
+    'spoke' - debaters who have speaker points in the round, for squads with more members than speakers (WSDC),
+    the whole team if nobody from it has points (tabs without points)
+    'all' - every debater of the team, teams of different sizes are paired as they are'''
+    name: str
+    teams: int
+    speakers: int
+    roster: str = 'fixed'
+
+BP = DebateFormat('bp', 4, 2)
+WSDC = DebateFormat('wsdc', 2, 3, 'spoke')
+AP = DebateFormat('ap', 2, 3, 'spoke')
+OPEN = DebateFormat('open', 0, 2, 'all')
+FORMATS = {debate_format.name: debate_format for debate_format in (BP, WSDC, AP, OPEN)}
+
+def get_format(debate_format)->DebateFormat:
+    '''Returns the format with the given name, or the format itself. Throws ValueError for unknown names.'''
+    if isinstance(debate_format, DebateFormat):
+        return debate_format
+    if debate_format not in FORMATS:
+        raise ValueError(f'Unknown debate format {debate_format}!')
+    return FORMATS[debate_format]
+
+@functools.lru_cache(maxsize=None)
+def swing_speakers(no_of_speakers:int)->tuple[str,...]:
+    '''Placeholders for debaters of a swing team, they aren't in the ratings so they have default rating and k factor 0.'''
+    return tuple(f'UNKNOWN SWING {i+1}' for i in range(no_of_speakers))
+
+@functools.lru_cache(maxsize=None)
+def pairing_order(no_of_winners:int, no_of_losers:int)->tuple[tuple[int,int],...]:
+    '''Order in which speakers of two teams are paired, as (winner position, loser position).
+    Every winner is paired with every loser, speakers at the same position first and then shifted by one position
+    at a time, so for two speakers it's (0,0), (1,1), (0,1), (1,0), the order BP pairs were always made in.
+    Order matters, since the last pair of a debater in a round is the one that counts (see main.elo_updates).
+    Position of (a, b) in the order is ((b-a) mod no_of_losers)*no_of_winners + a, eloarray.expand_pairs sorts by it.'''
+    return tuple((a, (a+shift) % no_of_losers) for shift in range(no_of_losers) for a in range(no_of_winners))
+
+def paired_speakers(members:list[str], debate_format:DebateFormat, round_points:dict[str,int]=None)->tuple[str,...]:
+    '''Returns debaters of a team who are paired in a round.
+    Inputs:
+    members: debaters of the team in speaker tab order, empty for swing teams
+    debate_format: format of the tournament, see DebateFormat.roster
+    round_points: speaker points of debaters in the round (see points_in_round), without them the whole team is paired
+    in formats whose roster is 'spoke'
+    Outputs:
+    tuple of debaters' names, with placeholders for the missing ones'''
+    if not members:
+        return swing_speakers(debate_format.speakers)
+    if debate_format.roster == 'fixed':
+        speakers = tuple(members[:debate_format.speakers])
+        # Placeholders for debaters who aren't on the speaker tab, e.g. a team with a swing speaker
+        return speakers + tuple(f'UNKNOWN SINGLE SWING{i}' for i in range(len(speakers), debate_format.speakers))
+    if debate_format.roster == 'spoke' and round_points is not None:
+        spoke = tuple(name for name in members if round_points.get(name, 0) > 0)
+        return spoke if spoke else tuple(members)
+    return tuple(members)
+
+def points_in_round(speaker_pts:dict[str, (str, list[int], float)], round_no:int)->dict[str,int]:
+    '''Returns speaker points of every debater in one round, from the speaker tab in the format of csvio.uvezi_spikere.'''
+    return {name: data[1][round_no-1] for name, data in speaker_pts.items() if round_no <= len(data[1])}
+
+def team_rosters(team_roster:dict[str,list[str]], debate_format:DebateFormat, round_points:dict[str,int]=None)->dict[str,tuple[str,...]]:
+    '''Returns paired_speakers of every team of the speaker tab. Rosters of the 'spoke' format change every round,
+    others are the same for the whole tournament and should be made once.
+    team_roster: index made by main.build_team_roster'''
+    return {team: paired_speakers(members, debate_format, round_points) for team, members in team_roster.items()}
+
+def rank_debates(teams_ranks:dict[str,int], debates_teams:list[set[str]], debate_format:DebateFormat=BP)->list[tuple[str,...]]:
+    '''Compact representation of one round: teams of every debate ordered by their place, winner first.
+    Teams are in the same order main.generate_pairs_teams puts them in.
+    Teams with the same result (both advancing teams of a BP outround) didn't beat each other, so a debate with such teams
+    is given as two team debates of every winner and loser instead, in the same order.
+    Throws ValueError if a team has no rank, or a debate has more teams than the format allows
+    (tab of a different format).'''
+    ranked = []
+    for debate in debates_teams:
+        if debate_format.teams and len(debate) > debate_format.teams:
+            raise ValueError(f'Debate of teams {", ".join(sorted(debate))} has {len(debate)} teams, '
+                             f'{debate_format.name} debates have {debate_format.teams}!')
+        ranks = []
+        for team in debate:
+            if team not in teams_ranks:
+                raise ValueError(f'Team {team} not found in rankings!')
+            ranks.append((team, teams_ranks[team]))
+        ranks.sort(key=itemgetter(1))
+        if len({rank for _, rank in ranks}) == len(ranks):
+            ranked.append(tuple(team for team, _ in ranks))
+        else:
+            ranked.extend((winner, loser) for i, (winner, rank) in enumerate(ranks) for loser, other in ranks[i+1:] if other > rank)
+    return ranked
+
+def expand_round(ranked:list[tuple[str,...]], rosters:dict[str,tuple[str,...]], debate_format:DebateFormat=BP)->list[tuple[str,str]]:
+    '''Makes all pairs of debaters of one round in a single pass: every team beat every team placed below it,
+    and every paired speaker of the winner beat every paired speaker of the loser (see pairing_order).
+    Same pairs, in the same order, as main.generate_pairs_debaters(main.generate_pairs_teams(...)).
+    Inputs:
+    ranked: debates of the round, from rank_debates
+    rosters: paired speakers of every team, from team_rosters; teams that aren't in it are swings
+    debate_format: format of the tournament, gives the number of placeholders of swing teams
+    Outputs:
+    list of tuples where the first debater won over the second debater'''
+    swing = swing_speakers(debate_format.speakers)
+    pairs = []
+    append = pairs.append
+    for debate in ranked:
+        speakers = [rosters.get(team, swing) for team in debate]
+        for i, winners in enumerate(speakers):
+            for losers in speakers[i+1:]:
+                for a, b in pairing_order(len(winners), len(losers)):
+                    append((winners[a], losers[b]))
+    return pairs
@@ -0,0 +1,229 @@
+import itertools
+import logging
+import os
+from collections import Counter
+from typing import NamedTuple
+import metrics
+
+log = logging.getLogger(__name__)
+
+MERGE_THRESHOLD = 0.92 # Names at least this similar are the same debater
+TOKEN_THRESHOLD = 0.8 # ...if every part of the name is at least this similar
+REVIEW_THRESHOLD = 0.8 # Names at least this similar are kept separate, but reported for review
+CANDIDATES = 20 # Names with most shared n-grams which are scored for every query
+MAX_SCANNED = 30000 # Names looked up in postings for one query, rarest trigrams first, so common ones (ić#) are skipped
+RAREST_GRAMS = 3 # Trigrams used even if they are over MAX_SCANNED
+
+def name_grams(name:str)->set[str]:
+    '''Returns trigrams of every part of a sanitized name, with # marking start and end of a part.
+    Order of the parts doesn't matter, so "nikola nikolic" and "nikolic nikola" have the same trigrams.'''
+    grams = set()
+    for token in name.split():
+        token = f'#{token}#'
+        grams.update(token[i:i+3] for i in range(len(token)-2))
+    return grams
+
+def edit_similarity(a:str, b:str)->float:
+    '''Returns 1 - Levenshtein distance / length of the longer string, 1.0 for the same strings.'''
+    if a == b:
+        return 1.0
+    previous = list(range(len(b)+1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j]+1, current[j-1]+1, previous[j-1]+(char_a != char_b)))
+        previous = current
+    return 1 - previous[-1]/max(len(a), len(b))
+
+def similarity(a:str, b:str)->tuple[float,float]:
+    '''Compares parts of two sanitized names in the order that fits them best (so swapped name and surname match).
+    Outputs:
+    tuple where first member is the confidence (average similarity of the parts, parts one name doesn't have count as 0)
+    and second is similarity of the least similar matched part'''
+    tokens_a, tokens_b = a.split(), b.split()
+    if len(tokens_a) > len(tokens_b):
+        tokens_a, tokens_b = tokens_b, tokens_a
+    if not tokens_a:
+        return 0.0, 0.0
+    if len(tokens_b) > 4: # Too many orders to try, parts are compared in their order
+        orders = [tokens_b[:len(tokens_a)]]
+    else:
+        orders = itertools.permutations(tokens_b, len(tokens_a))
+    best = (0.0, 0.0)
+    for order in orders:
+        scores = [edit_similarity(x, y) for x, y in zip(tokens_a, order)]
+        best = max(best, (sum(scores)/len(tokens_b), min(scores)))
+    return best
+
+class NameIndex:
+    '''Inverted index from trigrams to sanitized names of the rating pool, so names similar to a new one are found
+    among the names sharing its rarest trigrams, instead of comparing it with the whole pool.
+    names: indexed names, position in the list is the id used in postings
+    postings: dictionary whose keys are trigrams and values are lists of ids of names which have them'''
+
+    def __init__(self, names=()):
+        self.names = []
+        self.ids = {}
+        self.postings = {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name:str)->None:
+        '''Adds a name to the index, if it isn't already in it.'''
+        if name in self.ids:
+            return
+        self.ids[name] = len(self.names)
+        for gram in name_grams(name):
+            self.postings.setdefault(gram, []).append(len(self.names))
+        self.names.append(name)
+
+    def __contains__(self, name:object)->bool:
+        return name in self.ids
+
+    def __len__(self)->int:
+        return len(self.names)
+
+    def candidates(self, name:str, limit:int=CANDIDATES)->list[str]:
+        '''Returns up to limit indexed names (other than name) which share the most trigrams with it.'''
+        postings = sorted((self.postings[gram] for gram in name_grams(name) if gram in self.postings), key=len)
+        shared = Counter()
+        scanned = 0
+        for i, posting in enumerate(postings):
+            scanned += len(posting)
+            if i >= RAREST_GRAMS and scanned > MAX_SCANNED:
+                break # Remaining trigrams are in too many names to tell much, and looking them up would take long
+            shared.update(posting)
+        own = self.ids.get(name)
+        return [self.names[i] for i, _ in shared.most_common(limit+1) if i != own][:limit]
+
+    def best_match(self, name:str, exclude=())->tuple[str,float,float]:
+        '''Returns the most similar indexed name and its similarity (see similarity), (None, 0.0, 0.0) if nothing is similar.'''
+        best = (None, 0.0, 0.0)
+        for candidate in self.candidates(name):
+            if candidate in exclude:
+                continue
+            score, weakest = similarity(name, candidate)
+            if (score, weakest) > best[1:]:
+                best = (candidate, score, weakest)
+        return best
+
+class AliasTable:
+    '''Decisions about names which aren't in the rating pool as they are, kept in a tab separated file
+    (alias, debater, confidence on every line), so the same name is resolved the same way in every run.
+    A name whose debater is the name itself is a different person from everyone similar to it, and is never merged.
+    Lines can be added or changed by hand, confidence of those doesn't matter.'''
+
+    def __init__(self, file_name:str=None):
+        self.file_name = file_name
+        self.aliases = {}
+        self.changed = False
+        if file_name is not None:
+            try:
+                with open(file_name, encoding='utf-8') as f:
+                    for line in f:
+                        columns = line.rstrip('\n').split('\t')
+                        if len(columns) >= 2 and not line.startswith('#'):
+                            self.aliases[columns[0]] = (columns[1], float(columns[2]) if len(columns) > 2 and columns[2] else 1.0)
+            except FileNotFoundError:
+                pass # No decisions yet
+
+    def get(self, name:str)->str:
+        '''Returns the debater the name belongs to, None if there is no decision about it.'''
+        alias = self.aliases.get(name)
+        return alias[0] if alias is not None else None
+
+    def add(self, name:str, debater:str, confidence:float)->None:
+        self.aliases[name] = (debater, confidence)
+        self.changed = True
+
+    def __len__(self)->int:
+        return len(self.aliases)
+
+    def save(self)->None:
+        '''Writes the table if anything was added, through a temporary file so it's never left half written.'''
+        if self.file_name is None or not self.changed:
+            return
+        with open(self.file_name+'.tmp', 'w', encoding='utf-8') as f:
+            for name, (debater, confidence) in sorted(self.aliases.items()):
+                f.write(f'{name}\t{debater}\t{confidence:.3f}\n')
+        os.replace(self.file_name+'.tmp', self.file_name)
+        self.changed = False
+
+class Match(NamedTuple):
+    '''How a name from a speaker tab was resolved.
+    status: 'exact' (in the pool), 'alias' (from the alias table), 'merged' (similar enough to a debater from the pool),
+    'review' (similar, but kept as a new debater) or 'new' '''
+    name: str
+    debater: str
+    confidence: float
+    status: str
+    candidate: str # Most similar debater from the pool, for merged and review names
+
+class Resolver:
+    '''Resolves names from speaker tabs to debaters of the rating pool, see resolve.
+    Index of the pool is built on the first tab and kept up to date with the pool afterwards.'''
+
+    def __init__(self, aliases:AliasTable=None, threshold:float=MERGE_THRESHOLD, review:float=REVIEW_THRESHOLD):
+        self.aliases = aliases if aliases is not None else AliasTable()
+        self.threshold = threshold
+        self.review = review
+        self.index = None
+
+    def sync(self, elo_debaters)->None:
+        '''Adds debaters of the pool who aren't in the index yet.'''
+        if self.index is None:
+            self.index = NameIndex(elo_debaters)
+        elif len(self.index) < len(elo_debaters):
+            for name in elo_debaters:
+                self.index.add(name)
+
+    def resolve(self, names:list[str], elo_debaters)->list[Match]:
+        '''Finds the debater of the pool every name of one speaker tab belongs to.
+        Names in the pool or in the alias table are taken as they are. Other names are merged with the most similar debater
+        if the confidence is at least threshold (and every part of the name is similar), and the merge is added to the
+        alias table. Two names of the same tab are never merged into the same debater.
+        Inputs:
+        names: sanitized names from the speaker tab
+        elo_debaters: rating pool, dictionary or registry.DebaterRegistry
+        Outputs:
+        Match for every name, in the same order'''
+        self.sync(elo_debaters)
+        matches = [None]*len(names)
+        taken = set()
+        fuzzy = []
+        for i, name in enumerate(names):
+            debater = self.aliases.get(name)
+            if debater is not None and debater not in taken:
+                matches[i] = Match(name, debater, 1.0, 'exact' if debater == name else 'alias', None)
+            elif name in self.index and name not in taken:
+                matches[i] = Match(name, name, 1.0, 'exact', None)
+            else:
+                fuzzy.append(i)
+                continue
+            taken.add(matches[i].debater)
+        scored = []
+        for i in fuzzy:
+            candidate, score, weakest = self.index.best_match(names[i], exclude=taken)
+            scored.append((score, weakest, i, candidate))
+        scored.sort(key=lambda item: (-item[0], item[2])) # The most certain merges get their debaters first
+        for score, weakest, i, candidate in scored:
+            name = names[i]
+            if candidate is not None and candidate not in taken and score >= self.threshold and weakest >= TOKEN_THRESHOLD:
+                matches[i] = Match(name, candidate, score, 'merged', candidate)
+                self.aliases.add(name, candidate, score)
+                metrics.count('names_merged')
+                log.info('%s is %s (%.2f)', name, candidate, score)
+            elif candidate is not None and score >= self.review:
+                matches[i] = Match(name, name, score, 'review', candidate)
+                metrics.count('names_for_review')
+                log.warning('%s may be %s (%.2f), kept as a new debater', name, candidate, score)
+            else:
+                matches[i] = Match(name, name, 0.0 if candidate is None else score, 'new', candidate)
+            taken.add(matches[i].debater)
+        for match in matches:
+            self.index.add(match.debater) # New debaters are added to the pool by rating
+        return matches
+
+    def rename(self, names:list[str], elo_debaters)->list[str]:
+        '''Returns the debater of every name, see resolve.'''
+        return [match.debater for match in self.resolve(names, elo_debaters)]
@@ -0,0 +1,173 @@
+import bisect
+import math
+
+BUCKET_SIZE = 512 # Buckets are split when they grow to twice this size
+
+class Leaderboard:
+    '''Ranking of debaters by ELO rating, kept sorted as ratings change.
+    Debaters are kept as (-ELO, name) keys in sorted buckets, and a Fenwick tree over bucket sizes
+    gives position of a bucket, so top-k, rank, percentile and range queries take logarithmic time
+    (plus the size of the answer), and an update is one removal and one insertion.
+    Debaters with the same rating are ordered by name.
+    Leaderboard can be given as board to main.rate_tournament, enter_tab or replay_season,
+    which apply every rating change to it as it is made (see apply_event).'''
+
+    def __init__(self, elo_debaters:dict[str,(float,int)]=None, bucket_size:int=BUCKET_SIZE):
+        self.bucket_size = bucket_size
+        self.ratings = {}
+        self.buckets = []
+        self.maxes = [] # Last key of every bucket, to find the bucket a key belongs to
+        self.tree = [0]
+        if elo_debaters:
+            self.load(elo_debaters)
+
+    def load(self, elo_debaters:dict[str,(float,int)])->None:
+        '''Replaces the whole ranking with the given ratings, sorting them once.'''
+        self.ratings = {name: (float(elo), debates) for name, (elo, debates) in elo_debaters.items()}
+        keys = sorted((-elo, name) for name, (elo, _) in self.ratings.items())
+        self.buckets = [keys[i:i+self.bucket_size] for i in range(0, len(keys), self.bucket_size)]
+        self.maxes = [bucket[-1] for bucket in self.buckets]
+        self._build_tree()
+
+    def _build_tree(self)->None:
+        self.tree = [0]*(len(self.buckets)+1)
+        for i, bucket in enumerate(self.buckets, 1):
+            self.tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[i]
+
+    def _tree_add(self, i:int, delta:int)->None:
+        i += 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def _before(self, i:int)->int:
+        '''Number of debaters in buckets before bucket i.'''
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position:int)->tuple[int,int]:
+        '''Bucket and position in it of the debater at the given 0-based position in the ranking.'''
+        i = 0
+        step = 1 << (len(self.tree).bit_length())
+        while step:
+            if i+step < len(self.tree) and self.tree[i+step] <= position:
+                i += step
+                position -= self.tree[i]
+            step >>= 1
+        return i, position
+
+    def _insert(self, key:tuple[float,str])->None:
+        if not self.buckets:
+            self.buckets = [[key]]
+            self.maxes = [key]
+            self._build_tree()
+            return
+        i = bisect.bisect_left(self.maxes, key)
+        if i == len(self.maxes): # Lower than everyone, goes to the end of the last bucket
+            i -= 1
+            self.buckets[i].append(key)
+            self.maxes[i] = key
+        else:
+            bisect.insort(self.buckets[i], key)
+        self._tree_add(i, 1)
+        bucket = self.buckets[i]
+        if len(bucket) >= 2*self.bucket_size:
+            self.buckets[i:i+1] = [bucket[:self.bucket_size], bucket[self.bucket_size:]]
+            self.maxes[i:i+1] = [bucket[self.bucket_size-1], bucket[-1]]
+            self._build_tree()
+
+    def _remove(self, key:tuple[float,str])->None:
+        i = bisect.bisect_left(self.maxes, key)
+        bucket = self.buckets[i]
+        del bucket[bisect.bisect_left(bucket, key)]
+        if bucket:
+            self.maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self.buckets[i]
+            del self.maxes[i]
+            self._build_tree()
+
+    def _index(self, key:tuple)->int:
+        '''Number of debaters ranked before the given key.'''
+        i = bisect.bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            return len(self.ratings)
+        return self._before(i) + bisect.bisect_left(self.buckets[i], key)
+
+    def _entries(self, start:int, stop:int)->list[tuple[str,float,int]]:
+        '''Debaters at 0-based positions start to stop (not included), best first.'''
+        stop = min(stop, len(self.ratings))
+        if start >= stop:
+            return []
+        i, j = self._locate(start)
+        result = []
+        for _ in range(stop-start):
+            name = self.buckets[i][j][1]
+            result.append((name, *self.ratings[name]))
+            j += 1
+            if j == len(self.buckets[i]):
+                i, j = i+1, 0
+        return result
+
+    def update(self, name:str, elo:float, debates:int=None)->None:
+        '''Sets rating of the debater, adding them if they aren't ranked yet.
+        Number of debates is kept if it isn't given.'''
+        old = self.ratings.get(name)
+        if old is not None:
+            if debates is None:
+                debates = old[1]
+            if old[0] != elo:
+                self._remove((-old[0], name))
+                self._insert((-float(elo), name))
+        else:
+            self._insert((-float(elo), name))
+        self.ratings[name] = (float(elo), debates if debates is not None else 0)
+
+    def update_all(self, elo_debaters:dict[str,(float,int)])->int:
+        '''Applies ratings of all given debaters, returns how many of them changed.'''
+        changed = 0
+        for name, (elo, debates) in elo_debaters.items():
+            if self.ratings.get(name) != (elo, debates):
+                self.update(name, elo, debates)
+                changed += 1
+        return changed
+
+    def apply_event(self, event:tuple)->None:
+        '''Applies a rating change in the format of main.calculate_elo events
+        (name, round_no, ELO before, ELO after, number of debates after, k factor, speaker modifier).'''
+        self.update(event[0], event[3], event[4])
+
+    def remove(self, name:str)->None:
+        '''Removes the debater from the ranking, throws KeyError if they aren't ranked.'''
+        elo, _ = self.ratings.pop(name)
+        self._remove((-elo, name))
+
+    def __len__(self)->int:
+        return len(self.ratings)
+
+    def __contains__(self, name:str)->bool:
+        return name in self.ratings
+
+    def top(self, k:int=10, start:int=0)->list[tuple[str,float,int]]:
+        '''Returns k best ranked debaters after skipping the first start of them, as (name, ELO, debates).'''
+        return self._entries(start, start+k)
+
+    def rank(self, name:str)->int:
+        '''Returns rank of the debater, 1 for the best one. Throws KeyError if they aren't ranked.'''
+        return self._index((-self.ratings[name][0], name)) + 1
+
+    def percentile(self, name:str)->float:
+        '''Returns percentage of ranked debaters who have a lower rating than the debater.'''
+        lower = len(self.ratings) - self._index((math.nextafter(-self.ratings[name][0], math.inf),))
+        return 100*lower/len(self.ratings)
+
+    def between(self, low:float, high:float)->list[tuple[str,float,int]]:
+        '''Returns debaters with rating from low to high (both included), best first.'''
+        return self._entries(self._index((-float(high),)), self._index((math.nextafter(-float(low), math.inf),)))
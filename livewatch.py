@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+import csvio
+import leaderboard
+import main
+import metrics
+import tabhttp
+import tabrounds
+from eloparams import EloParams, DEFAULT_PARAMS
+
+log = logging.getLogger(__name__)
+
+class LiveTournament:
+    '''Provisional ratings of a tournament that is still running, updated round by round as its results are released.
+    Every poll reads only the results page of the tab, and if it lists rounds that aren't rated yet, downloads
+    the pages of the new rounds and rates them with main.rate_tournament on top of the ratings after the rounds before them.
+    Tabbycat hides the speaker tab until the tournament ends, so teams of the debaters are taken from the participants
+    page (downloaded once, written as speakers.csv without points) and speaker modifiers of provisional ratings are 1.0.
+    Ratings before the tournament aren't changed, provisional ones are kept in memory (and the downloaded files in tab_dir,
+    which main.rate_source can read later, final ratings are made from the whole tab with points once it is released).
+    Pages are downloaded over HTTP (tabhttp), the browser fetcher is too slow to poll with.
+    Safe to read from other threads (see serve) while the polling thread updates it.
+    Inputs:
+    url: URL of the tournament tab
+    elo_debaters: ratings before the tournament, dictionary or registry.DebaterRegistry, it isn't changed
+    num_of_rounds: number of the inrounds that are rated, None for all of them
+    outrounds: None for no outrounds, otherwise which outrounds are rated, see tabrounds.wanted
+    debate_format, params, identities, backend: see main.rate_tournament
+    tab_dir: directory the files of the tab are written to, a temporary one if it isn't given
+    session: optional tabhttp.HttpSession, made here if it isn't given'''
+
+    def __init__(self, url:str, elo_debaters:dict[str,(float,int)], num_of_rounds:int=None, outrounds=None, debate_format='bp',
+    params:EloParams=DEFAULT_PARAMS, identities=None, backend:str='python', tab_dir:str=None, session:tabhttp.HttpSession=None):
+        self.url = url.rstrip('/') # So the program works whether the URL ends with slash or not
+        self.before = elo_debaters
+        self.num_of_rounds = num_of_rounds
+        self.outrounds = outrounds
+        self.debate_format = debate_format
+        self.params = params
+        self.identities = identities
+        self.backend = backend
+        self.tab_dir = tab_dir if tab_dir is not None else tempfile.mkdtemp(prefix='live_')
+        os.makedirs(self.tab_dir, exist_ok=True)
+        self.session = session if session is not None else tabhttp.HttpSession()
+        self.lock = threading.Lock() # Held while ratings change, readers see them before or after a whole poll
+        self.polls = 0
+        self.last_poll = None
+        self.roster = False # Whether speakers.csv has the teams from the participants page
+        self.reset()
+
+    def reset(self)->None:
+        '''Starts again from the ratings before the tournament.'''
+        self.elo_debaters = dict(self.before)
+        self.board = leaderboard.Leaderboard(self.elo_debaters)
+        self.rated = [] # Rated rounds, in order
+        self.events = [] # Rating changes of all rated rounds, see main.elo_updates
+
+    def fetch(self, file_name:str, loader, *args)->None:
+        '''Downloads one page of the tab and writes its CSV text to tab_dir.'''
+        content = loader(self.session, self.url, *args)
+        with open(os.path.join(self.tab_dir, file_name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def poll(self)->list[tabrounds.TabRound]:
+        '''Checks the tab once and rates rounds released since the last poll.
+        If a round is released after rounds that come after it were already rated, all rounds are rated again
+        from the ratings before the tournament, since the order of the rounds matters.
+        Throws ConnectionError if the tab can't be downloaded, and ValueError if a new round can't be rated,
+        ratings stay the ones after the rounds rated before, so the next poll tries the new rounds again.
+        Outputs:
+        list of the rounds rated in this poll'''
+        with metrics.stage('download'):
+            rounds = tabhttp.find_rounds(self.session, self.url)
+        self.polls += 1
+        self.last_poll = time.time()
+        rated = {tab_round.number for tab_round in self.rated}
+        new = [tab_round for tab_round in tabrounds.select_rounds(rounds, self.num_of_rounds, self.outrounds) if tab_round.number not in rated]
+        if not new:
+            return []
+        log.info('New rounds of %s: %s', self.url, ', '.join(tab_round.name for tab_round in new))
+        with metrics.stage('download'):
+            if not self.roster:
+                self.fetch('speakers.csv', tabhttp.load_participants_text)
+                self.roster = True
+            for tab_round in new:
+                ranks_file, debates_file = tab_round.file_names()
+                self.fetch(ranks_file, tabhttp.load_teams_ranks_text, str(tab_round.number))
+                self.fetch(debates_file, tabhttp.load_teams_debates_text, str(tab_round.number))
+        with self.lock:
+            rated_before = list(self.rated)
+            if rated and min(tab_round.number for tab_round in new) < max(rated):
+                log.warning('Round %s of %s was released late, rating the tournament again', new[0].name, self.url)
+                new = sorted(self.rated + new, key=lambda tab_round: tab_round.number)
+                self.reset()
+            try:
+                self.rate(new)
+            except BaseException:
+                self.reset() # Ratings were changed by the rounds rated before the error
+                if rated_before:
+                    self.rate(rated_before)
+                self.rated = rated_before
+                self.roster = False # Team that isn't on the roster (registered late) is looked up on the next poll
+                raise
+            self.rated.extend(new)
+            self.rated.sort(key=lambda tab_round: tab_round.number)
+        # Rounds file lists every round of the tab, the same as the fetchers write it
+        with open(os.path.join(self.tab_dir, tabrounds.ROUNDS_FILE), 'w', encoding='utf-8') as f:
+            f.write(tabrounds.rounds_text(rounds))
+        metrics.count('live_rounds', len(new))
+        return new
+
+    def rate(self, new:list[tabrounds.TabRound])->None:
+        '''Rates the given rounds on top of the current ratings, rate_tournament rates the rounds listed in the rounds file.'''
+        with open(os.path.join(self.tab_dir, tabrounds.ROUNDS_FILE), 'w', encoding='utf-8') as f:
+            f.write(tabrounds.rounds_text(new))
+        main.rate_tournament(self.elo_debaters, self.tab_dir, None, backend=self.backend, events=self.events, params=self.params,
+                             identities=self.identities, debate_format=self.debate_format, outrounds=True, board=self.board)
+
+    def close(self)->None:
+        self.session.close()
+
+    def change(self, name:str)->float:
+        '''Change of the debater's rating in the rated rounds, 0 for debaters who didn't debate.'''
+        before = self.before[name][0] if name in self.before else 1000
+        return self.elo_debaters[name][0] - before
+
+    def status(self)->dict:
+        '''Rated rounds and polls, as served on /status.'''
+        with self.lock:
+            return {'url': self.url, 'polls': self.polls, 'last_poll': self.last_poll,
+                    'rounds': [tab_round._asdict() for tab_round in self.rated]}
+
+    def standings(self, top:int=20, start:int=0)->list[dict]:
+        '''Best ranked debaters of the whole pool with provisional ratings, as served on /ratings.'''
+        with self.lock:
+            return [{'rank': rank, 'name': name, 'elo': elo, 'debates': debates}
+                    for rank, (name, elo, debates) in enumerate(self.board.top(top, start), start+1)]
+
+    def tournament(self)->list[dict]:
+        '''Debaters of the tournament who debated in the rated rounds, best rated first, with the change of their rating,
+        as served on /tournament.'''
+        with self.lock:
+            names = {event[0] for event in self.events}
+            rows = [{'name': name, 'elo': self.elo_debaters[name][0], 'debates': self.elo_debaters[name][1], 'change': self.change(name),
+                     'rank': self.board.rank(name)} for name in names]
+        rows.sort(key=lambda row: (-row['elo'], row['name']))
+        return rows
+
+def watch(live:LiveTournament, interval:float=60, stop:threading.Event=None, max_polls:int=None)->None:
+    '''Polls the tournament every interval seconds until stop is set or max_polls polls are made.
+    Errors of a poll (tab not reachable, page not released yet) are logged and the next poll tries again.'''
+    stop = stop if stop is not None else threading.Event()
+    polls = 0
+    while not stop.is_set():
+        try:
+            live.poll()
+        except (ConnectionError, OSError, ValueError) as error:
+            log.warning('Poll of %s failed: %s', live.url, error)
+        polls += 1
+        if max_polls is not None and polls >= max_polls:
+            return
+        stop.wait(interval)
+
+def serve(live:LiveTournament, host:str='127.0.0.1', port:int=8000)->ThreadingHTTPServer:
+    '''Makes an HTTP server that serves provisional ratings as JSON, run it with serve_forever (in a thread while watch runs).
+    /status: rated rounds and number of polls
+    /ratings?top=20&start=0: best ranked debaters of the whole pool
+    /tournament: debaters of the tournament with the change of their rating
+    /debater?name=...: rating, rank and percentile of one debater, the name as it appears on the speaker tab'''
+
+    class RatingsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+            try:
+                if parts.path == '/status':
+                    body = live.status()
+                elif parts.path == '/ratings':
+                    body = live.standings(int(query.get('top', 20)), int(query.get('start', 0)))
+                elif parts.path == '/tournament':
+                    body = live.tournament()
+                elif parts.path == '/debater':
+                    body = debater(live, query.get('name', ''))
+                else:
+                    return self.reply(404, {'error': f'Unknown page {parts.path}'})
+            except ValueError as error:
+                return self.reply(400, {'error': str(error)})
+            if body is None:
+                return self.reply(404, {'error': f'{query.get("name")} is not ranked'})
+            self.reply(200, body)
+
+        def reply(self, code:int, body)->None:
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass # Requests aren't logged, polls are
+
+    return ThreadingHTTPServer((host, port), RatingsHandler)
+
+def debater(live:LiveTournament, name:str)->dict:
+    '''Provisional rating of one debater, as served on /debater, None if they aren't ranked.'''
+    name = csvio.clean_name(name)
+    with live.lock:
+        if name not in live.board:
+            return None
+        elo, debates = live.elo_debaters[name]
+        return {'name': name, 'elo': elo, 'debates': debates, 'change': live.change(name),
+                'rank': live.board.rank(name), 'percentile': live.board.percentile(name)}
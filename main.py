@@ -1,10 +1,22 @@
 from operator import itemgetter # Za soritiranje liste listi po vrednosti u podlisti
-import copy # Za pravljenje kopije rečnika
 import csvio as csvio # Uvoz svih mojih funkcija iz csvio.py 
-import webio as webio # Uvoz svih mojih funkcija iz webio.py
+import ratingstore # Čuvanje rejtinga u SQLite bazi
+import leaderboard # Rang lista debatera
+import registry # Kompaktno čuvanje rejtinga velikog broja debatera
+import metrics # Merenje vremena po fazama i brojači
+import formats # Formati debata (BP, WSDC, AP...) i pravljenje parova debatera
+import tabrounds # Runde taba (inrunde i eliminacije), čitaju se kad zatrebaju
+from eloparams import EloParams, DEFAULT_PARAMS # Podešavanja ELO računice
 import datetime
+import os
+import tempfile
+import argparse # Za komandnu liniju
+import dataclasses
+import contextlib
+import logging
 
-version = 123456
+log = logging.getLogger(__name__)
+RATING_TOLERANCE = 1e-6 # Ratings closer than this are the same in recompute_from, so rounding of floats doesn't keep the replay going
 
 def generate_pairs_teams(teams_ranks:dict[str,int], debates_teams:list[set[str]])->list[tuple[str,str]]:
     '''Generate ordered pairs of teams based on ranks. First team in the tuple is the winner, and second the loser.
@@ -29,65 +41,69 @@ def generate_pairs_teams(teams_ranks:dict[str,int], debates_teams:list[set[str]]
     
     return pairs
 
-def generate_pairs_debaters(pairs_teams:list[tuple[str,str]],speakers_teams:dict[str,str])->list[tuple[str,str]]:
+def build_team_roster(speakers_teams:dict[str,str])->dict[str,list[str]]:
+    '''Builds an index of teams and their speakers, so pair generation doesn't have to scan the whole speaker tab for every pair.
+    Should be built once per tournament.
+    Input:
+    speakers_teams, dictionary where speaker name is the key, and team name is the value
+    e.g. {(speakerA->teamA),(speakerB->teamA),(speakerC->teamB)...}
+    Output:
+    dictionary where team name is the key, and value is the list of team's speakers in speaker tab order
+    e.g. {(teamA->[speakerA,speakerB]),(teamB->[speakerC])...}'''
+    team_roster = {}
+    for speaker,team in speakers_teams.items():
+        team_roster.setdefault(team, []).append(speaker)
+    return team_roster
+
+def generate_pairs_debaters(pairs_teams:list[tuple[str,str]],speakers_teams:dict[str,str],
+team_roster:dict[str,list[str]]=None,debate_format:formats.DebateFormat=formats.BP,round_points:dict[str,int]=None)->list[tuple[str,str]]:
     '''
     Inputs:
     pairs_teams, list of tuples where first member is the winner and second the loser
     e.g. [(teamA,teamB),(teamA,teamC),(teamB,teamC)...]; teamA,teamB,teamC are team names
     speakers_teams, dictionary where spekaer name is the key, and team name is the value
     e.g. {(speakerA->teamA),(speakerB->teamB)...}
+    team_roster, optional index made by build_team_roster from speakers_teams,
+    pass it if you are generating pairs for multiple rounds of the same tournament so it isn't rebuilt every time
+    debate_format, format of the tournament (formats.DebateFormat), decides which speakers of a team are paired
+    round_points, speaker points of debaters in the round, needed only for formats whose roster is 'spoke'
     Output:
     pairs_debaters, list of tuples where the first string is the winning debater, and the second losing debater.
     If team A beat team B, it is like every speaker in team A beat every speaker in team B
+    (for BP two speakers of each team, swings and missing speakers are placeholders, see formats.paired_speakers)
     '''
+    if team_roster is None:
+        team_roster = build_team_roster(speakers_teams)
+    rosters = {} # Paired speakers of teams, made once per team
     pairs_debaters = []
-    winners_debaters=[]
-    losers_debaters=[]
     for pair in pairs_teams:
-        winners_debaters = []
-        losers_debaters = []
-        for speaker,team in speakers_teams.items():
-            if team == pair[0]:
-                winners_debaters.append(speakers_teams)
-            elif team == pair[1]:
-                losers_debaters.append(speakers_teams)
-
-        if not losers_debaters: # Swings are usually not on participant list, so we need to add them
-            losers_debaters.append("UNKNOWN SWING 1")
-            losers_debaters.append("UNKNOWN SWING 2")
-        if not winners_debaters:
-            winners_debaters.append("UNKNOWN SWING 1")
-            winners_debaters.append("UNKNOWN SWING 2")
-        if len(winners_debaters)<2:
-            winners_debaters.append("UNKNOWN SINGLE SWING1")
-        if len(losers_debaters)<2:
-            losers_debaters.append("UNKNOWN SINGLE SWING1")
-
-        pairs_debaters.append((winners_debaters[0], losers_debaters[0])) # Add all pairs of debaters for a pair of teams
-        pairs_debaters.append((winners_debaters[1], losers_debaters[1]))
-        pairs_debaters.append((winners_debaters[0], losers_debaters[1]))
-        pairs_debaters.append((winners_debaters[1], losers_debaters[0]))
-        
+        for team in pair:
+            if team not in rosters:
+                rosters[team] = formats.paired_speakers(team_roster.get(team, ()), debate_format, round_points)
+        winners_debaters = rosters[pair[0]]
+        losers_debaters = rosters[pair[1]]
+        for a, b in formats.pairing_order(len(winners_debaters), len(losers_debaters)): # Add all pairs of debaters for a pair of teams
+            pairs_debaters.append((winners_debaters[a], losers_debaters[b]))
     return pairs_debaters
 
-def calculate_k_factor(debater:tuple[float,int])->int:
+def calculate_k_factor(debater:tuple[float,int], params:EloParams=DEFAULT_PARAMS)->int:
     '''Function returns k factor used in determining ELO rating adjustment.
-    Input: tuple where first value is current ELO rating, and second is number of debates so far.
+    Input: tuple where first value is current ELO rating, and second is number of debates so far,
+    and optionally the settings of the calculation (by default base k 30, lowered above 1250 and 1500 rating,
+    multiplied for debaters with fewer than 5, 10 and 20 debates).
     Output: k value'''
     
-    base_k = 30
+    base_k = params.base_k
 
-    if debater[0] > 1500:
-        base_k -= 10
-    elif debater[0] > 1250:
-        base_k -= 5
+    for rating, cut in params.rating_cuts: # Highest rating first
+        if debater[0] > rating:
+            base_k -= cut
+            break
 
-    if debater[1] < 5:
-        base_k *= 3
-    elif debater[1] < 10:
-        base_k *= 2
-    elif debater[1] < 20:
-        base_k *= 1.5
+    for debates, multiplier in params.debate_multipliers: # Fewest debates first
+        if debater[1] < debates:
+            base_k *= multiplier
+            break
 
     return int(base_k)
 
@@ -108,7 +124,64 @@ def find_partner(debater:str, speakers:dict[str, (str, list[int], float)])->str:
             return name
     return debater # If there is no partner, they debated alone, with themselves
 
-def apply_speaker_modifier(debater:str, speakers:dict[str, (str, list[int], float)], winner:bool, round_no:int)->float:
+def build_partner_map(speakers:dict[str, (str, list[int], float)])->dict[str,str]:
+    '''Function finds partners of all debaters on the speaker tab at once, so they don't have to be searched for every pair.
+    Partners are the same as the ones find_partner returns.
+    Inputs:
+    speakers: dictionary where the key is speaker name, and value is tuple
+    where the first element is team name, second is list of speaker points, and third is avg. speaker
+    Outputs:
+    dictionary where the key is debater's name, and value is partner's name (debater's own name if they debated alone)'''
+    team_members = {}
+    for name, data in speakers.items():
+        team_members.setdefault(data[0], []).append(name)
+    partners = {}
+    for members in team_members.values():
+        for name in members:
+            partners[name] = name # If there is no partner, they debated alone, with themselves
+            for other in members:
+                if other != name: # First teammate in speaker tab order, same as find_partner
+                    partners[name] = other
+                    break
+    return partners
+
+def build_speaker_deltas(speakers:dict[str, (str, list[int], float)], partners:dict[str,str]=None)->list[dict[str,int]]:
+    '''Function calculates deltas between partners' speaker points for every round of the tournament.
+    Should be built once per tournament, after the speaker tab is loaded.
+    Inputs:
+    speakers: dictionary where the key is speaker name, and value is tuple
+    where the first element is team name, second is list of speaker points, and third is avg. speaker
+    partners: optional partner map made by build_partner_map from the same speakers
+    Outputs:
+    list where element i is a dictionary for round i+1, whose keys are debaters' names and values are
+    their speaker points minus their partner's speaker points in that round'''
+    if partners is None:
+        partners = build_partner_map(speakers)
+    speaker_deltas = []
+    for name, data in speakers.items():
+        partner_points = speakers[partners[name]][1]
+        for i in range(min(len(data[1]), len(partner_points))):
+            if i == len(speaker_deltas):
+                speaker_deltas.append({})
+            speaker_deltas[i][name] = data[1][i] - partner_points[i]
+    return speaker_deltas
+
+def speaker_modifier(delta_speak:int, winner:bool, params:EloParams=DEFAULT_PARAMS)->float:
+    '''Function returns a modifier between 0,1 and 2 based on difference between debater's and partner's speaker points.
+    Inputs:
+    delta_speak: debater's speaker points minus partner's speaker points
+    winner: boolean that signifies whether the debater whose modifier we are calculating won or lost.
+    params: settings of the calculation, speaker_scale, modifier_max and modifier_floor are used'''
+    # If debater wins, we want to increase ELO impact if debater outspoke the partner, and decrease it if debater was outspoken
+    # If debater loses, we want to decrease ELO impact if debater outspoke the partner, and increase it if debater was outspoken
+    preelim_modifier = 1+(delta_speak/params.speaker_scale) if winner else 1-(delta_speak/params.speaker_scale)
+
+    if preelim_modifier > params.modifier_max: return params.modifier_max
+    if preelim_modifier < 0: return params.modifier_floor
+    return preelim_modifier
+
+def apply_speaker_modifier(debater:str, speakers:dict[str, (str, list[int], float)], winner:bool, round_no:int,
+speaker_deltas:list[dict[str,int]]=None, params:EloParams=DEFAULT_PARAMS)->float:
     '''Function returns a modifier between 0,1 and 2 based on speaker points.
     Inputs:
     debater: debater's sanitized name
@@ -116,110 +189,861 @@ def apply_speaker_modifier(debater:str, speakers:dict[str, (str, list[int], floa
     first member of a tuple is team name, second member is list of speaker points by rounds, 
     and third is the average speaker.
     winner: boolean that signifies whether the debater whose modifier we are calculating won or lost.
-    round_no: number of the round for which we are calculating the modifier'''
+    round_no: number of the round for which we are calculating the modifier
+    speaker_deltas: optional table made by build_speaker_deltas from the same speakers,
+    if it is given partner isn't searched for and the delta is just looked up
+    params: settings of the calculation, see speaker_modifier'''
     
     if debater not in speakers:
         return 1.0  # If debater isn't on the list of spekaers (most likely a swing), we return 1.0, not changing anything
+    if round_no > (len(speaker_deltas) if speaker_deltas is not None else len(speakers[debater][1])):
+        return 1.0  # Outrounds have no speaker points
 
     # Delta between partners' speaker points.
     # Positive delta means that a given debater outspoke their partner
     # Negative delta means that a given debater was outspoken by their parnter
-    delta_speak = speakers[debater][1][round_no-1] - speakers[find_partner(debater,speakers)][1][round_no-1]
-
-    # If debater wins, we want to increase ELO impact if debater outspoke the partner, and decrease it if debater was outspoken
-    # If debater loses, we want to decrease ELO impact if debater outspoke the partner, and increase it if debater was outspoken
-    preelim_modifier = 1+(delta_speak/10) if winner else 1-(delta_speak/10)
+    if speaker_deltas is not None:
+        delta_speak = speaker_deltas[round_no-1][debater]
+    else:
+        delta_speak = speakers[debater][1][round_no-1] - speakers[find_partner(debater,speakers)][1][round_no-1]
 
-    if preelim_modifier > 2: return 2
-    if preelim_modifier < 0: return 0.1
-    return preelim_modifier
+    return speaker_modifier(delta_speak, winner, params)
  
     
-def calculate_elo(pairs_debaters:list[tuple[str,str]], elo_debaters:dict[str,(float,int)],speaker_pts:dict[str, (str, list[int], float)], round_no:int)->dict[str,(float,int)]:
-    '''Function calculates and returns new ELO ratings.
+def elo_updates(pairs_debaters:list[tuple[str,str]], elo_debaters:dict[str,(float,int)],speaker_pts:dict[str, (str, list[int], float)], round_no:int,
+speaker_deltas:list[dict[str,int]]=None, events:list=None, params:EloParams=DEFAULT_PARAMS, weight:float=1.0)->dict[str,(float,int)]:
+    '''Function calculates new ELO ratings of debaters from one round, without copying the rankings.
     Throws value error if loser gains rating or winner loses rating.
     Inputs: 
     pairs_debaters: list of tuples where the first debater won over second debater
     elo_debaters: dictionary with keys being sanitized debater names, and values being
     tuples where first member is current ELO rating and second member is number of debates debated so far
+    (or registry.DebaterRegistry), it isn't changed
     speaker_pts: dictionary with names of debaters as keys, and tuples as values,
     first member of the tuple is name of the eteam, second is list of speakers by rounds, and third is avg. speaker
+    (or registry.PointsTable)
+    speaker_deltas: optional table made by build_speaker_deltas from speaker_pts (or registry.PointsTable.deltas), built here if it isn't given
+    events: optional list to which a rating change is appended for every debater whose rating changed, as a tuple
+    (name, round_no, ELO before, ELO after, number of debates after, k factor, speaker modifier), see ratingstore.RatingStore.save
+    params: settings of the calculation (k factors, speaker modifier), see eloparams.EloParams
+    weight: every rating change of the round is multiplied by it, see eloparams.EloParams.round_weight
     Outputs:
-    dictionary in the same format as elo_debaters, as these are updated rankings.'''
-    new_elo_debaters = copy.deepcopy(elo_debaters)  # Copy of the original dictionary so we don't change the original
-    print('lolcina')
-    print(elo_debaters)
-    print('lolcina')
+    dictionary in the same format as elo_debaters, only with debaters whose rating changed in this round,
+    elo_debaters.update(result) gives updated rankings.'''
+    if speaker_deltas is None:
+        speaker_deltas = build_speaker_deltas(speaker_pts)
+    # Deltas of the round are looked up once, None in rounds without speaker points (outrounds), see apply_speaker_modifier
+    round_deltas = speaker_deltas[round_no-1] if round_no <= len(speaker_deltas) else None
+    applied = {} # k factor and speaker modifier of the update that was applied last for every debater, for events
+    new_elo_debaters = {} # Only changed debaters, ratings before the round stay in elo_debaters
+    debug = log.isEnabledFor(logging.DEBUG) # Checked once, so there is no logging work per pair unless it's enabled
+    swings = 0
     for pair in pairs_debaters:
         winner = pair[0]
         loser = pair[1]
-        print(winner)
-        print(loser)
         k_winner = 1
         k_loser = 1
     
-        if winner not in elo_debaters.keys(): #  Meaning winner isn't already on the list of debaters, most likely a swing
-            print('nevirujem')
+        if winner not in elo_debaters: #  Meaning winner isn't already on the list of debaters, most likely a swing
+            swings += 1
             elo_winner = 1000  # Default assumed ELO rating
             k_winner = 0 
         else:   
             elo_winner = elo_debaters[winner][0]
-            k_winner = calculate_k_factor(elo_debaters[winner])
+            k_winner = calculate_k_factor(elo_debaters[winner], params)
 
-        if loser not in elo_debaters.keys():
-            print('nevirujem')
+        if loser not in elo_debaters:
+            swings += 1
             elo_loser = 1000
             k_loser = 0
         else: 
             elo_loser = elo_debaters[loser][0]
-            k_loser = calculate_k_factor(elo_debaters[loser])
+            k_loser = calculate_k_factor(elo_debaters[loser], params)
 
-        delta_winner = 1 - (1 / (1 + 10 ** ((elo_winner - elo_loser) / 400))) # ELO mathematical formula
-        delta_loser = 1 - (1 / (1 + 10 ** ((elo_winner - elo_loser) / 400)))
+        delta_winner = 1 - (1 / (1 + 10 ** ((elo_winner - elo_loser) / params.rating_scale))) # ELO mathematical formula
+        delta_loser = 1 - (1 / (1 + 10 ** ((elo_winner - elo_loser) / params.rating_scale)))
         
-        delta_winner *= k_winner*apply_speaker_modifier(winner,speaker_pts,True,round_no)
-        delta_loser *= k_loser*apply_speaker_modifier(loser,speaker_pts,False,round_no)
+        delta_speak_winner = round_deltas.get(winner) if round_deltas is not None else None # None for swings
+        delta_speak_loser = round_deltas.get(loser) if round_deltas is not None else None
+        modifier_winner = speaker_modifier(delta_speak_winner, True, params) if delta_speak_winner is not None else 1.0
+        modifier_loser = speaker_modifier(delta_speak_loser, False, params) if delta_speak_loser is not None else 1.0
+        delta_winner *= k_winner*modifier_winner*weight
+        delta_loser *= k_loser*modifier_loser*weight
         if delta_winner < 0 or delta_loser < 0:
             raise ValueError(f'Winner or loser delta below 0!\nloser={delta_loser} winner={delta_winner}')
         
         new_elo_winner = elo_winner + delta_winner # new elo equals old one plus difference calculated by the formula
         new_elo_loser = elo_loser - delta_loser # delta is always positive, so the loser gets delta subtracted from old elo
-        print(new_elo_loser)
-        print(new_elo_winner)
+        if debug:
+            log.debug('round %d: %s %.1f -> %.1f beat %s %.1f -> %.1f', round_no, winner, elo_winner, new_elo_winner, loser, elo_loser, new_elo_loser)
         #Update the ELO of debaters by assigning new ELO value and incrementing number of debates had so far
-        if winner in elo_debaters.keys():             
+        if winner in elo_debaters:             
             new_elo_debaters[winner]=(new_elo_winner, elo_debaters[winner][1]+1)
-        if loser in elo_debaters.keys(): 
+            applied[winner] = (k_winner, modifier_winner)
+        if loser in elo_debaters: 
             new_elo_debaters[loser]=(new_elo_loser, elo_debaters[loser][1]+1) # Ažuriramo ELO rejting gubitnika
-    
+            applied[loser] = (k_loser, modifier_loser)
+    if events is not None:
+        for name, (k, modifier) in applied.items():
+            events.append((name, round_no, elo_debaters[name][0], new_elo_debaters[name][0], new_elo_debaters[name][1], k, modifier))
+    metrics.count('swings_defaulted', swings) # Debaters who weren't rated, with default rating and k factor 0
+    return new_elo_debaters
+
+def calculate_elo(pairs_debaters:list[tuple[str,str]], elo_debaters:dict[str,(float,int)],speaker_pts:dict[str, (str, list[int], float)], round_no:int,
+speaker_deltas:list[dict[str,int]]=None, events:list=None, params:EloParams=DEFAULT_PARAMS)->dict[str,(float,int)]:
+    '''Function calculates and returns new ELO ratings, inputs are the same as in elo_updates.
+    Original dictionary isn't changed, the new one is its shallow copy (ratings are tuples, so nothing is shared that could change)
+    with updates of this round applied.
+    Outputs:
+    dictionary in the same format as elo_debaters, as these are updated rankings.'''
+    new_elo_debaters = dict(elo_debaters)
+    new_elo_debaters.update(elo_updates(pairs_debaters, elo_debaters, speaker_pts, round_no, speaker_deltas, events, params))
     return new_elo_debaters
 
+def rate_tournament(elo_debaters:dict[str,(float,int)],tab_dir:str='tournament_files',num_of_rounds:int=5,
+spk_file:str='speakers.csv',backend:str='python',events:list=None,params:EloParams=DEFAULT_PARAMS,ready=None,identities=None,
+debate_format='bp',outrounds=None,board:leaderboard.Leaderboard=None)->dict[str,(float,int)]:
+    '''Apply ELO calculation to participants of a tournament whose tab is already downloaded. Nothing is read from or written to the ELO file.
+    Inputs:
+    elo_debaters: current ELO rankings (dictionary or registry.DebaterRegistry), updated in place round by round,
+    debaters from the speaker tab who aren't in them are added
+    tab_dir: directory with the files of the tournament, in the format webio.download_whole_tournament writes them
+    num_of_rounds: number of the inrounds of the tournament, None for all inrounds of the tab
+    spk_file: name of the file in which speaker tab is located
+    backend: 'python' to calculate ELO with elo_updates, 'numpy' to calculate it with arrays (eloarray module, needs NumPy)
+    events: optional list to which rating changes of every round are appended, see elo_updates
+    params: settings of the calculation, see eloparams.EloParams
+    ready: optional function called with the name of every file before it is read, which waits until the file is in tab_dir,
+    so rounds can be rated while the next ones are still being downloaded (see pipeline.TabFeed.ready)
+    identities: optional identity.Resolver, names from the speaker tab are resolved to debaters already in elo_debaters
+    (typos, swapped name and surname), otherwise a name is the same debater only if it's exactly the same
+    debate_format: format of the tournament, name or formats.DebateFormat ('bp', 'wsdc', 'ap', 'open'), see formats
+    outrounds: None to rate only the inrounds, True or empty list for all outrounds, or list of the break categories
+    whose outrounds are rated; rounds are read one by one as they are rated, see tabrounds.iter_rounds,
+    and rating changes of outrounds are weighted by params.round_weight of their stage
+    board: optional leaderboard.Leaderboard of elo_debaters, kept current: debaters added from the speaker tab are ranked,
+    and rating changes of every round are applied to it after the round
+    Outputs:
+    elo_debaters, with updated rankings'''
+    if backend not in ('python', 'numpy'):
+        raise ValueError(f'Unknown ELO backend {backend}!')
+    debate_format = formats.get_format(debate_format)
+    if ready is not None:
+        ready(spk_file)
+    with metrics.stage('parse'):
+        speaker_tab = csvio.load_speaker_tab(os.path.join(tab_dir, spk_file),no_of_rounds=num_of_rounds) # Reads speaker tab once
+    if identities is not None:
+        speaker_tab.names = identities.rename(speaker_tab.names, elo_debaters) # Same debater with a differently written name
+    speaker_tab.add_to_elo(elo_debaters) # Adds debaters who aren't on the ELO list currently to the ELO list
+    speakers_teams = speaker_tab.speaker_teams() # Speaker names and their team names
+    if board is not None:
+        for name in speakers_teams:
+            if name not in board:
+                board.update(name, *elo_debaters[name])
+    speaker_pts = registry.PointsTable.from_speaker_tab(speaker_tab) # Speaker points by rounds, packed in one array
+    with metrics.stage('pairs'):
+        team_roster = build_team_roster(speakers_teams) # Index of speakers by team, same for every round
+        rosters = formats.team_rosters(team_roster, debate_format) # Paired speakers of every team, 'spoke' formats change them every round
+        speaker_deltas = speaker_pts.deltas() # Partners' speaker point deltas for every round, packed the same way
+    metrics.count('debaters', len(speakers_teams))
+    elo_state = None
+    if backend == 'numpy':
+        import eloarray # Imported only when used, so NumPy isn't needed for the default backend
+        elo_state = eloarray.EloArrays.from_dict(elo_debaters) # Ratings stay in arrays for the whole tournament
+
+    no_of_rounds = 0
+    for tab_round in tabrounds.iter_rounds(tab_dir, num_of_rounds, outrounds, ready): # For each round, found as it is needed
+        i = tab_round.number
+        ranks_file, debates_file = tab_round.file_names()
+        if ready is not None: # Round files of the tab can still be downloading
+            ready(ranks_file)
+            ready(debates_file)
+        with metrics.stage('parse'):
+            teams_ranks = csvio.load_team_ranks(os.path.join(tab_dir, ranks_file)) # Loads rankings of each team for a given round
+            debates_teams = csvio.load_debates(os.path.join(tab_dir, debates_file)) # Loads data about which teams debated which teams on a given round
+        with metrics.stage('pairs'):
+            ranked = formats.rank_debates(teams_ranks, debates_teams, debate_format) # Teams of every debate in the order of places
+            if debate_format.roster == 'spoke':
+                rosters = formats.team_rosters(team_roster, debate_format, speaker_pts.round_points(i))
+            if elo_state is not None: # Pairs as arrays of ids, made in one pass over the whole round
+                winner_ids, loser_ids = eloarray.expand_pairs(*eloarray.round_arrays(ranked, rosters, elo_state, debate_format.speakers))
+                no_of_pairs = len(winner_ids)
+            else:
+                pairs_debaters = formats.expand_round(ranked, rosters, debate_format) # Every debater beat every debater of teams placed below
+                no_of_pairs = len(pairs_debaters)
+        metrics.count('pairs', no_of_pairs)
+        weight = params.round_weight(tab_round.stage) # Inrounds have weight 1
+        round_events = [] if events is not None or board is not None else None
+        with metrics.stage('elo'):
+            if elo_state is not None:
+                round_deltas = speaker_deltas[i-1] if i <= len(speaker_deltas) else {}
+                eloarray.calculate_elo_ids(winner_ids, loser_ids, elo_state, eloarray.delta_array(elo_state, round_deltas), i, round_events, params, weight)
+            else:
+                elo_debaters.update(elo_updates(pairs_debaters, elo_debaters,speaker_pts,i,speaker_deltas,round_events,params,weight)) # Apply new ELOs of the round
+        if events is not None:
+            events.extend(round_events)
+        if board is not None:
+            for event in round_events:
+                board.apply_event(event)
+        no_of_rounds += 1
+        if tab_round.stage != 'inround':
+            metrics.count('outrounds')
+    if elo_state is not None:
+        elo_debaters.update(elo_state.to_dict())
+    metrics.count('tournaments')
+    log.info('Rated %s: %d debaters in %d rounds', tab_dir, len(speakers_teams), no_of_rounds)
+    return elo_debaters
+
+def tournament_file_names(num_of_rounds:int)->list[str]:
+    '''Names of the files download_tournament writes for a tournament with given number of the inrounds.'''
+    file_names = ['speakers.csv']
+    for i in range(1,num_of_rounds+1):
+        file_names.append(f'teams_ranks_round_{i}.csv')
+        file_names.append(f'teams_debates_round_{i}.csv')
+    return file_names
+
+def cached_tab(cache,url:str,num_of_rounds:int=5,outrounds=None)->dict[str,str]:
+    '''Returns files of a tab from the cache (see tabcache.TabCache.get_tournament), or None if any of them isn't cached.
+    If the rounds of the tab are looked up (see tabrounds.discovered), the files of the rated rounds are taken
+    from the cached list of its rounds (tabrounds.ROUNDS_FILE).'''
+    if cache is None:
+        return None
+    if not tabrounds.discovered(num_of_rounds, outrounds):
+        return cache.get_tournament(url, tournament_file_names(num_of_rounds))
+    rounds_text = cache.get(url, tabrounds.ROUNDS_FILE)
+    if rounds_text is None:
+        return None
+    file_names = [tabrounds.ROUNDS_FILE, 'speakers.csv']
+    for tab_round in tabrounds.select_rounds(tabrounds.parse_rounds(rounds_text), num_of_rounds, outrounds):
+        file_names.extend(tab_round.file_names())
+    return cache.get_tournament(url, file_names)
+
+def fetch_options(outrounds=None)->dict:
+    '''Keyword arguments of the fetchers' download functions, outrounds is given only when they are rated.'''
+    return {} if outrounds is None else {'outrounds': outrounds}
+
+def import_fetcher(fetcher:str):
+    '''Imports the module that downloads tabs only when something is downloaded, so rating from files
+    doesn't load Selenium and the browser drivers.
+    Outputs:
+    webio module for 'selenium' fetcher, tabhttp module for 'http' fetcher'''
+    if fetcher == 'selenium':
+        import webio # Uvoz svih mojih funkcija iz webio.py, učitava Selenium
+        return webio
+    if fetcher == 'http':
+        import tabhttp
+        return tabhttp
+    raise ValueError(f'Unknown fetcher {fetcher}!')
+
+def write_tab_files(files:dict[str,str],out_dir:str)->None:
+    '''Writes files of a tab (as tabcache.TabCache.get_tournament returns them) to out_dir.'''
+    os.makedirs(out_dir, exist_ok=True)
+    for file_name, content in files.items():
+        with open(os.path.join(out_dir, file_name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+def download_tournament(url:str,num_of_rounds:int=5,fetcher:str='selenium',cache=None,out_dir:str='tournament_files',
+outrounds=None)->None:
+    '''Downloads all files needed for ELO calculation to out_dir.
+    Inputs:
+    url: URL of the tournament tab (only tabbycat URLs supported currently)
+    num_of_rounds: number of the inrounds of the tournament, None for all inrounds of the tab
+    fetcher: 'selenium' to copy CSVs through Chrome (webio module), 'http' to download pages without a browser (tabhttp module)
+    cache: optional tabcache.TabCache, if the whole tab is already in it nothing is downloaded
+    out_dir: directory the files are written to
+    outrounds: None to download only the inrounds, otherwise which outrounds are downloaded, see rate_tournament'''
+    if fetcher not in ('selenium', 'http'):
+        raise ValueError(f'Unknown fetcher {fetcher}!')
+    with metrics.stage('download'):
+        if cache is not None:
+            files = cached_tab(cache, url, num_of_rounds, outrounds)
+            if files is not None:
+                log.info('Tab of %s taken from the cache', url)
+                metrics.count('cache_hits')
+                write_tab_files(files, out_dir)
+                return
+        fetch_module = import_fetcher(fetcher) # Not cached, or cached only partially
+        log.info('Downloading %s', url)
+        if cache is None:
+            os.makedirs(out_dir, exist_ok=True)
+            fetch_module.download_whole_tournament(url,num_of_rounds,out_dir=out_dir,**fetch_options(outrounds))
+            metrics.count('tabs_downloaded')
+            return
+        files = fetch_module.fetch_whole_tournament(url,num_of_rounds,**fetch_options(outrounds))
+        cache.put_tournament(url, files)
+        metrics.count('tabs_downloaded')
+        write_tab_files(files, out_dir)
+
+def restore_tournament(url:str,num_of_rounds:int,cache,out_dir:str,outrounds=None)->None:
+    '''Writes a tab from the cache to out_dir without downloading anything.
+    Throws ValueError if the whole tab isn't in the cache (fetch it first).'''
+    files = cached_tab(cache, url, num_of_rounds, outrounds)
+    if files is None:
+        raise ValueError(f'Tab of {url} is not in the cache, fetch it first!')
+    metrics.count('cache_hits')
+    write_tab_files(files, out_dir)
+
+def load_ratings(elo_file:str)->tuple[dict[str,(float,int)],ratingstore.RatingStore]:
+    '''Loads current ELO rankings from a CSV file, or from a rating store if the file name ends with .db or .sqlite.
+    Outputs:
+    tuple where first member is the rankings dictionary and second is the opened RatingStore (None for CSV files)'''
+    if ratingstore.is_store(elo_file):
+        store = ratingstore.RatingStore(elo_file)
+        return store.load(), store
+    return csvio.load_debater_elo(elo_file), None
+
+def save_ratings(elo_debaters:dict[str,(float,int)],elo_file:str,store:ratingstore.RatingStore=None,tournament:str=None)->None:
+    '''Saves ELO rankings loaded by load_ratings. Rating store writes only debaters who changed,
+    and keeps them as the snapshot of the tournament (of an import if it isn't given); CSV file is rewritten whole.'''
+    if store is not None:
+        store.save(elo_debaters, tournament)
+    else:
+        csvio.export_debater_elo(elo_debaters, elo_file)
+
+def enter_tab(tab_dir:str,tournament:str,num_of_rounds:int=5,spk_file:str='speakers.csv',new_elo_file:str='elo.csv',
+backend:str='python',archive_dir:str='tournament_files',identities=None,debate_format='bp',outrounds=None,
+params:EloParams=DEFAULT_PARAMS,board:leaderboard.Leaderboard=None)->dict[str,(float,int)]:
+    '''Applies ELO calculation to participants of an already downloaded tab and saves the new ratings.
+    Inputs:
+    tab_dir: directory with the files of the tournament, see rate_tournament
+    tournament: name of the tournament (its URL) under which the rating store keeps the changes
+    new_elo_file: CSV file or rating store (.db) with current rankings where updated ones are saved, see load_ratings
+    archive_dir: directory where a copy of the updated CSV file is kept for archival purposes
+    identities: optional identity.Resolver, see rate_tournament, its alias table is saved with the ratings
+    debate_format, outrounds, params: see rate_tournament
+    board: optional leaderboard.Leaderboard of the ratings in new_elo_file, kept current, see rate_tournament
+    other inputs are the same as in enter_tournament
+    Outputs:
+    updated rankings dictionary'''
+    if backend not in ('python', 'numpy'):
+        raise ValueError(f'Unknown ELO backend {backend}!')
+    with metrics.stage('load'):
+        elo_debaters, store = load_ratings(new_elo_file) # Loads existing rankings
+    log.info('Loaded %d ratings from %s', len(elo_debaters), new_elo_file)
+    events = [] if store is not None else None # Rating changes are logged only in a rating store
+    elo_debaters = rate_tournament(elo_debaters,tab_dir,num_of_rounds,spk_file,backend,events,params=params,identities=identities,
+                                   debate_format=debate_format,outrounds=outrounds,board=board)
+    with metrics.stage('export'):
+        if identities is not None:
+            identities.aliases.save()
+        if store is not None:
+            store.save(elo_debaters, tournament, events, held_on=datetime.date.today().isoformat()) # Only changes, as the tournament's snapshot
+            store.close()
+        else:
+            csvio.export_debater_elo(elo_debaters, new_elo_file) # Export new elos to a file
+            archive_time = datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f') # Unique, so earlier archives aren't overwritten
+            os.makedirs(archive_dir, exist_ok=True)
+            csvio.export_debater_elo(elo_debaters, os.path.join(archive_dir, f'new_elo_file_{archive_time}.csv')) # Additional file for archival purposes
+    log.info('Saved %d ratings to %s', len(elo_debaters), new_elo_file)
+    return elo_debaters
+
+def rate_source(source:str,num_of_rounds:int=5,new_elo_file:str='elo.csv',backend:str='python',cache=None,identities=None,debate_format='bp',
+outrounds=None,params:EloParams=DEFAULT_PARAMS)->None:
+    '''Applies a tournament to the ELO file without downloading anything, see enter_tab.
+    Inputs:
+    source: tab directory, or URL of the tournament whose tab is in the cache (see restore_tournament)
+    other inputs are the same as in enter_tournament'''
+    if not source.startswith(('http://', 'https://')):
+        enter_tab(source,source,num_of_rounds,new_elo_file=new_elo_file,backend=backend,identities=identities,debate_format=debate_format,
+                  outrounds=outrounds,params=params)
+        return
+    with tempfile.TemporaryDirectory() as tab_dir:
+        restore_tournament(source,num_of_rounds,cache,tab_dir,outrounds)
+        enter_tab(tab_dir,source,num_of_rounds,new_elo_file=new_elo_file,backend=backend,identities=identities,debate_format=debate_format,
+                  outrounds=outrounds,params=params)
+
 def enter_tournament(url:str,num_of_rounds:int=5,
-spk_file:str='speakers.csv',new_elo_file:str='elo.csv')->None:
+spk_file:str='speakers.csv',new_elo_file:str='elo.csv',backend:str='python',fetcher:str='selenium',cache=None,identities=None,debate_format='bp',
+outrounds=None,params:EloParams=DEFAULT_PARAMS)->None:
     '''Enter all results for given number of rounds and apply ELO calculation to participants.
     Inputs:
     url: URL of the tournament tab (only tabbycat URLs supported currently)
-    num_of_rounds: number of the inrounds of the tournament (outrounds not supported currently)
+    num_of_rounds: number of the inrounds of the tournament, None for all inrounds of the tab
     spk_file: name of the file in which speaker tab is located
-    new_elo_file: name of the file where updated ELO rankings will be outputed, must be the same file where current rankings are'''
-    global version
-    version+=1
-    elo_debaters = csvio.load_debater_elo(new_elo_file) # Loads existing rankings
-    print(elo_debaters)
-    webio.download_whole_tournament(url,num_of_rounds) # Downloads all files needed for ELO calculation
-    csvio.add_debaters(elo_debaters,f'tournament_files/{spk_file}') # Adds debaters who aren't on the ELO list currently to the ELO list
-    print(elo_debaters)
-    speakers_teams = csvio.load_teams_participants(spk_file,no_of_rounds=num_of_rounds) # Loads speaker names and their team names
-    speaker_pts= csvio.uvezi_spikere(f'tournament_files/{spk_file}',no_of_rounds=num_of_rounds) # Loads speaker tab
-
-    for i in range(1,num_of_rounds+1): # For each round 
-        teams_ranks = csvio.load_team_ranks(f'tournament_files/teams_ranks_round_{i}.csv',alt_instit=True) # Loads rankings of each team for a given round
-        debates_teams = csvio.load_debates(f'tournament_files/teams_debates_round_{i}.csv') # Loads data about which teams debated which teams on a given round
-        pairs_teams = generate_pairs_teams(teams_ranks, debates_teams) # Makes pairs of each two teams based on debate with four teams.
-        pairs_debaters = generate_pairs_debaters(pairs_teams,speakers_teams) # Makes pairs of debaters from different teams based on two teams
-        elo_debaters= calculate_elo(pairs_debaters, elo_debaters,speaker_pts,i) # Calculate new ELOs
-    print(elo_debaters)
-    csvio.export_debater_elo(elo_debaters, new_elo_file) # Export new elos to a file
-    csvio.export_debater_elo(elo_debaters, f'tournament_files/new_elo_file_{version}.csv') # Additional file for archival purposes
-
-enter_tournament('https://opencommunication2025.calicotab.com/prva2025/')
\ No newline at end of file
+    new_elo_file: name of the file where updated ELO rankings will be outputed, must be the same file where current rankings are,
+    CSV file or rating store (.db), see load_ratings
+    backend: 'python' to calculate ELO with calculate_elo, 'numpy' to calculate it with arrays (eloarray module, needs NumPy)
+    fetcher: 'selenium' or 'http', see download_tournament
+    cache: optional tabcache.TabCache, see download_tournament
+    identities: optional identity.Resolver, see rate_tournament
+    debate_format: format of the tournament ('bp', 'wsdc', 'ap' or 'open'), see rate_tournament
+    outrounds: None to rate only the inrounds, True or empty list for all outrounds, or list of the break categories whose outrounds are rated
+    params: settings of the calculation, see eloparams.EloParams, round_weights give the weights of outrounds'''
+    if backend not in ('python', 'numpy'):
+        raise ValueError(f'Unknown ELO backend {backend}!')
+    formats.get_format(debate_format) # Unknown format is reported before the download
+    download_tournament(url,num_of_rounds,fetcher,cache,outrounds=outrounds) # Downloads all files needed for ELO calculation
+    enter_tab('tournament_files',url,num_of_rounds,spk_file,new_elo_file,backend,identities=identities,debate_format=debate_format,
+              outrounds=outrounds,params=params)
+
+def load_manifest(file_name:str)->list[tuple[str,int,str]]:
+    '''Loads a season manifest, a list of tournaments in the order they were held.
+    Every line of the file is the source of the tournament (tournament URL or directory with an already downloaded tab),
+    optionally number of the inrounds (empty for all inrounds of the tab) and the date the tournament was held (YYYY-MM-DD),
+    separated by tabs.
+    Empty lines and lines starting with # are ignored.
+    Inputs:
+    file_name: name of the manifest file
+    Outputs:
+    list of tuples where first member is the source, second is number of the inrounds and third is the date (None if not given)'''
+    tournaments = []
+    with open(file_name, encoding='utf-8') as manifest:
+        for line_no, line in enumerate(manifest, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split('\t')
+            if len(parts) > 3:
+                raise ValueError(f'Line {line_no} of {file_name} should be source, number of rounds and date separated by tabs!')
+            num_of_rounds = int(parts[1]) if len(parts) > 1 and parts[1].strip() else None
+            held_on = None
+            if len(parts) == 3:
+                held_on = datetime.date.fromisoformat(parts[2].strip()).isoformat()
+            tournaments.append((parts[0].strip(), num_of_rounds, held_on))
+    return tournaments
+
+def downloaded_tabs(tournaments:list[tuple[str,int,str]],fetcher:str='selenium',cache=None,outrounds=None):
+    '''Generator over tournaments of a manifest which downloads every tab given by URL to tournament_files before giving it,
+    same tuples as pipeline.TabPipeline gives (without the ready function, the whole tab is already there).'''
+    for source, num_of_rounds, held_on in tournaments:
+        tab_dir = source
+        if source.startswith(('http://', 'https://')):
+            download_tournament(source,num_of_rounds,fetcher,cache,outrounds=outrounds)
+            tab_dir = 'tournament_files'
+        yield source, num_of_rounds, held_on, tab_dir, None
+
+def replay_season(manifest_file:str,new_elo_file:str='elo.csv',checkpoint_every:int=0,
+spk_file:str='speakers.csv',backend:str='python',fetcher:str='selenium',cache=None,prefetch:int=0,identities=None,
+debate_format='bp',outrounds=None,params:EloParams=DEFAULT_PARAMS,board:leaderboard.Leaderboard=None)->dict[str,(float,int)]:
+    '''Enter all tournaments from a manifest (see load_manifest) in order. ELO file is loaded once, rankings are kept in memory
+    between tournaments, and written at the end (and after every checkpoint_every tournaments, if it isn't 0).
+    Tournaments given by URL are downloaded to tournament_files first, directories are read as they are.
+    If new_elo_file is a rating store, changes are saved after every tournament, since only changed debaters are written.
+    Inputs:
+    manifest_file: name of the manifest file
+    new_elo_file: name of the file where updated ELO rankings will be outputed, must be the same file where current rankings are
+    checkpoint_every: number of tournaments after which rankings are written to new_elo_file, 0 to write only at the end
+    spk_file: name of the file in which speaker tab is located, same for all tournaments
+    backend: 'python' or 'numpy', see rate_tournament
+    fetcher: 'selenium' or 'http', see download_tournament
+    cache: optional tabcache.TabCache, see download_tournament
+    prefetch: number of tournaments downloaded ahead in a background thread while the ones before them are rated (see pipeline.TabPipeline),
+    0 to download every tournament before rating it
+    identities: optional identity.Resolver, see rate_tournament, its alias table is saved whenever ratings are
+    debate_format: format of all tournaments of the season, see rate_tournament
+    outrounds, params: same for all tournaments of the season, see rate_tournament
+    board: optional leaderboard.Leaderboard of the ratings in new_elo_file, kept current through the season, see rate_tournament
+    Outputs:
+    final ELO rankings (registry.DebaterRegistry), same as the ones written to new_elo_file'''
+    tournaments = load_manifest(manifest_file)
+    formats.get_format(debate_format) # Unknown format is reported before anything is loaded
+    with metrics.stage('load'):
+        elo_debaters, store = load_ratings(new_elo_file) # Loads existing rankings, only once for the whole season
+        elo_debaters = registry.DebaterRegistry(elo_debaters) # Kept in arrays between tournaments, the pool only grows
+    if prefetch:
+        import pipeline # Imported only when used
+        tabs = pipeline.TabPipeline(tournaments,fetcher,cache,tournaments_ahead=prefetch,outrounds=outrounds)
+    else:
+        tabs = downloaded_tabs(tournaments,fetcher,cache,outrounds)
+    with contextlib.closing(tabs): # Stops the download thread if rating fails
+        for count, (source, num_of_rounds, held_on, tab_dir, ready) in enumerate(tabs, start=1):
+            events = [] if store is not None else None
+            elo_debaters = rate_tournament(elo_debaters,tab_dir,num_of_rounds,spk_file,backend,events,params=params,ready=ready,identities=identities,
+                                           debate_format=debate_format,outrounds=outrounds,board=board)
+            with metrics.stage('export'):
+                if store is not None:
+                    store.save(elo_debaters, source, events, held_on) # Only debaters who changed are written, as the tournament's snapshot
+                elif checkpoint_every and count % checkpoint_every == 0 and count != len(tournaments):
+                    csvio.export_debater_elo(elo_debaters, new_elo_file) # Checkpoint, so a crash doesn't lose the whole season
+                else:
+                    continue
+                if identities is not None:
+                    identities.aliases.save() # Merges of the saved tournaments
+    with metrics.stage('export'):
+        if store is not None:
+            store.close()
+        else:
+            csvio.export_debater_elo(elo_debaters, new_elo_file)
+        if identities is not None:
+            identities.aliases.save()
+    return elo_debaters
+
+def same_rating(a:tuple[float,int],b:tuple[float,int])->bool:
+    '''Tells whether two ratings (ELO, number of debates) are the same, up to RATING_TOLERANCE, None for debaters without a rating.'''
+    if a is None or b is None:
+        return a is b
+    return a[1] == b[1] and abs(a[0]-b[0]) <= RATING_TOLERANCE
+
+def recompute_from(manifest_file:str,corrected:str,new_elo_file:str='elo.db',
+spk_file:str='speakers.csv',backend:str='python',fetcher:str='selenium',cache=None,identities=None,debate_format='bp',outrounds=None,
+params:EloParams=DEFAULT_PARAMS)->tuple[int,int]:
+    '''Recalculates ratings after the results of an already entered tournament were corrected.
+    Only the corrected tournament and the ones after it are replayed, starting from the ratings stored right before it.
+    Debaters whose rating differs from the one the stored tournaments were rated with are affected: tournaments none of them
+    debated in aren't rated again (their stored changes stay, only their leaderboard is rewritten), and the replay stops
+    after the first tournament after which no debater is affected, since nothing after it can change then.
+    Works only with a rating store that the season from the manifest was entered into (replay_season or enter_tournament).
+    Inputs:
+    manifest_file: season manifest, see load_manifest
+    corrected: source of the corrected tournament, as it is written in the manifest
+    new_elo_file: rating store (.db)
+    spk_file, backend, fetcher, cache, identities, debate_format, outrounds, params: same as in replay_season,
+    identities should have the alias table the season was entered with
+    Outputs:
+    tuple where first member is number of replayed tournaments and second is number of debaters whose current rating changed'''
+    if not ratingstore.is_store(new_elo_file):
+        raise ValueError('Recalculation needs ratings in a rating store (.db), CSV files have no stored history!')
+    tournaments = load_manifest(manifest_file)
+    sources = [source for source, _, _ in tournaments]
+    if corrected not in sources:
+        raise ValueError(f'Tournament {corrected} is not in {manifest_file}!')
+    store = ratingstore.RatingStore(new_elo_file)
+    try:
+        start = sources.index(corrected)
+        seqs = [store.tournament_seq(source) for source in sources[start:]]
+        if seqs != sorted(seqs):
+            raise ValueError(f'Tournaments in {manifest_file} are not in the order they were entered!')
+        elo_debaters = store.ratings_after(store.previous_seq(seqs[0])) # Ratings stored right before the corrected tournament
+        stored = dict(elo_debaters) # Ratings as the stored tournaments had them, before the correction
+        affected = set()
+        replayed = 0
+        for (source, num_of_rounds, _), seq in zip(tournaments[start:], seqs):
+            debaters = store.tournament_debaters(seq)
+            changes = store.snapshot(seq) # Stored changes of the tournament, before it is replaced
+            if replayed and debaters and not affected & debaters:
+                # Nobody whose rating changed debated here, so the tournament's own changes stay the same
+                elo_debaters.update(changes)
+                stored.update(changes)
+                store.replace_leaders(seq, elo_debaters)
+                continue
+            tab_dir = source
+            if source.startswith(('http://', 'https://')):
+                download_tournament(source,num_of_rounds,fetcher,cache,outrounds=outrounds)
+                tab_dir = 'tournament_files'
+            ratings_before = dict(elo_debaters) # rate_tournament adds new debaters to the dictionary it gets
+            events = []
+            elo_debaters = dict(rate_tournament(elo_debaters,tab_dir,num_of_rounds,spk_file,backend,events,params=params,identities=identities,
+                                                debate_format=debate_format,outrounds=outrounds))
+            replayed += 1
+            stored.update(changes)
+            store.replace_tournament(seq, ratings_before, elo_debaters, events)
+            # Only debaters who debated here, or were affected before, can have a different rating than the stored one
+            candidates = affected | debaters | {event[0] for event in events} | elo_debaters.keys()-ratings_before.keys()
+            affected = {name for name in candidates if not same_rating(elo_debaters.get(name), stored.get(name))}
+            if not affected:
+                break # Same ratings as before the correction, tournaments after this one don't change
+        changed = store.sync_current()
+        if identities is not None:
+            identities.aliases.save()
+    finally:
+        store.close()
+    return replayed, changed
+
+def print_leaderboard(board:leaderboard.Leaderboard,top:int=20,start:int=0,names:list[str]=(),rating_range:tuple[float,float]=None)->None:
+    '''Prints answers of the leaderboard subcommand.
+    Inputs:
+    board: ranking of all debaters
+    top, start: number of the best ranked debaters to print, after skipping the first start of them
+    names: debaters whose rank and percentile are printed, as they appear on speaker tabs
+    rating_range: optional (low, high), debaters with rating in it are printed'''
+    for rank, (name, elo, debates) in enumerate(board.top(top, start), start+1):
+        print(f'{rank:>6} {name:<40} {elo:8.1f} {debates:4}')
+    for name in names:
+        name = csvio.clean_name(name)
+        if name not in board:
+            print(f'{name} is not ranked')
+        else:
+            print(f'{name}: rank {board.rank(name)} of {len(board)}, better than {board.percentile(name):.1f}% of debaters')
+    if rating_range is not None:
+        entries = board.between(*rating_range)
+        if entries:
+            first = board.rank(entries[0][0])
+            for rank, (name, elo, debates) in enumerate(entries, first):
+                print(f'{rank:>6} {name:<40} {elo:8.1f} {debates:4}')
+
+def run_sweep_command(args:argparse.Namespace,cache=None)->None:
+    '''Runs the sweep subcommand: replays the season under every combination of the given settings and prints their scores.'''
+    import json
+    import sweep # Imported only when used, it starts worker processes
+    choices = {field: values for field, values in (('base_k', args.base_k), ('speaker_scale', args.speaker_scale),
+               ('modifier_max', args.modifier_max), ('rating_scale', args.rating_scale)) if values}
+    configs = sweep.param_grid(**choices)
+    elo_debaters = {}
+    if args.elo_file:
+        elo_debaters, store = load_ratings(args.elo_file)
+        if store is not None:
+            store.close()
+    with metrics.stage('parse'):
+        season = sweep.load_season(args.manifest, cache=cache, debate_format=args.format)
+    with metrics.stage('sweep'):
+        results = sweep.run_sweep(season, configs, elo_debaters, args.workers, args.min_debates)
+    for line in sweep.format_results(results):
+        print(line)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([dict(result, params=dataclasses.asdict(result['params'])) for result in results], f, indent=1)
+
+def run_watch_command(args:argparse.Namespace,identities=None)->None:
+    '''Runs the watch subcommand: polls a running tournament and serves its provisional ratings until interrupted.
+    Nothing is saved, the tournament is entered as usual when it is over.'''
+    import threading
+    import livewatch # Imported only when used
+    with metrics.stage('load'):
+        elo_debaters, store = load_ratings(args.elo_file)
+    if store is not None:
+        store.close()
+    live = livewatch.LiveTournament(args.url, elo_debaters, args.rounds, args.outrounds, args.format, command_params(args), identities,
+                                    args.backend, args.tab_dir)
+    server = livewatch.serve(live, args.host, args.port)
+    threading.Thread(target=server.serve_forever, name='live-ratings', daemon=True).start()
+    log.info('Serving provisional ratings of %s on http://%s:%d/', args.url, *server.server_address[:2])
+    try:
+        livewatch.watch(live, args.interval, max_polls=args.polls)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        live.close()
+    for rank, row in enumerate(live.tournament()[:args.top], 1):
+        print(f'{rank:>6} {row["name"]:<40} {row["elo"]:8.1f} {row["change"]:+7.1f}')
+
+def run_predict_command(args:argparse.Namespace)->None:
+    '''Runs the predict subcommand: prints placement probabilities and expected team points of every room of a draw.'''
+    import predict # Imported only when used, it needs NumPy
+    with metrics.stage('load'):
+        elo_debaters, store = load_ratings(args.elo_file)
+    if store is not None:
+        store.close()
+    with metrics.stage('parse'):
+        debates_teams = csvio.load_debates(args.draw)
+        team_roster = build_team_roster(csvio.load_speaker_tab(args.speakers).speaker_teams())
+    with metrics.stage('predict'):
+        forecasts = predict.forecast_draw(debates_teams, team_roster, elo_debaters, args.format)
+    for room, forecast in enumerate(forecasts, 1):
+        print(f'Room {room}')
+        points = forecast.expected_points()
+        for i, team in enumerate(forecast.teams):
+            places = ' '.join(f'{probability:6.1%}' for probability in forecast.placements[i])
+            print(f'  {team:<40} {forecast.strengths[i]:7.1f}  {places}  {points[i]:5.2f}')
+
+def round_weight(text:str)->tuple[str,float]:
+    '''Parses a --round-weight argument STAGE=WEIGHT, e.g. final=1.5, into (stage, weight).'''
+    stage, _, weight = text.partition('=')
+    stage = stage.strip().lower()
+    if stage not in tabrounds.STAGES or stage == 'inround':
+        raise argparse.ArgumentTypeError(f'stage should be one of {", ".join(tabrounds.STAGES[1:])}, not {stage!r}')
+    try:
+        return stage, float(weight)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'weight of {stage} should be a number, not {weight!r}') from None
+
+def command_params(args:argparse.Namespace)->EloParams:
+    '''Settings of the calculation given on the command line, outround weights from --round-weight.'''
+    weights = dict(DEFAULT_PARAMS.round_weights)
+    weights.update(getattr(args, 'round_weight', None) or [])
+    return DEFAULT_PARAMS.replace(round_weights=tuple(weights.items()))
+
+def print_matches(matches:list,show_exact:bool=False)->None:
+    '''Prints how names of a speaker tab were resolved (identity.Match list), names that are exactly the same only if show_exact.'''
+    for match in matches:
+        if match.status == 'exact' and not show_exact:
+            continue
+        line = f'{match.status:7} {match.confidence:5.2f}  {match.name}'
+        if match.status in ('alias', 'merged'):
+            line += f' -> {match.debater}'
+        elif match.candidate is not None and match.status == 'review':
+            line += f' (similar to {match.candidate})'
+        print(line)
+
+def run_cli(argv:list[str]=None)->None:
+    '''Command line interface. Examples:
+    python main.py enter https://opencommunication2025.calicotab.com/prva2025/ --rounds 5
+    python main.py fetch https://opencommunication2025.calicotab.com/prva2025/ --rounds 5 --fetcher http
+    python main.py rate https://opencommunication2025.calicotab.com/prva2025/ --rounds 5
+    python main.py rate tabs/t7 --rounds 5 --elo-file elo.db --aliases aliases.tsv
+    python main.py rate tabs/wsdc2025 --rounds 8 --format wsdc --backend numpy
+    python main.py enter https://wudc2025.calicotab.com/wudc/ --fetcher http --outrounds Open ESL --round-weight final=1.5
+    python main.py match tabs/t7 --elo-file elo.db --aliases aliases.tsv
+    python main.py replay season.tsv --checkpoint-every 10
+    python main.py replay season.tsv --fetcher http --prefetch 2
+    python main.py recompute season.tsv tabs/t7 --elo-file elo.db --aliases aliases.tsv
+    python main.py convert elo.csv elo.db
+    python main.py watch https://wudc2025.calicotab.com/wudc/ --outrounds --interval 120 --port 8000
+    python main.py predict tabs/t7/teams_debates_round_1.csv --speakers tabs/t7/speakers.csv --elo-file elo.db
+    python main.py leaderboard --top 50 --rank "Nikola Nikolić" --range 1400 1500
+    python main.py sweep season.tsv --base-k 20 30 40 --speaker-scale 5 10 20 --workers 8
+    python main.py -v --metrics metrics.json --profile enter.prof enter https://opencommunication2025.calicotab.com/prva2025/'''
+    parser = argparse.ArgumentParser(description='ELO ratings of debaters from Tabbycat tabs.')
+    parser.add_argument('-v', '--verbose', action='count', default=0, help='log progress, -vv also logs every rating change')
+    parser.add_argument('-q', '--quiet', action='store_true', help='log errors only')
+    parser.add_argument('--log-file', help='write the log to this file instead of stderr')
+    parser.add_argument('--metrics', metavar='FILE', help='write time of every stage and counters to this JSON file')
+    parser.add_argument('--profile', metavar='FILE', help='run under cProfile and write the statistics to this file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    enter = commands.add_parser('enter', help='download one tournament and apply it to the ELO file')
+    enter.add_argument('url', help='URL of the tournament tab')
+    enter.add_argument('--rounds', type=int, help='number of the inrounds, all rounds of the tab by default')
+    fetch = commands.add_parser('fetch', help='download one tournament into the cache without rating it')
+    fetch.add_argument('url', help='URL of the tournament tab')
+    fetch.add_argument('--rounds', type=int, help='number of the inrounds, all rounds of the tab by default')
+    fetch.add_argument('--out-dir', default='tournament_files', help='directory the files of the tab are also written to')
+    fetch.add_argument('--fetcher', choices=('selenium', 'http'), default='selenium', help='how the tab is downloaded')
+    fetch.add_argument('--no-cache', action='store_true', help='download even if the tab is cached, and don\'t cache it')
+    rate = commands.add_parser('rate', help='apply one already downloaded tournament to the ELO file, nothing is downloaded')
+    rate.add_argument('source', help='tab directory, or URL of a tournament that is in the cache')
+    rate.add_argument('--rounds', type=int, help='number of the inrounds, all rounds of the tab by default')
+    rate.add_argument('--elo-file', default='elo.csv', help='file with current ELO rankings, updated rankings are written to it')
+    rate.add_argument('--backend', choices=('python', 'numpy'), default='python')
+    rate.add_argument('--no-cache', action='store_true', help=argparse.SUPPRESS)
+    replay = commands.add_parser('replay', help='apply all tournaments from a manifest, in order')
+    replay.add_argument('manifest', help='file with tournament URL or tab directory, optionally number of the inrounds and date on each line, separated by tabs')
+    replay.add_argument('--checkpoint-every', type=int, default=0, help='write ELO file after every N tournaments, 0 to write only at the end')
+    replay.add_argument('--prefetch', type=int, default=0, help='download up to N tournaments ahead while rating, 0 to download each before rating it')
+    match = commands.add_parser('match', help='show how names from a speaker tab would be resolved to rated debaters, nothing is saved')
+    match.add_argument('tab_dir', help='directory with speakers.csv of the tournament')
+    match.add_argument('--elo-file', default='elo.csv', help='file with current ELO rankings')
+    match.add_argument('--all', action='store_true', help='also show names which are exactly the same as a rated debater')
+    watch = commands.add_parser('watch', help='rate a running tournament round by round as results are released, and serve provisional ratings')
+    watch.add_argument('url', help='URL of the tournament tab')
+    watch.add_argument('--rounds', type=int, help='number of the inrounds that are rated, all of them by default')
+    watch.add_argument('--elo-file', default='elo.csv', help='file with current ELO rankings, it is not changed')
+    watch.add_argument('--backend', choices=('python', 'numpy'), default='python')
+    watch.add_argument('--interval', type=float, default=60, help='seconds between checks for newly released rounds')
+    watch.add_argument('--polls', type=int, help='stop after this many checks, run until interrupted by default')
+    watch.add_argument('--host', default='127.0.0.1', help='address provisional ratings are served on')
+    watch.add_argument('--port', type=int, default=8000, help='port provisional ratings are served on, 0 for any free port')
+    watch.add_argument('--tab-dir', help='directory the downloaded files of the tab are kept in, a temporary one by default')
+    watch.add_argument('--top', type=int, default=20, help='number of debaters of the tournament printed at the end')
+    for command in (enter, replay):
+        command.add_argument('--elo-file', default='elo.csv', help='file with current ELO rankings, updated rankings are written to it')
+        command.add_argument('--backend', choices=('python', 'numpy'), default='python')
+        command.add_argument('--fetcher', choices=('selenium', 'http'), default='selenium', help='how tabs given by URL are downloaded')
+        command.add_argument('--no-cache', action='store_true', help='always download tabs, even if they are cached')
+    recompute = commands.add_parser('recompute', help='recalculate ratings from a corrected tournament onwards (rating store only)')
+    recompute.add_argument('manifest', help='season manifest the tournaments were entered from')
+    recompute.add_argument('corrected', help='source of the corrected tournament, as written in the manifest')
+    recompute.add_argument('--elo-file', default='elo.db', help='rating store the season was entered into')
+    recompute.add_argument('--backend', choices=('python', 'numpy'), default='python')
+    recompute.add_argument('--fetcher', choices=('selenium', 'http'), default='selenium', help='how tabs given by URL are downloaded')
+    recompute.add_argument('--no-cache', action='store_true', help='always download tabs, even if they are cached')
+    for command in (enter, rate, replay, recompute, match, watch):
+        command.add_argument('--aliases', metavar='FILE', help='resolve misspelled names to rated debaters, and keep the decisions in this file')
+        command.add_argument('--match-threshold', type=float, default=0.92, help='confidence at which a name is merged with a rated debater')
+    convert = commands.add_parser('convert', help='copy ratings between a CSV file and a rating store (.db)')
+    convert.add_argument('source', help='file to read ratings from')
+    convert.add_argument('target', help='file to write ratings to')
+    ranking = commands.add_parser('leaderboard', help='show the best ranked debaters, rank of a debater or debaters in a rating range')
+    ranking.add_argument('--elo-file', default='elo.csv', help='file with current ELO rankings')
+    ranking.add_argument('--top', type=int, default=20, help='number of the best ranked debaters to show, 0 to show none')
+    ranking.add_argument('--start', type=int, default=0, help='number of the best ranked debaters to skip')
+    ranking.add_argument('--rank', action='append', default=[], metavar='NAME', help='show rank and percentile of the debater, can be repeated')
+    ranking.add_argument('--range', type=float, nargs=2, metavar=('LOW', 'HIGH'), help='show debaters with rating from LOW to HIGH')
+    forecast = commands.add_parser('predict', help='predict placements of every room of a draw from current ratings')
+    forecast.add_argument('draw', help='CSV file with the teams of every room, in the format of teams_debates_round_N.csv')
+    forecast.add_argument('--speakers', required=True, help='speaker tab or list of debaters with Name and Team columns')
+    forecast.add_argument('--elo-file', default='elo.csv', help='file with current ELO rankings')
+    forecast.add_argument('--format', choices=sorted(formats.FORMATS), default='bp', help='format of the debates')
+    sweep = commands.add_parser('sweep', help='replay a stored season under many ELO settings in parallel and compare how well they predict results')
+    sweep.add_argument('manifest', help='season manifest, tournaments given by URL must already be in the cache')
+    sweep.add_argument('--base-k', type=float, nargs='+', help='base k factors to try')
+    sweep.add_argument('--speaker-scale', type=float, nargs='+', help='speaker point differences that double the rating change to try')
+    sweep.add_argument('--modifier-max', type=float, nargs='+', help='largest speaker modifiers to try')
+    sweep.add_argument('--rating-scale', type=float, nargs='+', help='rating scales of the win probability to try')
+    sweep.add_argument('--elo-file', help='ratings before the season, everyone starts from 1000 if it is not given')
+    sweep.add_argument('--min-debates', type=int, default=1, help='score only pairs where both debaters had at least this many debates')
+    sweep.add_argument('--workers', type=int, help='number of processes, all CPU cores by default')
+    sweep.add_argument('--json', metavar='FILE', help='also write the results to this JSON file')
+    sweep.add_argument('--no-cache', action='store_true', help=argparse.SUPPRESS)
+    evict = commands.add_parser('evict-cache', help='remove old tabs from the cache')
+    evict.add_argument('--max-age-days', type=float, help='remove tabs fetched more than this many days ago')
+    evict.add_argument('--max-mb', type=float, help='remove the oldest tabs until the cache takes at most this many megabytes')
+    for command in (enter, fetch, rate, replay, recompute, watch):
+        command.add_argument('--outrounds', nargs='*', metavar='CATEGORY',
+                             help='also rate outrounds of these break categories (Open, ESL...), of all categories if none are given')
+    for command in (enter, rate, replay, recompute, watch):
+        command.add_argument('--round-weight', type=round_weight, action='append', metavar='STAGE=WEIGHT',
+                             help='multiply rating changes of outrounds of the stage (break, semifinal, final) by the weight, can be repeated')
+    for command in (enter, rate, replay, recompute, sweep, watch):
+        command.add_argument('--format', choices=sorted(formats.FORMATS), default='bp',
+                             help='format of the debates: bp (four teams of two), wsdc or ap (two teams of three), open (any teams, as listed)')
+    for command in (enter, fetch, rate, replay, recompute, sweep, evict):
+        command.add_argument('--cache-dir', default='tab_cache', help='directory of the downloaded tabs cache')
+    args = parser.parse_args(argv)
+    metrics.configure_logging(-1 if args.quiet else args.verbose, args.log_file)
+    metrics.METRICS.reset()
+    with metrics.profiled(args.profile):
+        run_command(args)
+    metrics.METRICS.log_summary()
+    if args.metrics:
+        metrics.METRICS.write_json(args.metrics)
+
+def run_command(args:argparse.Namespace)->None:
+    '''Runs the subcommand parsed by run_cli.'''
+    cache = None
+    if args.command == 'convert':
+        elo_debaters, store = load_ratings(args.source)
+        if store is not None:
+            store.close()
+        target = ratingstore.RatingStore(args.target) if ratingstore.is_store(args.target) else None
+        save_ratings(elo_debaters, args.target, target, tournament=None if target is None else f'import:{args.source}')
+        if target is not None:
+            target.close()
+        return
+    if args.command == 'leaderboard':
+        if ratingstore.is_store(args.elo_file) and not args.rank and args.range is None and args.start+args.top <= ratingstore.LEADERS_KEPT:
+            with ratingstore.RatingStore(args.elo_file) as store: # Best ranked debaters are kept in the store, nothing is sorted
+                leaders = store.current_leaders(args.start+args.top)
+            if leaders is not None:
+                print_leaderboard(leaderboard.Leaderboard({name: (elo, debates) for name, elo, debates in leaders}), args.top, args.start)
+                return
+        with metrics.stage('load'):
+            elo_debaters, store = load_ratings(args.elo_file)
+        if store is not None:
+            store.close()
+        print_leaderboard(leaderboard.Leaderboard(elo_debaters), args.top, args.start, args.rank, args.range)
+        return
+    identities = None
+    if getattr(args, 'aliases', None) is not None or args.command == 'match':
+        import identity # Imported only when used
+        identities = identity.Resolver(identity.AliasTable(args.aliases), args.match_threshold)
+    if args.command == 'match':
+        with metrics.stage('load'):
+            elo_debaters, store = load_ratings(args.elo_file)
+        if store is not None:
+            store.close()
+        speaker_tab = csvio.load_speaker_tab(os.path.join(args.tab_dir, 'speakers.csv'))
+        print_matches(identities.resolve(speaker_tab.names, elo_debaters), args.all)
+        return
+    if args.command == 'watch':
+        run_watch_command(args, identities)
+        return
+    if args.command == 'predict':
+        run_predict_command(args)
+        return
+    if args.command == 'evict-cache' or not args.no_cache:
+        import tabcache
+        cache = tabcache.TabCache(args.cache_dir)
+    if args.command == 'enter':
+        enter_tournament(args.url,args.rounds,new_elo_file=args.elo_file,backend=args.backend,fetcher=args.fetcher,cache=cache,identities=identities,
+                         debate_format=args.format,outrounds=args.outrounds,params=command_params(args))
+    elif args.command == 'fetch':
+        download_tournament(args.url,args.rounds,args.fetcher,cache,args.out_dir,args.outrounds)
+    elif args.command == 'rate':
+        rate_source(args.source,args.rounds,args.elo_file,args.backend,cache,identities,args.format,args.outrounds,command_params(args))
+    elif args.command == 'replay':
+        replay_season(args.manifest,args.elo_file,args.checkpoint_every,backend=args.backend,fetcher=args.fetcher,cache=cache,prefetch=args.prefetch,
+                      identities=identities,debate_format=args.format,outrounds=args.outrounds,params=command_params(args))
+    elif args.command == 'recompute':
+        replayed, changed = recompute_from(args.manifest,args.corrected,args.elo_file,backend=args.backend,fetcher=args.fetcher,cache=cache,
+                                           identities=identities,debate_format=args.format,outrounds=args.outrounds,params=command_params(args))
+        print(f'Replayed {replayed} tournaments, {changed} debaters have a different rating')
+    elif args.command == 'sweep':
+        run_sweep_command(args, cache)
+    elif args.command == 'evict-cache':
+        max_age = args.max_age_days*24*3600 if args.max_age_days is not None else None
+        max_bytes = int(args.max_mb*1024*1024) if args.max_mb is not None else None
+        print(f'Removed {cache.evict(max_age, max_bytes)} cached files')
+
+if __name__ == '__main__':
+    run_cli()
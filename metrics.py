@@ -0,0 +1,100 @@
+import contextlib
+import json
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+class Metrics:
+    '''Timers and counters of one run.
+    timers: dictionary whose keys are names of stages and values are lists [total seconds, number of times the stage ran]
+    counters: dictionary whose keys are names of counters and values are their totals
+    Safe to record from more threads at once (pipeline downloads in a background thread while the main one rates).'''
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+        self.lock = threading.Lock() # Held while a timer or counter changes, not while a stage runs
+
+    @contextlib.contextmanager
+    def stage(self, name:str):
+        '''Times the code in the with block and adds the time to the stage with the given name.'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter()-start
+            with self.lock:
+                timer = self.timers.setdefault(name, [0.0, 0])
+                timer[0] += elapsed
+                timer[1] += 1
+            log.debug('%s took %.3f s', name, elapsed)
+
+    def count(self, name:str, n:int=1)->None:
+        '''Adds n to the counter with the given name.'''
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self)->None:
+        with self.lock:
+            self.timers.clear()
+            self.counters.clear()
+
+    def to_dict(self)->dict:
+        with self.lock:
+            return {'timers': {name: {'seconds': round(total, 6), 'calls': calls} for name, (total, calls) in self.timers.items()},
+                    'counters': dict(self.counters)}
+
+    def write_json(self, file_name:str)->None:
+        '''Writes timers and counters to a JSON file.'''
+        with open(file_name, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    def log_summary(self, level:int=logging.INFO)->None:
+        '''Logs time of every stage and every counter, one line each.'''
+        data = self.to_dict() # Copy, so other threads can go on recording
+        for name, timer in data['timers'].items():
+            log.log(level, 'stage %-10s %8.3f s in %d calls', name, timer['seconds'], timer['calls'])
+        for name, value in data['counters'].items():
+            log.log(level, 'count %-16s %d', name, value)
+
+# Metrics of the whole run, filled by main, eloarray, identity, pipeline (from its fetching thread too) and livewatch.
+# Fetchers (webio, tabhttp) record nothing themselves, callers time the whole download, since a stage timed
+# in every one of the parallel threads fetching pages would add up to more than the time the download took
+METRICS = Metrics()
+
+def stage(name:str):
+    '''Times a stage of the run in METRICS, used as a with block.'''
+    return METRICS.stage(name)
+
+def count(name:str, n:int=1)->None:
+    '''Adds n to a counter in METRICS.'''
+    METRICS.count(name, n)
+
+@contextlib.contextmanager
+def profiled(file_name:str=None):
+    '''Runs the with block under cProfile and writes the statistics to file_name (readable with pstats or snakeviz).
+    Does nothing if file_name is None, so it can always be used.'''
+    if file_name is None:
+        yield
+        return
+    import cProfile # Imported only when profiling
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(file_name)
+        log.info('Profile written to %s', file_name)
+
+def configure_logging(verbosity:int=0, log_file:str=None)->None:
+    '''Sets up logging for the command line: warnings only by default, -v adds progress (INFO), -vv debug output
+    of every rating change, negative verbosity (-q) shows errors only. Log goes to stderr, or to log_file if it's given.'''
+    level = max(logging.DEBUG, min(logging.ERROR, logging.WARNING - 10*verbosity))
+    handler = logging.FileHandler(log_file, encoding='utf-8') if log_file else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
@@ -0,0 +1,170 @@
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import metrics
+import main
+
+log = logging.getLogger(__name__)
+
+DONE = object() # Put in a queue after its last item
+POLL = 0.1 # Seconds between checks whether the pipeline was closed, while a queue is full
+
+class Stopped(Exception):
+    '''Thrown in the fetching thread when the pipeline is closed, so it stops.'''
+
+class TabFeed:
+    '''Tab of one tournament whose files can still be arriving, given to main.rate_tournament as ready.
+    files: queue of names of files in the order they are written to tab_dir, bounded so fetching waits for rating
+    arrived: names of files already written'''
+
+    def __init__(self, tab_dir:str, files_ahead:int=None):
+        self.tab_dir = tab_dir
+        self.files = queue.Queue(maxsize=files_ahead or 0)
+        self.arrived = set()
+        self.complete = files_ahead is None # Feeds made without a queue have all files from the start
+
+    def ready(self, file_name:str)->None:
+        '''Waits until the file is written to tab_dir. Files arrive in the order rate_tournament reads them,
+        speakers.csv (and the list of rounds, if they are looked up) first and then both files of every round. Throws the error of the fetching thread if it failed.'''
+        if self.complete or file_name in self.arrived:
+            return
+        with metrics.stage('wait'): # Rating waits for the download
+            while not self.complete and file_name not in self.arrived:
+                item = self.files.get()
+                if item is DONE:
+                    self.complete = True
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    self.arrived.add(item)
+
+class TabPipeline:
+    '''Downloads tournaments of a season in a background thread while the ones before them are being rated.
+    Iterating gives tournaments in the order of the manifest, as tuples
+    (source, number of the inrounds, date, tab directory, ready function for main.rate_tournament), before their tabs
+    are downloaded: rating of a tournament starts as soon as its speaker tab arrives, and every round waits only
+    for its own files. Rounds and tournaments are always given in order, only downloading runs ahead.
+    Both queues are bounded, so downloading is at most tournaments_ahead tournaments and rounds_ahead rounds
+    ahead of rating. Tabs given by URL are written to temporary directories, removed when the next tournament is taken.
+    Use as a with block, or call close, so the thread stops if rating doesn't reach the end.
+    Inputs:
+    tournaments: list of (source, number of the inrounds, date) from main.load_manifest
+    fetcher: 'selenium' or 'http', see main.download_tournament
+    cache: optional tabcache.TabCache, cached tabs aren't downloaded and downloaded ones are stored in it
+    tournaments_ahead: number of tournaments whose download can start before rating of the previous ones is done
+    rounds_ahead: number of rounds of a tournament that can be downloaded ahead of its rating
+    outrounds: None to download only the inrounds, otherwise which outrounds are downloaded, see main.rate_tournament'''
+
+    def __init__(self, tournaments:list[tuple[str,int,str]], fetcher:str='selenium', cache=None,
+    tournaments_ahead:int=1, rounds_ahead:int=2, outrounds=None):
+        if fetcher not in ('selenium', 'http'):
+            raise ValueError(f'Unknown fetcher {fetcher}!')
+        self.tournaments = list(tournaments)
+        self.fetcher = fetcher
+        self.cache = cache
+        self.outrounds = outrounds
+        self.files_ahead = max(1, 2*rounds_ahead)
+        self.tabs = queue.Queue(maxsize=max(1, tournaments_ahead))
+        self.stop = threading.Event()
+        self.temp_dirs = [] # Made by the fetching thread, removed by the rating one
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.fetch_all, name='tab-pipeline', daemon=True)
+        self.thread.start()
+
+    def put(self, items:queue.Queue, item)->None:
+        '''Puts the item in a bounded queue, waiting while it's full, unless the pipeline is closed.'''
+        while True:
+            if self.stop.is_set():
+                raise Stopped()
+            try:
+                items.put(item, timeout=POLL)
+                return
+            except queue.Full:
+                pass
+
+    def fetch_all(self)->None:
+        '''Body of the fetching thread.'''
+        feed = None
+        try:
+            fetch_module = None
+            for source, num_of_rounds, held_on in self.tournaments:
+                if not source.startswith(('http://', 'https://')):
+                    self.put(self.tabs, (source, num_of_rounds, held_on, TabFeed(source)))
+                    continue
+                tab_dir = tempfile.mkdtemp(prefix='tab_')
+                with self.lock:
+                    self.temp_dirs.append(tab_dir)
+                files = main.cached_tab(self.cache, source, num_of_rounds, self.outrounds)
+                if files is not None:
+                    log.info('Tab of %s taken from the cache', source)
+                    metrics.count('cache_hits')
+                    main.write_tab_files(files, tab_dir)
+                    self.put(self.tabs, (source, num_of_rounds, held_on, TabFeed(tab_dir)))
+                    continue
+                if fetch_module is None:
+                    fetch_module = main.import_fetcher(self.fetcher)
+                feed = TabFeed(tab_dir, self.files_ahead)
+                self.put(self.tabs, (source, num_of_rounds, held_on, feed)) # Rating can start before the tab is downloaded
+                log.info('Downloading %s', source)
+                fetched = {}
+                with metrics.stage('download'):
+                    for file_name, content in fetch_module.iter_whole_tournament(source, num_of_rounds, **main.fetch_options(self.outrounds)):
+                        with open(os.path.join(tab_dir, file_name), 'w', encoding='utf-8') as f:
+                            f.write(content)
+                        fetched[file_name] = content
+                        self.put(feed.files, file_name)
+                self.put(feed.files, DONE)
+                feed = None
+                metrics.count('tabs_downloaded')
+                if self.cache is not None:
+                    self.cache.put_tournament(source, fetched)
+            self.put(self.tabs, DONE)
+        except Stopped:
+            pass
+        except BaseException as error: # Thrown in the rating thread, by the feed it's waiting for or by the next tournament
+            try:
+                if feed is not None:
+                    self.put(feed.files, error)
+                self.put(self.tabs, error)
+            except Stopped:
+                pass
+
+    def __iter__(self):
+        previous = None
+        while True:
+            item = self.tabs.get()
+            if previous is not None:
+                self.remove(previous)
+            if item is DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            source, num_of_rounds, held_on, feed = item
+            previous = feed.tab_dir
+            yield source, num_of_rounds, held_on, feed.tab_dir, feed.ready
+
+    def remove(self, tab_dir:str)->None:
+        '''Removes the temporary directory of a tab that was rated.'''
+        with self.lock:
+            if tab_dir not in self.temp_dirs:
+                return # Tab directory from the manifest
+            self.temp_dirs.remove(tab_dir)
+        shutil.rmtree(tab_dir, ignore_errors=True)
+
+    def close(self)->None:
+        '''Stops the fetching thread and removes all temporary directories.'''
+        self.stop.set()
+        self.thread.join()
+        with self.lock:
+            temp_dirs, self.temp_dirs = self.temp_dirs, []
+        for tab_dir in temp_dirs:
+            shutil.rmtree(tab_dir, ignore_errors=True)
+
+    def __enter__(self)->'TabPipeline':
+        return self
+
+    def __exit__(self, *exc_info)->None:
+        self.close()
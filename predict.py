@@ -0,0 +1,85 @@
+import functools
+import itertools
+from typing import NamedTuple
+import numpy as np # Verovatnoće svih soba računaju se odjednom, nad nizovima
+import formats
+from eloparams import EloParams, DEFAULT_PARAMS
+
+BP_POINTS = (3, 2, 1, 0) # Team points of the places of a BP debate
+
+class RoomForecast(NamedTuple):
+    '''Predicted result of one room of a draw.
+    teams: teams of the room, sorted by name
+    strengths: strength of every team, average rating of its paired speakers (see team_strength)
+    placements: array where element [i, p] is the probability that team i takes place p+1'''
+    teams: tuple[str,...]
+    strengths: np.ndarray
+    placements: np.ndarray
+
+    def expected_points(self, points:tuple[int,...]=BP_POINTS)->np.ndarray:
+        '''Expected team points of every team, points of the first place first.'''
+        return self.placements @ np.asarray(points[:len(self.teams)], dtype=np.float64)
+
+@functools.lru_cache(maxsize=None)
+def permutations(no_of_teams:int)->tuple[np.ndarray,np.ndarray]:
+    '''All orders of the teams of a room, made once for every number of teams.
+    Outputs:
+    tuple where first member is an array of shape (no_of_teams!, no_of_teams) whose rows are team indices from the first place
+    to the last, and second is an array of shape (no_of_teams!, no_of_teams, no_of_teams) whose element [o, i, p] is 1
+    if team i takes place p+1 in order o'''
+    orders = np.array(list(itertools.permutations(range(no_of_teams))), dtype=np.int64).reshape(-1, no_of_teams)
+    places = (orders[:, None, :] == np.arange(no_of_teams)[None, :, None]).astype(np.float64)
+    return orders, places
+
+def placement_probabilities(strengths:np.ndarray, rating_scale:float=DEFAULT_PARAMS.rating_scale)->np.ndarray:
+    '''Plackett-Luce probabilities of every place of every team, for many rooms with the same number of teams at once.
+    Team with strength s has weight 10**(s/rating_scale), and the places are taken from the first one down: every next place
+    goes to one of the remaining teams with probability proportional to its weight. For two teams it is the ELO expected score.
+    Inputs:
+    strengths: array of shape (rooms, teams) of team strengths
+    rating_scale: see eloparams.EloParams
+    Outputs:
+    array of shape (rooms, teams, teams), element [r, i, p] is the probability that team i of room r takes place p+1'''
+    strengths = np.asarray(strengths, dtype=np.float64)
+    no_of_teams = strengths.shape[1]
+    orders, places = permutations(no_of_teams)
+    # Logarithms of the weights, so very different strengths don't overflow or underflow
+    log_weights = strengths * (np.log(10) / rating_scale)
+    ordered = log_weights[:, orders] # (rooms, orders, places), weight of the team at every place of every order
+    remaining = np.logaddexp.accumulate(ordered[:, :, ::-1], axis=2)[:, :, ::-1] # Weight of the teams that haven't got a place yet
+    order_probabilities = np.exp((ordered - remaining).sum(axis=2)) # (rooms, orders)
+    return np.einsum('ro,oip->rip', order_probabilities, places) # Sum over the orders in which a team takes a place
+
+def team_strength(members:tuple[str,...], elo_debaters:dict[str,(float,int)])->float:
+    '''Strength of a team, average rating of its speakers. Debaters who aren't rated (swings, newcomers) count as 1000,
+    the rating every debater starts with.'''
+    return sum(elo_debaters[name][0] if name in elo_debaters else 1000 for name in members) / len(members)
+
+def forecast_draw(debates_teams:list[set[str]], team_roster:dict[str,list[str]], elo_debaters:dict[str,(float,int)],
+debate_format='bp', params:EloParams=DEFAULT_PARAMS)->list[RoomForecast]:
+    '''Predicts placements of every room of a draw from current ratings, rooms of the same size are calculated together.
+    Inputs:
+    debates_teams: teams of every room, as csvio.load_debates returns them
+    team_roster: speakers of every team, from main.build_team_roster; teams that aren't in it are swings
+    elo_debaters: current ELO rankings, dictionary or registry.DebaterRegistry
+    debate_format: format of the debates, name or formats.DebateFormat, gives which speakers of a team count (see formats.paired_speakers)
+    params: settings of the calculation, rating_scale is used
+    Outputs:
+    list of RoomForecast, in the order of the rooms of the draw'''
+    debate_format = formats.get_format(debate_format)
+    rooms = [tuple(sorted(debate)) for debate in debates_teams]
+    strength = {}
+    for room in rooms:
+        for team in room:
+            if team not in strength:
+                strength[team] = team_strength(formats.paired_speakers(team_roster.get(team, []), debate_format), elo_debaters)
+    forecasts = [None]*len(rooms)
+    sizes = {}
+    for i, room in enumerate(rooms):
+        sizes.setdefault(len(room), []).append(i)
+    for size, indices in sizes.items():
+        strengths = np.array([[strength[team] for team in rooms[i]] for i in indices], dtype=np.float64).reshape(len(indices), size)
+        placements = placement_probabilities(strengths, params.rating_scale)
+        for row, i in enumerate(indices):
+            forecasts[i] = RoomForecast(rooms[i], strengths[row], placements[row])
+    return forecasts
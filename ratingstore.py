@@ -0,0 +1,281 @@
+import sqlite3 # Za čuvanje rejtinga u bazi umesto u CSV fajlu
+import heapq
+import time
+import csvio
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS debaters (
+    name TEXT PRIMARY KEY,
+    elo REAL NOT NULL,
+    debates INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tournaments (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    rated_at REAL NOT NULL,
+    held_on TEXT
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    seq INTEGER NOT NULL REFERENCES tournaments(seq),
+    name TEXT NOT NULL,
+    elo REAL NOT NULL,
+    debates INTEGER NOT NULL,
+    PRIMARY KEY (seq, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS snapshots_name ON snapshots(name, seq);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    seq INTEGER NOT NULL REFERENCES tournaments(seq),
+    round INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    before REAL NOT NULL,
+    after REAL NOT NULL,
+    debates INTEGER NOT NULL,
+    k REAL NOT NULL,
+    modifier REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_name ON events(name, seq, round);
+CREATE INDEX IF NOT EXISTS tournaments_held_on ON tournaments(held_on, seq);
+CREATE TABLE IF NOT EXISTS leaders (
+    seq INTEGER NOT NULL REFERENCES tournaments(seq),
+    rank INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    elo REAL NOT NULL,
+    debates INTEGER NOT NULL,
+    PRIMARY KEY (seq, rank)
+) WITHOUT ROWID;
+'''
+
+IMPORT_TOURNAMENT = 'import' # Snapshot name of ratings saved without a tournament, so ratings_after includes them
+LEADERS_KEPT = 100 # Top of the leaderboard kept after every tournament, so leaderboard_after doesn't rebuild all ratings
+
+class RatingStore:
+    '''ELO ratings stored in a SQLite database, as a replacement for elo.csv.
+    Only debaters whose rating changed since the last load or save are written, in one transaction.
+    Every saved tournament keeps a snapshot with only the debaters it changed,
+    so ratings after any tournament can be rebuilt without storing full copies.
+    Every rating change from calculate_elo can be appended to the events table, which is never changed afterwards,
+    so ratings of a debater at any date can be looked up through an index instead of replaying the season.
+    Tables: debaters (current ratings), tournaments (in the order they were saved), snapshots (changes by tournament),
+    events (rating changes by tournament and round)'''
+
+    def __init__(self, db_file:str='elo.db'):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tournaments'").fetchone():
+            columns = [row[1] for row in self.conn.execute('PRAGMA table_info(tournaments)')]
+            if 'held_on' not in columns: # Store made before tournaments had dates
+                self.conn.execute('ALTER TABLE tournaments ADD COLUMN held_on TEXT')
+        self.conn.executescript(SCHEMA)
+        self.saved = None # Ratings as they are in the database, to find which ones changed
+
+    def close(self)->None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def load(self)->dict[str,(float,int)]:
+        '''Returns current ratings in the same format as csvio.load_debater_elo.'''
+        self.saved = {name: (elo, debates) for name, elo, debates in self.conn.execute('SELECT name, elo, debates FROM debaters')}
+        return dict(self.saved)
+
+    def changed(self, elo_debaters:dict[str,(float,int)])->list[tuple[str,float,int]]:
+        '''Returns (name, elo, debates) of debaters whose rating differs from the database.'''
+        if self.saved is None:
+            self.load()
+        saved = self.saved
+        return [(name, float(elo[0]), int(elo[1])) for name, elo in elo_debaters.items() if saved.get(name) != elo]
+
+    def save(self, elo_debaters:dict[str,(float,int)], tournament:str=None, events:list=None, held_on:str=None)->int:
+        '''Writes debaters whose rating changed, atomically. Debaters missing from elo_debaters are left as they are.
+        Changes are kept as the snapshot of a tournament, and the top LEADERS_KEPT of elo_debaters as its leaderboard
+        (so elo_debaters should have all ratings).
+        Inputs:
+        elo_debaters: ratings in the same format as csvio.load_debater_elo
+        tournament: name of the tournament of the changes, IMPORT_TOURNAMENT if it isn't given (imported or edited ratings)
+        events: rating changes of the tournament collected by main.calculate_elo, appended to the log (needs tournament)
+        held_on: date of the tournament, YYYY-MM-DD, used by rating_as_of
+        Outputs:
+        number of debaters written'''
+        if events and tournament is None:
+            raise ValueError('Rating changes can only be saved for a tournament!')
+        rows = self.changed(elo_debaters)
+        if tournament is None and not rows:
+            return 0 # Nothing changed, no empty import is kept
+        with self.conn: # One transaction, either everything is written or nothing is
+            self.write_current(rows)
+            seq = self.conn.execute('INSERT INTO tournaments (name, rated_at, held_on) VALUES (?, ?, ?)',
+                                    (tournament if tournament is not None else IMPORT_TOURNAMENT, time.time(), held_on)).lastrowid
+            self.conn.executemany('INSERT INTO snapshots (seq, name, elo, debates) VALUES (?, ?, ?, ?)',
+                                  [(seq, name, elo, debates) for name, elo, debates in rows])
+            self.write_leaders(seq, elo_debaters)
+            if events:
+                self.conn.executemany('INSERT INTO events (seq, name, round, before, after, debates, k, modifier) '
+                                      'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', [(seq, *event) for event in events])
+        self.mark_saved(rows)
+        return len(rows)
+
+    def write_current(self, rows:list[tuple[str,float,int]])->None:
+        '''Writes (name, elo, debates) rows to the current ratings only, inside the caller's transaction.'''
+        self.conn.executemany('INSERT INTO debaters (name, elo, debates) VALUES (?, ?, ?) '
+                              'ON CONFLICT(name) DO UPDATE SET elo=excluded.elo, debates=excluded.debates', rows)
+
+    def mark_saved(self, rows:list[tuple[str,float,int]])->None:
+        '''Remembers rows written by a committed transaction, see changed.'''
+        for name, elo, debates in rows:
+            self.saved[name] = (elo, debates)
+
+    def tournaments(self)->list[tuple[int,str,float]]:
+        '''Returns (seq, name, time of saving) of all saved tournaments, in the order they were saved.'''
+        return list(self.conn.execute('SELECT seq, name, rated_at FROM tournaments ORDER BY seq'))
+
+    def tournament_seq(self, tournament:str)->int:
+        '''Returns seq of the last saved tournament with the given name, raises KeyError if there is none.'''
+        row = self.conn.execute('SELECT MAX(seq) FROM tournaments WHERE name = ?', (tournament,)).fetchone()
+        if row[0] is None:
+            raise KeyError(f'Tournament {tournament} is not in the store!')
+        return row[0]
+
+    def previous_seq(self, seq:int)->int:
+        '''Returns seq of the tournament saved right before the given one, or 0 if it is the first.'''
+        row = self.conn.execute('SELECT MAX(seq) FROM tournaments WHERE seq < ?', (seq,)).fetchone()
+        return row[0] or 0
+
+    def replace_tournament(self, seq:int, ratings_before:dict[str,(float,int)], ratings_after:dict[str,(float,int)],
+    events:list=None)->int:
+        '''Replaces the snapshot, leaderboard and rating changes of an already saved tournament, after its results were corrected.
+        This is the only case in which logged rating changes are removed. Current ratings aren't touched, see sync_current.
+        Inputs:
+        seq: seq of the tournament
+        ratings_before: ratings right before the tournament
+        ratings_after: recalculated ratings right after the tournament
+        events: recalculated rating changes of the tournament
+        Outputs:
+        number of debaters in the new snapshot'''
+        rows = [(seq, name, float(elo[0]), int(elo[1])) for name, elo in ratings_after.items() if ratings_before.get(name) != elo]
+        with self.conn:
+            for table in ('snapshots', 'events'):
+                self.conn.execute(f'DELETE FROM {table} WHERE seq = ?', (seq,))
+            self.conn.executemany('INSERT INTO snapshots (seq, name, elo, debates) VALUES (?, ?, ?, ?)', rows)
+            self.write_leaders(seq, ratings_after)
+            if events:
+                self.conn.executemany('INSERT INTO events (seq, name, round, before, after, debates, k, modifier) '
+                                      'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', [(seq, *event) for event in events])
+        return len(rows)
+
+    def replace_leaders(self, seq:int, ratings_after:dict[str,(float,int)])->None:
+        '''Replaces the top LEADERS_KEPT kept for a tournament whose own results didn't change,
+        but ratings of debaters before it did.'''
+        with self.conn:
+            self.write_leaders(seq, ratings_after)
+
+    def write_leaders(self, seq:int, ratings_after:dict[str,(float,int)])->None:
+        '''Writes the top LEADERS_KEPT of ratings_after as the leaderboard of a tournament, inside the caller's transaction.'''
+        leaders = heapq.nlargest(LEADERS_KEPT, ratings_after.items(), key=lambda item: item[1][0])
+        self.conn.execute('DELETE FROM leaders WHERE seq = ?', (seq,))
+        self.conn.executemany('INSERT INTO leaders (seq, rank, name, elo, debates) VALUES (?, ?, ?, ?, ?)',
+                              [(seq, rank, name, float(elo[0]), int(elo[1])) for rank, (name, elo) in enumerate(leaders, start=1)])
+
+    def snapshot(self, seq:int)->dict[str,(float,int)]:
+        '''Returns ratings of the debaters whose rating the tournament with the given seq changed, as they were right after it.'''
+        return {name: (elo, debates) for name, elo, debates in self.conn.execute(
+            'SELECT name, elo, debates FROM snapshots WHERE seq = ?', (seq,))}
+
+    def tournament_debaters(self, seq:int)->set[str]:
+        '''Returns names of the debaters who have logged rating changes or a snapshot in the tournament with the given seq.'''
+        return {name for name, in self.conn.execute('SELECT name FROM events WHERE seq = ? UNION SELECT name FROM snapshots WHERE seq = ?',
+                                                    (seq, seq))}
+
+    def sync_current(self)->int:
+        '''Sets current ratings to the ratings after the last saved tournament, after tournaments were replaced.
+        Returns number of debaters written.'''
+        last = self.conn.execute('SELECT MAX(seq) FROM tournaments').fetchone()[0]
+        if last is None:
+            return 0
+        rows = self.changed(self.ratings_after(last))
+        with self.conn: # Snapshots already have these ratings, so no tournament is saved
+            self.write_current(rows)
+        self.mark_saved(rows)
+        return len(rows)
+
+    def history(self, name:str)->list[tuple]:
+        '''Returns all rating changes of a debater, in order, as tuples
+        (tournament, round, ELO before, ELO after, number of debates after, k factor, speaker modifier).'''
+        return list(self.conn.execute('SELECT t.name, e.round, e.before, e.after, e.debates, e.k, e.modifier '
+                                      'FROM events e JOIN tournaments t ON e.seq = t.seq WHERE e.name = ? '
+                                      'ORDER BY e.seq, e.round', (name,)))
+
+    def rating_as_of(self, name:str, date:str)->tuple[float,int]:
+        '''Returns (ELO, number of debates) of a debater after the last tournament held on or before date (YYYY-MM-DD),
+        or None if the debater had no rating changes by then. Tournaments saved without held_on count as held on the day they were saved.'''
+        # Tournaments without a date (from manifests without dates) count as held on the day they were rated
+        row = self.conn.execute('SELECT e.after, e.debates FROM events e JOIN tournaments t ON e.seq = t.seq '
+                                "WHERE e.name = ? AND COALESCE(t.held_on, date(t.rated_at, 'unixepoch', 'localtime')) <= ? "
+                                'ORDER BY e.seq DESC, e.round DESC LIMIT 1', (name, date)).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def rating_after(self, name:str, seq:int)->tuple[float,int]:
+        '''Returns (ELO, number of debates) of a debater right after the tournament with the given seq, or None.'''
+        row = self.conn.execute('SELECT elo, debates FROM snapshots WHERE name = ? AND seq <= ? ORDER BY seq DESC LIMIT 1',
+                                (name, seq)).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def leaderboard_after(self, seq:int, top:int=None)->list[tuple[str,float,int]]:
+        '''Returns (name, ELO, number of debates) of debaters right after the tournament with the given seq,
+        from the highest rating down, only the first top ones if top is given.
+        Up to LEADERS_KEPT debaters are read from the top kept for the tournament, more are rebuilt from snapshots.'''
+        if top is not None and top <= LEADERS_KEPT:
+            return list(self.conn.execute('SELECT name, elo, debates FROM leaders WHERE seq = ? ORDER BY rank LIMIT ?', (seq, top)))
+        ratings = sorted(self.ratings_after(seq).items(), key=lambda item: item[1][0], reverse=True)
+        return [(name, elo, debates) for name, (elo, debates) in ratings[:top]]
+
+    def current_leaders(self, top:int)->list[tuple[str,float,int]]:
+        '''Returns (name, ELO, number of debates) of the top best ranked debaters now, from the leaderboard kept
+        for the last saved tournament (every save keeps one), or None if nothing was saved yet.'''
+        last = self.conn.execute('SELECT MAX(seq) FROM tournaments').fetchone()[0]
+        return None if last is None else self.leaderboard_after(last, top)
+
+    def rebuild_ratings(self)->dict[str,(float,int)]:
+        '''Rebuilds current ratings from the log: the last rating change of every debater,
+        or the last snapshot without rating changes (imported ratings) if it was saved after it.'''
+        imported = {name: (seq, elo, debates) for seq, name, elo, debates in self.conn.execute(
+            'SELECT s.seq, s.name, s.elo, s.debates FROM snapshots s '
+            'WHERE NOT EXISTS (SELECT 1 FROM events e WHERE e.seq = s.seq AND e.name = s.name) ORDER BY s.seq')}
+        ratings = {}
+        last_seq = {}
+        # Ordered by tournament and round, not by id, since replace_tournament gives rewritten events new ids
+        for seq, name, elo, debates in self.conn.execute(
+                'SELECT seq, name, after, debates FROM events ORDER BY name, seq, round, id'):
+            ratings[name] = (elo, debates)
+            last_seq[name] = seq
+        for name, (seq, elo, debates) in imported.items():
+            if seq > last_seq.get(name, 0):
+                ratings[name] = (elo, debates)
+        return ratings
+
+    def ratings_after(self, seq:int)->dict[str,(float,int)]:
+        '''Returns ratings as they were right after the tournament with the given seq was saved,
+        made from the latest snapshot of every debater up to it.'''
+        rows = self.conn.execute('SELECT s.name, s.elo, s.debates FROM snapshots s '
+                                 'JOIN (SELECT name, MAX(seq) AS seq FROM snapshots WHERE seq <= ? GROUP BY name) latest '
+                                 'ON s.name = latest.name AND s.seq = latest.seq', (seq,))
+        return {name: (elo, debates) for name, elo, debates in rows}
+
+    def import_csv(self, file_name:str, alt_mod:bool=False)->int:
+        '''Saves ratings from a CSV file in the csvio.load_debater_elo format, returns number of debaters written.
+        Imported ratings are kept as a snapshot named after the file, so ratings_after includes them.'''
+        return self.save(csvio.load_debater_elo(file_name, alt_mod), tournament=f'import:{file_name}')
+
+    def export_csv(self, file_name:str)->None:
+        '''Writes current ratings to a CSV file in the csvio.export_debater_elo format.'''
+        csvio.export_debater_elo(self.load(), file_name)
+
+def is_store(file_name:str)->bool:
+    '''True if the rating file should be opened as a RatingStore (.db or .sqlite) and not as CSV.'''
+    return file_name.endswith(('.db', '.sqlite', '.sqlite3'))
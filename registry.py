@@ -0,0 +1,227 @@
+from array import array # Tipizirani nizovi, bez posebnog objekta za svaki broj
+from collections.abc import MutableMapping
+import sys
+
+class DebaterRegistry(MutableMapping):
+    '''ELO ratings of a large pool of debaters kept in typed arrays instead of a dictionary of tuples.
+    Every debater is interned once to an integer id (position in the arrays), so a rating takes 12 bytes
+    instead of a tuple with a float and an int.
+    Works as a dictionary in the format of csvio.load_debater_elo (name -> (ELO, number of debates)),
+    so it can be given to main.rate_tournament, ratingstore and csvio.export_debater_elo as it is.
+    Debaters can only be added and updated, not removed.
+    ids: dictionary whose keys are sanitized names of debaters and values are their ids
+    names: list of sanitized names of debaters, indexed by id
+    ratings: array of current ELO ratings, indexed by id
+    debates: array of number of debates had so far, indexed by id'''
+    __slots__ = ('ids', 'names', 'ratings', 'debates')
+
+    def __init__(self, elo_debaters:dict[str,(float,int)]=None):
+        self.ids = {}
+        self.names = []
+        self.ratings = array('d')
+        self.debates = array('i')
+        if elo_debaters is not None:
+            self.update(elo_debaters)
+
+    @classmethod
+    def from_dict(cls, elo_debaters:dict[str,(float,int)])->'DebaterRegistry':
+        '''Makes a registry from the dictionary returned by csvio.load_debater_elo.'''
+        return cls(elo_debaters)
+
+    def to_dict(self)->dict[str,(float,int)]:
+        '''Returns ratings as a dictionary, in the same format as csvio.load_debater_elo.'''
+        return dict(zip(self.names, zip(self.ratings, self.debates)))
+
+    def id_of(self, name:str)->int:
+        '''Returns id of the debater, -1 if they aren't in the registry (most likely a swing).'''
+        return self.ids.get(name, -1)
+
+    def __getitem__(self, name:str)->tuple[float,int]:
+        i = self.ids[name]
+        return self.ratings[i], self.debates[i]
+
+    def __setitem__(self, name:str, elo:tuple[float,int])->None:
+        i = self.ids.get(name)
+        if i is None: # New debater, the name is stored once and shared by ids and names
+            name = sys.intern(name)
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.ratings.append(elo[0])
+            self.debates.append(elo[1])
+        else:
+            self.ratings[i] = elo[0]
+            self.debates[i] = elo[1]
+
+    def __delitem__(self, name:str)->None:
+        raise TypeError('Debaters can\'t be removed from a registry, their ids would change!')
+
+    def __contains__(self, name:object)->bool:
+        return name in self.ids
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self)->int:
+        return len(self.names)
+
+def team_partners(names:list[str], teams:list[str])->list[int]:
+    '''Returns position of every debater's partner, the same partners main.build_partner_map finds:
+    first teammate in speaker tab order, or the debater themselves if they debated alone.'''
+    members = {}
+    for i, team in enumerate(teams):
+        members.setdefault(team, []).append(i)
+    partners = list(range(len(names)))
+    for rows in members.values():
+        for i in rows:
+            for other in rows:
+                if other != i:
+                    partners[i] = other
+                    break
+    return partners
+
+class PointsTable:
+    '''Speaker tab packed into one 2-D array of speaker points (a row for every debater, a column for every round)
+    instead of a list of ints per debater. Rounds without points are 0, same as in csvio.iter_speakers.
+    Works as the speaker_pts dictionary of main.calculate_elo (name in table, table[name] gives (team, points, average)),
+    main.rate_tournament reads every speaker tab into one.
+    ids: dictionary whose keys are sanitized names of debaters and values are their rows
+    names: list of sanitized names of debaters, in the order of the tab
+    teams: list of team names of debaters, every team name is stored once
+    no_of_rounds: number of columns
+    points: array of 16-bit speaker points, points of debater i in round r are at i*no_of_rounds+r-1
+    averages: array of average speaker points'''
+    __slots__ = ('ids', 'names', 'teams', 'no_of_rounds', 'points', 'averages')
+
+    def __init__(self, no_of_rounds:int):
+        self.ids = {}
+        self.names = []
+        self.teams = []
+        self.no_of_rounds = no_of_rounds
+        self.points = array('h')
+        self.averages = array('d')
+
+    @classmethod
+    def from_speaker_points(cls, speakers:dict[str, (str, list[int], float)])->'PointsTable':
+        '''Packs the speaker tab in the format of csvio.uvezi_spikere.
+        Throws ValueError if debaters don't have points for the same number of rounds.'''
+        lengths = {len(data[1]) for data in speakers.values()}
+        if len(lengths) > 1:
+            raise ValueError(f'Debaters have points for different numbers of rounds: {sorted(lengths)}')
+        table = cls(lengths.pop() if lengths else 0)
+        for name, (team, points, average) in speakers.items():
+            table.add(name, team, points, average)
+        return table
+
+    @classmethod
+    def from_speaker_tab(cls, speaker_tab)->'PointsTable':
+        '''Packs a csvio.SpeakerTab directly, without making the dictionary of csvio.uvezi_spikere first.
+        Throws ValueError if debaters don't have points for the same number of rounds.'''
+        table = cls(len(speaker_tab.points[0]) if speaker_tab.points else 0)
+        for name, team, points, average in zip(speaker_tab.names, speaker_tab.teams, speaker_tab.points, speaker_tab.averages):
+            table.add(name, team, points, average)
+        return table
+
+    def add(self, name:str, team:str, points:list[int], average:float)->None:
+        '''Adds a debater at the end of the tab.
+        A name that is already on the tab (two speakers with the same sanitized name) keeps its place
+        and takes the data of the later row, same as the dictionary of csvio.uvezi_spikere.'''
+        if len(points) != self.no_of_rounds:
+            raise ValueError(f'{name} has points for {len(points)} rounds instead of {self.no_of_rounds}!')
+        i = self.ids.get(name)
+        if i is not None:
+            self.teams[i] = sys.intern(team)
+            self.points[i*self.no_of_rounds:(i+1)*self.no_of_rounds] = array('h', points)
+            self.averages[i] = average
+            return
+        self.ids[name] = len(self.names)
+        self.names.append(sys.intern(name))
+        self.teams.append(sys.intern(team))
+        self.points.extend(points)
+        self.averages.append(average)
+
+    def row(self, name:str)->list[int]:
+        '''Returns speaker points of the debater by rounds.'''
+        start = self.ids[name]*self.no_of_rounds
+        return self.points[start:start+self.no_of_rounds].tolist()
+
+    def round_points(self, round_no:int)->dict[str,int]:
+        '''Returns speaker points of every debater in one round, same as formats.points_in_round,
+        empty for rounds without points (outrounds).'''
+        if not 1 <= round_no <= self.no_of_rounds:
+            return {}
+        return dict(zip(self.names, self.points[round_no-1::self.no_of_rounds]))
+
+    def __getitem__(self, name:str)->tuple[str, list[int], float]:
+        i = self.ids[name]
+        return self.teams[i], self.row(name), self.averages[i]
+
+    def __contains__(self, name:object)->bool:
+        return name in self.ids
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self)->int:
+        return len(self.names)
+
+    def deltas(self)->'DeltaTable':
+        '''Returns partners' speaker point deltas of every round, same values as main.build_speaker_deltas.'''
+        rounds = self.no_of_rounds
+        points = self.points
+        deltas = array('h', bytes(points.itemsize*len(points)))
+        for i, partner in enumerate(team_partners(self.names, self.teams)):
+            if partner != i: # Debater who debated alone has delta 0
+                for r in range(i*rounds, (i+1)*rounds):
+                    deltas[r] = points[r] - points[partner*rounds + r - i*rounds]
+        return DeltaTable(self.ids, rounds, deltas)
+
+class DeltaTable:
+    '''Partners' speaker point deltas packed the same way as PointsTable.points. Element i is the view of round i+1,
+    which works as its dictionary in main.build_speaker_deltas (name in view, view[name], view.get(name, default)),
+    so the table can be given as speaker_deltas to main.calculate_elo and eloarray.calculate_elo_arrays.'''
+    __slots__ = ('ids', 'no_of_rounds', 'deltas', 'views')
+
+    def __init__(self, ids:dict[str,int], no_of_rounds:int, deltas:array):
+        self.ids = ids
+        self.no_of_rounds = no_of_rounds
+        self.deltas = deltas
+        self.views = [RoundDeltas(self, i) for i in range(no_of_rounds)] # Made once, rounds are looked up for every pair
+
+    def __len__(self)->int:
+        return self.no_of_rounds
+
+    def __getitem__(self, round_index:int)->'RoundDeltas':
+        if not 0 <= round_index < self.no_of_rounds:
+            raise IndexError(f'Round {round_index+1} is not in the table!')
+        return self.views[round_index]
+
+class RoundDeltas:
+    '''Deltas of one round of a DeltaTable, see DeltaTable. Iterates over names in the order of the tab,
+    and values gives the deltas in the same order, so eloarray.delta_array takes it as the dictionary of a round.'''
+    __slots__ = ('table', 'round_index')
+
+    def __init__(self, table:DeltaTable, round_index:int):
+        self.table = table
+        self.round_index = round_index
+
+    def __getitem__(self, name:str)->int:
+        table = self.table
+        return table.deltas[table.ids[name]*table.no_of_rounds + self.round_index]
+
+    def get(self, name:str, default=None):
+        table = self.table
+        i = table.ids.get(name)
+        return default if i is None else table.deltas[i*table.no_of_rounds + self.round_index]
+
+    def __contains__(self, name:object)->bool:
+        return name in self.table.ids
+
+    def __iter__(self):
+        return iter(self.table.ids)
+
+    def values(self)->array:
+        table = self.table
+        return table.deltas[self.round_index::table.no_of_rounds]
+
+    def __len__(self)->int:
+        return len(self.table.ids)
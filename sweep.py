@@ -0,0 +1,142 @@
+import concurrent.futures
+import dataclasses
+import itertools
+import math
+import os
+import tempfile
+from typing import NamedTuple
+import csvio
+import formats
+import main
+import registry
+import tabrounds
+from eloparams import EloParams, DEFAULT_PARAMS
+
+class PreparedTournament(NamedTuple):
+    '''Everything about a tournament that doesn't depend on the ELO settings, read from its tab once.
+    Speaker points are packed (registry.PointsTable), since the whole season is kept in memory and sent to every worker.
+    names: sanitized names of debaters from the speaker tab
+    speaker_pts: packed speaker tab, works as the speaker_pts of main.calculate_elo
+    speaker_deltas: partners' speaker point deltas made from speaker_pts, same values as main.build_speaker_deltas
+    rounds: pairs of debaters (winner, loser) of every round, as formats.expand_round makes them
+    numbers: numbers of the rounds in the tab (tabrounds.TabRound.number), in the same order as rounds,
+    speaker points of a round are looked up by its number'''
+    names: list[str]
+    speaker_pts: registry.PointsTable
+    speaker_deltas: registry.DeltaTable
+    rounds: list[list[tuple[str,str]]]
+    numbers: list[int]
+
+def prepare_tournament(tab_dir:str, num_of_rounds:int, spk_file:str='speakers.csv', debate_format='bp')->PreparedTournament:
+    '''Reads a downloaded tab and makes pairs of debaters for every inround, the same way main.rate_tournament does
+    (num_of_rounds None for all inrounds of the tab). Outrounds aren't replayed, they have no speaker points.'''
+    debate_format = formats.get_format(debate_format)
+    speaker_tab = csvio.load_speaker_tab(os.path.join(tab_dir, spk_file), no_of_rounds=num_of_rounds)
+    speakers_teams = speaker_tab.speaker_teams()
+    speaker_pts = registry.PointsTable.from_speaker_points(speaker_tab.speaker_points())
+    team_roster = main.build_team_roster(speakers_teams)
+    rosters = formats.team_rosters(team_roster, debate_format)
+    rounds = []
+    numbers = []
+    for tab_round in tabrounds.iter_rounds(tab_dir, num_of_rounds):
+        i = tab_round.number
+        ranks_file, debates_file = tab_round.file_names()
+        teams_ranks = csvio.load_team_ranks(os.path.join(tab_dir, ranks_file))
+        debates_teams = csvio.load_debates(os.path.join(tab_dir, debates_file))
+        if debate_format.roster == 'spoke':
+            rosters = formats.team_rosters(team_roster, debate_format, speaker_pts.round_points(i))
+        rounds.append(formats.expand_round(formats.rank_debates(teams_ranks, debates_teams, debate_format), rosters, debate_format))
+        numbers.append(i)
+    return PreparedTournament(speaker_pts.names, speaker_pts, speaker_pts.deltas(), rounds, numbers)
+
+def load_season(manifest_file:str, spk_file:str='speakers.csv', cache=None, debate_format='bp')->list[PreparedTournament]:
+    '''Prepares all tournaments of a stored season (all in the same format, see formats). Tournaments given by a directory are read from it,
+    and the ones given by URL are taken from the tab cache, nothing is downloaded.
+    Throws ValueError if a tournament isn't in the cache (enter or replay the season first).'''
+    season = []
+    for source, num_of_rounds, _ in main.load_manifest(manifest_file):
+        if not source.startswith(('http://', 'https://')):
+            season.append(prepare_tournament(source, num_of_rounds, spk_file, debate_format))
+            continue
+        files = main.cached_tab(cache, source, num_of_rounds)
+        if files is None:
+            raise ValueError(f'Tab of {source} is not in the cache, replay the season once to download it!')
+        with tempfile.TemporaryDirectory() as tab_dir:
+            for file_name, content in files.items():
+                with open(os.path.join(tab_dir, file_name), 'w', encoding='utf-8') as f:
+                    f.write(content)
+            season.append(prepare_tournament(tab_dir, num_of_rounds, spk_file, debate_format))
+    return season
+
+def replay(params:EloParams, season:list[PreparedTournament], elo_debaters:dict[str,(float,int)]=None, min_debates:int=1)->dict:
+    '''Replays a prepared season with the given settings and measures how well ratings before every round
+    predicted who won each pair of debaters in it. Pairs where a debater had fewer than min_debates debates
+    (nothing to predict from) or isn't rated (swings) aren't scored.
+    Outputs:
+    dictionary with the settings, number of scored pairs, accuracy (share of pairs won by the higher rated debater,
+    ties count as half), Brier score and log loss of the ELO win probabilities (lower is better), and final ratings'''
+    ratings = dict(elo_debaters or {})
+    scored = 0
+    correct = 0.0
+    brier = 0.0
+    log_loss = 0.0
+    for tournament in season:
+        for name in tournament.names:
+            if name not in ratings:
+                ratings[name] = (1000, 0) # Same as csvio.SpeakerTab.add_to_elo
+        for round_no, pairs_debaters in zip(tournament.numbers, tournament.rounds):
+            for winner, loser in pairs_debaters:
+                winner_elo = ratings.get(winner)
+                loser_elo = ratings.get(loser)
+                if winner_elo is None or loser_elo is None or min(winner_elo[1], loser_elo[1]) < min_debates:
+                    continue
+                expected = 1 / (1 + 10 ** ((loser_elo[0] - winner_elo[0]) / params.rating_scale)) # Winner's win probability
+                scored += 1
+                correct += 1.0 if expected > 0.5 else 0.5 if expected == 0.5 else 0.0
+                brier += (1 - expected) ** 2
+                log_loss -= math.log(max(expected, 1e-15))
+            ratings.update(main.elo_updates(pairs_debaters, ratings, tournament.speaker_pts, round_no, tournament.speaker_deltas, params=params))
+    return {'params': params, 'pairs': scored, 'accuracy': correct/scored if scored else 0.0,
+            'brier': brier/scored if scored else 0.0, 'log_loss': log_loss/scored if scored else 0.0, 'ratings': ratings}
+
+_worker_season = None # Season, starting ratings and min_debates of a worker process, set once by _init_worker
+
+def _init_worker(season, elo_debaters, min_debates):
+    global _worker_season
+    _worker_season = (season, elo_debaters, min_debates)
+
+def _replay_in_worker(params:EloParams)->dict:
+    season, elo_debaters, min_debates = _worker_season
+    result = replay(params, season, elo_debaters, min_debates)
+    del result['ratings'] # Only the scores are sent back
+    return result
+
+def param_grid(base:EloParams=DEFAULT_PARAMS, **choices)->list[EloParams]:
+    '''Returns settings for every combination of the given values, other settings are taken from base.
+    Example: param_grid(base_k=[20, 30, 40], speaker_scale=[5, 10]) gives 6 settings.'''
+    fields = list(choices)
+    return [base.replace(**dict(zip(fields, values))) for values in itertools.product(*(choices[field] for field in fields))]
+
+def run_sweep(season:list[PreparedTournament], configs:list[EloParams], elo_debaters:dict[str,(float,int)]=None,
+workers:int=None, min_debates:int=1)->list[dict]:
+    '''Replays the season under every configuration, in parallel on workers processes (all CPU cores by default).
+    The season is sent to every worker once, not once per configuration.
+    Outputs:
+    results of replay without the final ratings, in the order of configs'''
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(configs) == 1:
+        _init_worker(season, elo_debaters, min_debates)
+        return [_replay_in_worker(params) for params in configs]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(configs)), initializer=_init_worker,
+                                                initargs=(season, elo_debaters, min_debates)) as executor:
+        return list(executor.map(_replay_in_worker, configs))
+
+def format_results(results:list[dict], base:EloParams=DEFAULT_PARAMS)->list[str]:
+    '''Lines of a table of sweep results, best log loss first, showing only settings different from base.'''
+    lines = [f'{"accuracy":>9}{"brier":>9}{"log loss":>10}{"pairs":>8}  settings']
+    for result in sorted(results, key=lambda result: result['log_loss']):
+        changed = {field.name: getattr(result['params'], field.name) for field in dataclasses.fields(EloParams)
+                   if getattr(result['params'], field.name) != getattr(base, field.name)}
+        settings = ' '.join(f'{name}={value}' for name, value in changed.items()) or 'defaults'
+        lines.append(f'{result["accuracy"]:9.4f}{result["brier"]:9.4f}{result["log_loss"]:10.4f}{result["pairs"]:8}  {settings}')
+    return lines
@@ -0,0 +1,116 @@
+import hashlib # Za adresiranje sadržaja keša
+import json
+import os
+import time
+
+class TabCache:
+    '''On-disk cache of downloaded tournament files, so a tab is scraped only once.
+    Contents are stored by their SHA-256 hash in cache_dir/objects, and cache_dir/manifest.json maps
+    (tournament URL, file name) to hash, size and time of fetching. File names carry the round,
+    e.g. teams_ranks_round_3.csv, so every round of every tournament is a separate entry.'''
+
+    def __init__(self, cache_dir:str='tab_cache'):
+        self.cache_dir = cache_dir
+        self.manifest_file = os.path.join(cache_dir, 'manifest.json')
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(self.manifest_file, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+
+    @staticmethod
+    def key(url:str, file_name:str)->str:
+        '''Key of a file in the manifest, URL is normalized so it doesn't matter whether it ends with slash.'''
+        return f'{url.rstrip("/")}|{file_name}'
+
+    def object_path(self, digest:str)->str:
+        return os.path.join(self.cache_dir, 'objects', digest[:2], digest)
+
+    def get(self, url:str, file_name:str)->str:
+        '''Returns cached content of the file, or None if it isn't cached.'''
+        entry = self.manifest.get(self.key(url, file_name))
+        if entry is not None:
+            try:
+                with open(self.object_path(entry['hash']), encoding='utf-8') as f:
+                    content = f.read()
+                self.hits += 1
+                return content
+            except FileNotFoundError:
+                pass # Object was deleted by hand, treat it as not cached
+        self.misses += 1
+        return None
+
+    def put(self, url:str, file_name:str, content:str, save:bool=True)->str:
+        '''Stores content of the file and returns its hash. Same content is stored only once.'''
+        data = content.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path+'.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path+'.tmp', path)
+        self.manifest[self.key(url, file_name)] = {'hash': digest, 'size': len(data), 'fetched_at': time.time()}
+        if save:
+            self.save()
+        return digest
+
+    def get_tournament(self, url:str, file_names:list[str])->dict[str,str]:
+        '''Returns cached contents of all given files, or None if any of them isn't cached.'''
+        files = {}
+        for file_name in file_names:
+            content = self.get(url, file_name)
+            if content is None:
+                return None
+            files[file_name] = content
+        return files
+
+    def put_tournament(self, url:str, files:dict[str,str])->None:
+        '''Stores all files of a tournament (as returned by fetch_whole_tournament) and saves the manifest once.'''
+        for file_name, content in files.items():
+            self.put(url, file_name, content, save=False)
+        self.save()
+
+    def save(self)->None:
+        '''Writes the manifest, through a temporary file so it's never left half written.'''
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.manifest_file+'.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(self.manifest_file+'.tmp', self.manifest_file)
+
+    def evict(self, max_age:float=None, max_bytes:int=None)->int:
+        '''Removes entries older than max_age seconds, and then the oldest entries until cached objects take at most max_bytes.
+        Objects no entry points to anymore are deleted. Returns number of removed entries.'''
+        now = time.time()
+        removed = 0
+        if max_age is not None:
+            for key, entry in list(self.manifest.items()):
+                if now - entry['fetched_at'] > max_age:
+                    del self.manifest[key]
+                    removed += 1
+        if max_bytes is not None:
+            references = {}
+            sizes = {}
+            for entry in self.manifest.values():
+                references[entry['hash']] = references.get(entry['hash'], 0) + 1
+                sizes[entry['hash']] = entry['size']
+            total = sum(sizes.values())
+            for key, entry in sorted(self.manifest.items(), key=lambda item: item[1]['fetched_at']):
+                if total <= max_bytes:
+                    break
+                del self.manifest[key]
+                removed += 1
+                references[entry['hash']] -= 1
+                if references[entry['hash']] == 0: # Object is shared with other entries until the last one is removed
+                    total -= sizes[entry['hash']]
+        used = {entry['hash'] for entry in self.manifest.values()}
+        objects_dir = os.path.join(self.cache_dir, 'objects')
+        if os.path.isdir(objects_dir):
+            for prefix in os.listdir(objects_dir):
+                for digest in os.listdir(os.path.join(objects_dir, prefix)):
+                    if digest not in used:
+                        os.remove(os.path.join(objects_dir, prefix, digest))
+        self.save()
+        return removed
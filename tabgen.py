@@ -0,0 +1,169 @@
+import os
+import random
+import statistics
+import formats
+
+FIRST_NAMES = ['Nikola', 'Marko', 'Đorđe', 'Ana', 'Jelena', 'Milica', 'Čedomir', 'Luka', 'Sara', 'Stefan', 'Jovana', 'Nemanja',
+               'Teodora', 'Aleksa', 'Katarina', 'Uroš', 'Tamara', 'Vuk', 'Dragana', 'Filip', 'Ivana', 'Lazar', 'Nataša', 'Ognjen',
+               'Sanja', 'Bojan', 'Zorana', 'Dušan', 'Ljiljana', 'Miloš', 'Anđela', 'Petar', 'Vesna', 'Žarko', 'Nevena', 'Igor']
+SURNAME_ROOTS = ['Nikol', 'Mark', 'Petr', 'Jov', 'Stojan', 'Đur', 'Ćir', 'Luk', 'Pavl', 'Mil', 'Živk', 'Simon', 'Radov', 'Kost',
+                 'Mitr', 'Stanoj', 'Bogdan', 'Vuč', 'Lazar', 'Ilij', 'Tod', 'Nedelj', 'Obrad', 'Janković', 'Ristić', 'Savić',
+                 'Dragan', 'Čolak', 'Šar', 'Žug', 'Grub', 'Mladen', 'Perišić', 'Velj', 'Zec', 'Despot', 'Rak', 'Tom', 'Filip', 'Ljub']
+SURNAME_ENDINGS = ['ić', 'ović', 'ević', 'in', 'ski', 'ač']
+INSTITUTIONS = {'Univerzitet u Beogradu': 'UB', 'Univerzitet u Novom Sadu': 'UNS', 'Univerzitet u Nišu': 'UNI',
+                'Univerzitet u Kragujevcu': 'UKG', 'Univerzitet umetnosti': 'UUB', 'Singidunum': 'SGD',
+                'Matematička gimnazija': 'MG', 'Prva beogradska gimnazija': 'PBG'} # Institutions and their abbreviations
+TEAM_WORDS = ['Alfa', 'Beta', 'Gama', 'Delta', 'Sigma', 'Omega', 'Orlovi', 'Vukovi', 'Sokolovi', 'Munje', 'Zvezde', 'Talasi']
+PLAIN_NAMES = 3000 # Pools bigger than this get double surnames, so distinct names don't run out
+DIACRITICS = str.maketrans({'č':'c', 'š':'s', 'ž':'z', 'ć':'c', 'đ':'d'})
+SIDES = ['OG', 'OO', 'CG', 'CO']
+RESULTS = ['1st', '2nd', '3rd', '4th']
+TWO_TEAM_SIDES = ['Prop', 'Opp']
+TWO_TEAM_RESULTS = ['won', 'lost']
+LATIN_TO_CYRILLIC = {'lj': 'љ', 'nj': 'њ', 'dž': 'џ', 'a': 'а', 'b': 'б', 'v': 'в', 'g': 'г', 'd': 'д', 'đ': 'ђ', 'e': 'е',
+                     'ž': 'ж', 'z': 'з', 'i': 'и', 'j': 'ј', 'k': 'к', 'l': 'л', 'm': 'м', 'n': 'н', 'o': 'о', 'p': 'п', 'r': 'р',
+                     's': 'с', 't': 'т', 'ć': 'ћ', 'u': 'у', 'f': 'ф', 'h': 'х', 'c': 'ц', 'č': 'ч', 'š': 'ш'}
+
+def to_cyrillic(name:str)->str:
+    '''Writes a Serbian name in Cyrillic, so that cyrtranslit gives the Latin name back.'''
+    result = []
+    i = 0
+    while i < len(name):
+        digraph = name[i:i+2].lower()
+        if digraph in LATIN_TO_CYRILLIC: # Lj, Nj and Dž are one letter
+            letter, i = LATIN_TO_CYRILLIC[digraph], i+2
+            result.append(letter.upper() if name[i-2].isupper() else letter)
+            continue
+        letter = LATIN_TO_CYRILLIC.get(name[i].lower(), name[i])
+        result.append(letter.upper() if name[i].isupper() else letter)
+        i += 1
+    return ''.join(result)
+
+def make_pool(no_of_debaters:int, cyrillic_share:float=0.2, seed:int=0)->list[str]:
+    '''Makes distinct full names of debaters, cyrillic_share of them written in Cyrillic.
+    Names are distinct after csvio.clean_name too, so every name is a different debater.'''
+    rng = random.Random(seed)
+    names = []
+    seen = set()
+    while len(names) < no_of_debaters:
+        surname = rng.choice(SURNAME_ROOTS)
+        if not surname.endswith('ić'):
+            surname += rng.choice(SURNAME_ENDINGS)
+        if len(names) > PLAIN_NAMES: # Plain surnames are running out, join two of them
+            surname = rng.choice(SURNAME_ROOTS).rstrip('ić') + surname.lower()
+        name = f'{rng.choice(FIRST_NAMES)} {surname}'
+        key = name.lower().translate(DIACRITICS) # Same as different debater only if clean_name tells them apart
+        if key in seen:
+            continue
+        seen.add(key)
+        names.append(to_cyrillic(name) if rng.random() < cyrillic_share else name)
+    return names
+
+def write_tab_file(file_name:str, header:list[str], rows:list[list])->None:
+    '''Writes a tab separated file with the header row, like the one Tabbycat's CSV button gives.'''
+    with open(file_name, 'w', newline='\n', encoding='utf-8') as f:
+        f.write('\t'.join(header)+'\n')
+        for row in rows:
+            f.write('\t'.join(str(cell) for cell in row)+'\n')
+
+def generate_tournament(out_dir:str, no_of_teams:int=40, no_of_rounds:int=5, swings:int=None,
+pool:list[str]=None, cyrillic_share:float=0.2, seed:int=0, debate_format:str='bp')->dict:
+    '''Writes a synthetic tournament in the format download_whole_tournament writes: speakers.csv,
+    teams_ranks_round_N.csv and teams_debates_round_N.csv, with Tabbycat headers.
+    Teams have a hidden strength, stronger teams place better and speak better more often.
+    Inputs:
+    out_dir: directory the files are written to, made if it doesn't exist
+    no_of_teams: number of teams on the speaker tab
+    no_of_rounds: number of the inrounds
+    swings: number of swing teams filling rooms in every round, they are in the debates but not on the speaker tab;
+    by default as many as needed to fill all rooms
+    pool: names debaters are sampled from (see make_pool), made for this tournament if it's None
+    cyrillic_share: share of names written in Cyrillic when the pool is made here
+    seed: seed of the random generator, same seed gives the same tournament
+    debate_format: name of the format (see formats.FORMATS), BP rooms have four teams of two debaters,
+    two team formats have won and lost results and teams of formats.DebateFormat.speakers debaters
+    Outputs:
+    dictionary with numbers of debaters, debates and swing teams, and the name of the directory'''
+    rng = random.Random(seed)
+    debate_format = formats.get_format(debate_format)
+    room = max(debate_format.teams, 2) # Formats with any number of teams get rooms of two
+    speakers = debate_format.speakers
+    sides, results = (SIDES, RESULTS) if room == 4 else (TWO_TEAM_SIDES, TWO_TEAM_RESULTS)
+    if swings is None:
+        swings = -no_of_teams % room
+    if (no_of_teams+swings) % room:
+        raise ValueError(f'{no_of_teams} teams and {swings} swing teams can\'t fill {debate_format.name} rooms!')
+    if pool is None:
+        pool = make_pool(speakers*no_of_teams, cyrillic_share, seed)
+    debaters = rng.sample(pool, speakers*no_of_teams)
+    institutions = [rng.choice(list(INSTITUTIONS)) for _ in range(no_of_teams)]
+    teams = [f'{INSTITUTIONS[institution]} {TEAM_WORDS[i % len(TEAM_WORDS)]} {i//len(TEAM_WORDS)+1}' for i, institution in enumerate(institutions)]
+    strength = {team: rng.gauss(0, 1) for team in teams}
+    swing_teams = [f'Swing {i+1}' for i in range(swings)]
+    strength.update({team: -1.0 for team in swing_teams})
+    points = {name: [] for name in debaters}
+    os.makedirs(out_dir, exist_ok=True)
+    for round_no in range(1, no_of_rounds+1):
+        in_round = teams + swing_teams
+        rng.shuffle(in_round)
+        debate_rows, rank_rows = [], []
+        for venue in range(len(in_round)//room):
+            debate = in_round[room*venue:room*venue+room]
+            debate_rows.append([f'Sala {venue+1}'] + debate)
+            placed = sorted(debate, key=lambda team: -(strength[team] + rng.gauss(0, 1)))
+            for place, team in enumerate(placed):
+                rank_rows.append([team, results[place], f'Sala {venue+1}'])
+        rng.shuffle(rank_rows) # Team results view is ordered by team, not by room
+        write_tab_file(os.path.join(out_dir, f'teams_debates_round_{round_no}.csv'), ['Venue'] + sides, debate_rows)
+        write_tab_file(os.path.join(out_dir, f'teams_ranks_round_{round_no}.csv'), ['Team', 'Result', 'Venue'], rank_rows)
+        for i, name in enumerate(debaters):
+            if rng.random() < 0.03:
+                points[name].append('') # Debater didn't speak in this round
+            else:
+                points[name].append(max(60, min(85, round(75 + 2*strength[teams[i//speakers]] + rng.gauss(0, 2)))))
+
+    speaker_rows = []
+    for i, name in enumerate(debaters):
+        spoken = [p for p in points[name] if p != '']
+        average = statistics.mean(spoken) if spoken else 0
+        deviation = statistics.pstdev(spoken) if spoken else 0
+        speaker_rows.append([name, institutions[i//speakers], teams[i//speakers], *points[name], f'{average:.2f}', f'{deviation:.2f}'])
+    speaker_rows.sort(key=lambda row: -float(row[-2]))
+    write_tab_file(os.path.join(out_dir, 'speakers.csv'),
+                   ['Rank', 'Name', 'Institution', 'Team'] + [f'R{i}' for i in range(1, no_of_rounds+1)] + ['Avg', 'Stdev'],
+                   [[rank, *row] for rank, row in enumerate(speaker_rows, start=1)])
+    return {'dir': out_dir, 'debaters': len(debaters), 'debates': no_of_rounds*len(in_round)//room, 'swing_teams': swings}
+
+def generate_season(out_dir:str, no_of_tournaments:int=10, no_of_debaters:int=1000, no_of_teams:int=40,
+no_of_rounds:int=5, cyrillic_share:float=0.2, seed:int=0)->str:
+    '''Writes a season of synthetic tournaments whose debaters come from the same pool, each in its own directory,
+    and a manifest listing them in order (see main.load_manifest). Returns the name of the manifest file.'''
+    pool = make_pool(no_of_debaters, cyrillic_share, seed)
+    lines = []
+    for i in range(no_of_tournaments):
+        tab_dir = os.path.join(out_dir, f'tournament_{i+1:03}')
+        generate_tournament(tab_dir, min(no_of_teams, no_of_debaters//2), no_of_rounds, pool=pool, seed=seed*100003+i)
+        lines.append(f'{tab_dir}\t{no_of_rounds}\n')
+    manifest = os.path.join(out_dir, 'season.tsv')
+    with open(manifest, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    return manifest
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Writes synthetic Tabbycat tabs for tests and benchmarks.')
+    parser.add_argument('out_dir')
+    parser.add_argument('--teams', type=int, default=40)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--swings', type=int, help='swing teams in every round, by default as many as BP rooms need')
+    parser.add_argument('--cyrillic', type=float, default=0.2, help='share of names written in Cyrillic')
+    parser.add_argument('--tournaments', type=int, default=1, help='more than 1 writes a season with a manifest')
+    parser.add_argument('--debaters', type=int, default=1000, help='size of the pool of debaters of a season')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=sorted(formats.FORMATS), default='bp', help='format of the debates of a single tournament')
+    args = parser.parse_args()
+    if args.tournaments > 1:
+        print(generate_season(args.out_dir, args.tournaments, args.debaters, args.teams, args.rounds, args.cyrillic, args.seed))
+    else:
+        print(generate_tournament(args.out_dir, args.teams, args.rounds, args.swings, cyrillic_share=args.cyrillic, seed=args.seed,
+                                  debate_format=args.format))
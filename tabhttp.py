@@ -0,0 +1,173 @@
+import http.client # Za HTTP zahteve bez pretraživača
+import json
+import re
+import html
+import queue
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+import tabrounds
+
+TABLES_DATA = re.compile(r'''["']?tablesData["']?\s*:\s*''') # Tabbycat puts table data in window.vueData on every tab page
+TAG = re.compile(r'<[^>]+>')
+WHITESPACE = re.compile(r'\s+')
+
+class HttpSession:
+    '''Keeps open HTTP connections, so pages from the same tab don't open a new connection every time.
+    Safe to use from more threads at once, every thread takes its own connection from the pool.'''
+
+    def __init__(self, timeout:float=30, user_agent:str='DebateEloApp'):
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.pools = {} # (scheme, host) -> queue of idle connections
+        self.lock = threading.Lock()
+
+    def connection(self, scheme:str, host:str)->http.client.HTTPConnection:
+        with self.lock:
+            pool = self.pools.setdefault((scheme, host), queue.LifoQueue())
+        try:
+            return pool.get_nowait()
+        except queue.Empty:
+            if scheme == 'https':
+                return http.client.HTTPSConnection(host, timeout=self.timeout)
+            return http.client.HTTPConnection(host, timeout=self.timeout)
+
+    def get(self, url:str, retries:int=1)->str:
+        '''Returns the body of the page as text, raises ConnectionError if the status isn't 200.'''
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        for attempt in range(retries+1):
+            conn = self.connection(parts.scheme, parts.netloc)
+            try:
+                conn.request('GET', path, headers={'User-Agent': self.user_agent, 'Connection': 'keep-alive'})
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                conn.close() # Server closed a kept connection, try again with a new one
+                if attempt == retries:
+                    raise
+                continue
+            if response.will_close:
+                conn.close()
+            else:
+                self.pools[(parts.scheme, parts.netloc)].put(conn)
+            if response.status != 200:
+                raise ConnectionError(f'{url} returned HTTP {response.status}')
+            return body.decode(response.headers.get_content_charset() or 'utf-8')
+
+    def close(self):
+        with self.lock:
+            for pool in self.pools.values():
+                while not pool.empty():
+                    pool.get_nowait().close()
+            self.pools = {}
+
+def extract_tables(page:str)->list[dict]:
+    '''Returns tables embedded in a Tabbycat page (tablesData from window.vueData).
+    Raises ValueError if the page has no tables.'''
+    match = TABLES_DATA.search(page)
+    if match is None:
+        raise ValueError('Page has no Tabbycat table data')
+    tables, _ = json.JSONDecoder().raw_decode(page, match.end())
+    return tables
+
+def cell_text(cell)->str:
+    '''Text of a table cell as it is shown on the page, without HTML.'''
+    if isinstance(cell, dict):
+        text = cell.get('text')
+        if text is None:
+            text = cell.get('sort', '')
+    else:
+        text = cell
+    text = html.unescape(TAG.sub('', str(text)))
+    return WHITESPACE.sub(' ', text).strip() # Tabs and new lines would break the tab separated format
+
+def table_to_text(table:dict)->str:
+    '''Converts a table to the tab separated text Tabbycat's CSV button gives, header row first.'''
+    header = [head.get('title') or head.get('tooltip') or head.get('key', '') for head in table['head']]
+    lines = ['\t'.join(cell_text(title) for title in header)]
+    for row in table['data']:
+        lines.append('\t'.join(cell_text(cell) for cell in row))
+    return '\n'.join(lines)+'\n'
+
+def load_page_text(session:HttpSession, url:str, table_index:int=0)->str:
+    '''Downloads a tab page and returns its table as CSV text.
+    Inputs:
+    session: HttpSession used for downloading
+    url: full url of the page
+    table_index: which table to take, if the page has more than one'''
+    return table_to_text(extract_tables(session.get(url))[table_index])
+
+def load_speakers_text(session:HttpSession, url:str)->str:
+    '''Same as webio.load_speakers_text, without a browser.'''
+    return load_page_text(session, f'{url}/tab/speaker/')
+
+def load_participants_text(session:HttpSession, url:str)->str:
+    '''Downloads the speakers of the tab with their teams from the participants page, as CSV text with the same
+    Name, Institution and Team columns as the speaker tab, without points (csvio.load_speaker_tab reads it).
+    Unlike the speaker tab, the page is public while the tournament is running.
+    Raises ValueError if the page has no table with a Team column.'''
+    for table in extract_tables(session.get(f'{url}/participants/list/')):
+        text = table_to_text(table)
+        if 'team' in {title.lower() for title in text.split('\n', 1)[0].split('\t')}: # Adjudicators' table has no teams
+            return text
+    raise ValueError(f'{url}/participants/list/ has no table of speakers')
+
+def load_teams_ranks_text(session:HttpSession, url:str, round:str)->str:
+    '''Same as webio.load_teams_ranks_text, without a browser.'''
+    return load_page_text(session, f'{url}/results/round/{round}/?view=team')
+
+def load_teams_debates_text(session:HttpSession, url:str, round:str)->str:
+    '''Same as webio.load_teams_debates_text, without a browser.'''
+    return load_page_text(session, f'{url}/results/round/{round}/?view=debate')
+
+def find_rounds(session:HttpSession, url:str)->list[tabrounds.TabRound]:
+    '''Finds the rounds of a tab whose results are released, from its results page, see tabrounds.rounds_from_index.'''
+    return tabrounds.rounds_from_index(session.get(f'{url}/results/'))
+
+def iter_whole_tournament(url:str, br_rundi:int=5, workers:int=4, session:HttpSession=None, outrounds=None)->Iterator[tuple[str,str]]:
+    '''Same as webio.iter_whole_tournament, pages are downloaded over HTTP, in parallel.
+    Output: generator of tuples (file name, CSV text), tabrounds.ROUNDS_FILE first if the rounds are looked up,
+    speakers.csv and then the files of every round in order'''
+    if url.endswith('/'):
+        url = url[:-1] # So the program works whether the URL ends with slash or not
+    own_session = session is None
+    if own_session:
+        session = HttpSession()
+
+    try:
+        if tabrounds.discovered(br_rundi, outrounds):
+            rounds = find_rounds(session, url)
+            yield tabrounds.ROUNDS_FILE, tabrounds.rounds_text(rounds) # All rounds, the selection is made when the tab is rated
+            rounds = tabrounds.select_rounds(rounds, br_rundi, outrounds)
+        else:
+            rounds = tabrounds.numbered_rounds(br_rundi)
+        jobs = [('speakers.csv', load_speakers_text, ())]
+        for tab_round in rounds:
+            ranks_file, debates_file = tab_round.file_names()
+            jobs.append((ranks_file, load_teams_ranks_text, (str(tab_round.number),)))
+            jobs.append((debates_file, load_teams_debates_text, (str(tab_round.number),)))
+
+        def run(job):
+            file_name, loader, args = job
+            return file_name, loader(session, url, *args)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+            yield from pool.map(run, jobs)
+    finally:
+        if own_session:
+            session.close()
+
+def fetch_whole_tournament(url:str, br_rundi:int=5, workers:int=4, session:HttpSession=None, outrounds=None)->dict[str,str]:
+    '''Same as webio.fetch_whole_tournament, pages are downloaded over HTTP, in parallel.
+    Output: dictionary whose keys are file names (speakers.csv, teams_ranks_round_1.csv...) and values are CSV texts'''
+    return dict(iter_whole_tournament(url, br_rundi, workers, session, outrounds))
+
+def download_whole_tournament(url:str, br_rundi:int=5, workers:int=4, out_dir:str='tournament_files', outrounds=None):
+    '''Same as webio.download_whole_tournament, without a browser.'''
+    for file_name, content in fetch_whole_tournament(url, br_rundi, workers, outrounds=outrounds).items():
+        with open(f'{out_dir}/{file_name}', 'w', encoding='utf-8') as f:
+            f.write(content)
@@ -0,0 +1,130 @@
+import html
+import os
+import re
+from typing import Iterator, NamedTuple
+
+ROUNDS_FILE = 'rounds.csv' # List of the rounds of a tab, written by the fetchers when rounds are discovered
+ROUNDS_HEADER = ['Round', 'Name', 'Stage', 'Category']
+STAGES = ('inround', 'break', 'semifinal', 'final')
+ROUND_LINK = re.compile(r'''<a\b[^>]*\bhref=["'][^"']*/results/round/(\d+)/[^"']*["'][^>]*>(.*?)</a>''', re.S | re.I)
+TAG = re.compile(r'<[^>]+>')
+WHITESPACE = re.compile(r'\s+')
+# Outround names (Open Quarterfinals, ESL Grand Final, Partial Double-Octofinals...), checked in this order,
+# text before the match is the break category
+SEMIFINAL = re.compile(r'semi[- ]?finals?|\bsf\b')
+BREAK = re.compile(r'(?:partial[- ])?(?:(?:double|triple)[- ]?)?octo|quarter|partial|elimination|\b(?:qf|of|dof|tof|pdof|pof)\b')
+FINAL = re.compile(r'\b(?:grand )?finals?\b|\bgf\b')
+
+class TabRound(NamedTuple):
+    '''One round of a tab.
+    number: sequence number of the round in the tab, the N in /results/round/N/ and in teams_ranks_round_N.csv
+    name: name of the round as the tab shows it
+    stage: 'inround', 'break' (outrounds before the semifinals), 'semifinal' or 'final'
+    category: break category of an outround (Open, ESL, Novice...), empty for inrounds and tabs with one category'''
+    number: int
+    name: str
+    stage: str = 'inround'
+    category: str = ''
+
+    def file_names(self)->tuple[str,str]:
+        '''Names of the team results and debates files of the round.'''
+        return f'teams_ranks_round_{self.number}.csv', f'teams_debates_round_{self.number}.csv'
+
+def round_stage(name:str)->tuple[str,str]:
+    '''Returns stage and break category of a round from its name, e.g. ('break', 'Open') for Open Quarterfinals.
+    Rounds whose name isn't an outround name are inrounds.'''
+    lower = name.lower()
+    for stage, pattern in (('semifinal', SEMIFINAL), ('break', BREAK), ('final', FINAL)):
+        match = pattern.search(lower)
+        if match:
+            return stage, name[:match.start()].strip(' -')
+    return 'inround', ''
+
+def rounds_from_index(page:str)->list[TabRound]:
+    '''Finds rounds in the results page of a Tabbycat tab (links to /results/round/N/), in the order of their numbers.
+    Only rounds whose results are released have links, so rounds that aren't finished yet aren't found.'''
+    rounds = {}
+    for number, text in ROUND_LINK.findall(page):
+        name = WHITESPACE.sub(' ', html.unescape(TAG.sub('', text))).strip()
+        if int(number) not in rounds and name:
+            rounds[int(number)] = TabRound(int(number), name, *round_stage(name))
+    return [rounds[number] for number in sorted(rounds)]
+
+def rounds_text(rounds:list[TabRound])->str:
+    '''Tab separated text of ROUNDS_FILE, header row first.'''
+    lines = ['\t'.join(ROUNDS_HEADER)]
+    lines.extend(f'{tab_round.number}\t{tab_round.name}\t{tab_round.stage}\t{tab_round.category}' for tab_round in rounds)
+    return '\n'.join(lines)+'\n'
+
+def parse_rounds(text:str)->list[TabRound]:
+    '''Reads rounds from the text of ROUNDS_FILE. Stage is found from the name if the column is empty.
+    Throws ValueError for unknown stages.'''
+    rounds = []
+    for line in text.splitlines()[1:]:
+        if not line.strip():
+            continue
+        columns = line.split('\t') + ['', '']
+        stage, category = round_stage(columns[1])
+        if columns[2]:
+            stage, category = columns[2].strip().lower(), columns[3].strip()
+        if stage not in STAGES:
+            raise ValueError(f'Round {columns[0]} has unknown stage {stage}!')
+        rounds.append(TabRound(int(columns[0]), columns[1], stage, category))
+    return rounds
+
+def load_rounds(file_name:str)->list[TabRound]:
+    '''Reads rounds from ROUNDS_FILE of a tab, see parse_rounds.'''
+    with open(file_name, encoding='utf-8') as f:
+        return parse_rounds(f.read())
+
+def numbered_rounds(num_of_rounds:int)->list[TabRound]:
+    '''Inrounds 1 to num_of_rounds, rounds of a tab whose rounds aren't looked up.'''
+    return [TabRound(i, f'Round {i}') for i in range(1, num_of_rounds+1)]
+
+def discovered(num_of_rounds:int=None, outrounds=None)->bool:
+    '''Tells whether rounds of a tab have to be looked up in the tab (ROUNDS_FILE, results page),
+    which is when the number of the inrounds isn't given or outrounds are rated.'''
+    return num_of_rounds is None or outrounds is not None
+
+def wanted(tab_round:TabRound, num_of_rounds:int=None, outrounds=None)->bool:
+    '''Tells whether the round is rated.
+    num_of_rounds: number of the inrounds, None for all inrounds of the tab
+    outrounds: None for no outrounds, True or empty collection for all of them,
+    or names of the break categories whose outrounds are rated (case doesn't matter)'''
+    if tab_round.stage == 'inround':
+        return num_of_rounds is None or tab_round.number <= num_of_rounds
+    if outrounds is None or outrounds is False:
+        return False
+    if outrounds is True or not outrounds:
+        return True
+    return tab_round.category.lower() in {category.lower() for category in outrounds}
+
+def select_rounds(rounds:list[TabRound], num_of_rounds:int=None, outrounds=None)->list[TabRound]:
+    '''Returns rounds which are rated, see wanted.'''
+    return [tab_round for tab_round in rounds if wanted(tab_round, num_of_rounds, outrounds)]
+
+def iter_rounds(tab_dir:str, num_of_rounds:int=None, outrounds=None, ready=None)->Iterator[TabRound]:
+    '''Generator over the rounds of a downloaded tab which are rated, in order, found only as they are needed.
+    If the number of the inrounds is given and outrounds aren't rated, those are rounds 1 to num_of_rounds, without looking
+    at the tab. Otherwise rounds are taken from ROUNDS_FILE, or if the tab doesn't have it (downloaded for a given
+    number of the inrounds), the inrounds are the rounds whose files are in tab_dir.
+    Inputs:
+    tab_dir: directory with the files of the tab
+    num_of_rounds, outrounds: which rounds are rated, see wanted
+    ready: optional function which waits until a file is in tab_dir, see main.rate_tournament'''
+    if not discovered(num_of_rounds, outrounds):
+        yield from numbered_rounds(num_of_rounds)
+        return
+    if ready is not None:
+        ready(ROUNDS_FILE)
+    rounds_file = os.path.join(tab_dir, ROUNDS_FILE)
+    if os.path.exists(rounds_file):
+        yield from select_rounds(load_rounds(rounds_file), num_of_rounds, outrounds)
+        return
+    i = 1
+    while num_of_rounds is None or i <= num_of_rounds:
+        tab_round = TabRound(i, f'Round {i}')
+        if not os.path.exists(os.path.join(tab_dir, tab_round.file_names()[0])):
+            return # Last round of the tab
+        yield tab_round
+        i += 1
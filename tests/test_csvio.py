@@ -31,26 +31,32 @@ def test_load_debater_elo_alt(tmp_path):
 
 def test_load_teams_participants(tmp_path):
     file = tmp_path / 'teams.csv'
-    row = '\t'.join(['1', 'John Doe', 'TeamA'] + ['x'] * 8) + '\n'
-    file.write_text('header\n' + row, encoding='utf-8')
-    result = csvio.load_teams_participants(str(file), speaker_csv_mode=True)
+    header = '\t'.join(['Rank', 'Name', 'Team', 'R1', 'R2', 'R3', 'R4', 'R5', 'Avg', 'Stdev']) + '\n'
+    row = '\t'.join(['1', 'John Doe', 'TeamA'] + ['70'] * 5 + ['70', '0']) + '\n'
+    file.write_text(header + row, encoding='utf-8')
+    result = csvio.load_teams_participants(str(file))
     assert result['john doe'] == 'TeamA'
 
 
 def test_load_team_ranks(tmp_path):
     file = tmp_path / 'ranks.csv'
-    file.write_text('header\nTeamA\tCollege\t1st\n', encoding='utf-8')
+    file.write_text('Team\tInstitution\tResult\nTeamA\tCollege\t1st\n', encoding='utf-8')
     result = csvio.load_team_ranks(str(file))
     assert result['TeamA'] == 1
 
 
 def test_convert_rank():
     assert csvio.convert_rank('3rd') == 3
+    assert csvio.convert_rank('12th') == 12 and csvio.convert_rank('21st') == 21
+    assert csvio.convert_rank('won') == 1 and csvio.convert_rank('lost') == 2
+    import pytest
+    with pytest.raises(ValueError):
+        csvio.convert_rank('')
 
 
 def test_load_debates(tmp_path):
     file = tmp_path / 'debates.csv'
-    file.write_text('header\n1\tTeamA\tTeamB\tTeamC\tTeamD\n', encoding='utf-8')
+    file.write_text('Venue\tOG\tOO\tCG\tCO\n1\tTeamA\tTeamB\tTeamC\tTeamD\n', encoding='utf-8')
     result = csvio.load_debates(str(file))
     assert {'TeamA', 'TeamB', 'TeamC', 'TeamD'} in result
 
@@ -65,8 +71,9 @@ def test_export_debater_elo(tmp_path):
 
 def test_uvezi_spikere(tmp_path):
     file = tmp_path / 'spk.csv'
+    header = ['Rank', 'Name', 'Institution', 'Team', 'R1', 'R2', 'R3', 'R4', 'R5', 'Avg']
     row = ['1', 'John Doe', 'x', 'TeamA'] + ['70'] * 5 + ['75']
-    file.write_text('header\n' + '\t'.join(row) + '\n', encoding='utf-8')
+    file.write_text('\t'.join(header) + '\n' + '\t'.join(row) + '\n', encoding='utf-8')
     result = csvio.uvezi_spikere(str(file), no_of_rounds=5)
     assert result['john doe'][0] == 'TeamA'
     assert result['john doe'][1] == [70] * 5
@@ -76,7 +83,91 @@ def test_uvezi_spikere(tmp_path):
 def test_add_debaters(tmp_path):
     data = {}
     file = tmp_path / 'add.csv'
-    file.write_text('header\n1\tJohn Doe\tTeamA\n', encoding='utf-8')
+    file.write_text('Rank\tName\tTeam\n1\tJohn Doe\tTeamA\n', encoding='utf-8')
     csvio.add_debaters(data, str(file))
     assert 'john doe' in data
     assert data['john doe'] == (1000, 0)
+
+
+def test_clean_name_matches_replace_chain():
+    import re
+    def reference(name):
+        name = csvio.cyrtranslit.to_latin(name.lower().strip(), 'sr')
+        for a, b in (('č','c'),('š','s'),('ž','z'),('ć','c'),('đ','d')):
+            name = name.replace(a, b)
+        return re.sub(r' .+? ', ' ', name)
+    for name in ['Đorđe Šešelj Žižić', '  Čedomir ĆIRIĆ ', 'Ana', 'Ana Marija Anić Kovač']:
+        assert csvio.clean_name(name) == reference(name)
+
+
+def test_clean_name_cache_stats():
+    csvio.clean_name.cache_clear()
+    csvio.clean_name('Marko Marković')
+    csvio.clean_name('Marko Marković')
+    info = csvio.clean_name.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    assert info.maxsize == csvio.NAME_CACHE_SIZE
+
+
+def test_load_speaker_tab(tmp_path):
+    file = tmp_path / 'spk.csv'
+    rows = [['1', 'John Doe', 'Uni', 'TeamA', '70', '72', '71', '0.5'],
+            ['2', 'Jane Roe', 'Uni', 'TeamA', '68', '-', '68', '0.0']]
+    header = ['Rank', 'Name', 'Institution', 'Team', 'R1', 'R2', 'Avg', 'Stdev']
+    file.write_text('\t'.join(header) + '\n' + ''.join('\t'.join(r) + '\n' for r in rows), encoding='utf-8')
+    tab = csvio.load_speaker_tab(str(file), no_of_rounds=2)
+    assert tab.names == ['john doe', 'jane roe']
+    assert tab.points == [[70, 72], [68, 0]]
+    assert tab.averages == [71.0, 68.0]
+    assert tab.speaker_points() == csvio.uvezi_spikere(str(file), no_of_rounds=2)
+    assert tab.speaker_teams() == {'john doe': 'TeamA', 'jane roe': 'TeamA'}
+    assert csvio.load_teams_participants(str(file), no_of_rounds=2) == {'john doe': 'TeamA', 'jane roe': 'TeamA'}
+    assert tab.institutions == ['Uni', 'Uni']
+    elo = {'john doe': (1200.0, 4)}
+    tab.add_to_elo(elo)
+    assert elo == {'john doe': (1200.0, 4), 'jane roe': (1000, 0)}
+
+
+def test_missing_speaker_tab(tmp_path):
+    data = {}
+    csvio.add_debaters(data, str(tmp_path / 'missing.csv'))
+    assert data == {}
+    assert csvio.load_teams_participants(str(tmp_path / 'missing.csv')) == {}
+
+
+def test_columns_found_from_header(tmp_path):
+    file = tmp_path / 'spk.csv'
+    rows = [['Name', 'Team', 'Round 1', 'Round 2', 'Round 3'], ['John Doe', 'TeamA', '70', '-', '74']]
+    file.write_text(''.join('\t'.join(r) + '\n' for r in rows), encoding='utf-8')
+    assert list(csvio.iter_speakers(str(file))) == [csvio.SpeakerRow('john doe', '', 'TeamA', [70, 0, 74], 72.0)]
+    ranks = tmp_path / 'ranks.csv'
+    ranks.write_text('Result\tTeam\n2nd\tTeamA\nwon\tTeamB\n', encoding='utf-8')
+    assert csvio.load_team_ranks(str(ranks)) == {'TeamA': 2, 'TeamB': 1}
+    debates = tmp_path / 'debates.csv'
+    debates.write_text('Venue\tGov\tOpp\tAdjudicators\nA1\tTeamA\tTeamB\tJudge\n', encoding='utf-8')
+    assert next(csvio.iter_debates(str(debates))) == csvio.Debate(('TeamA', 'TeamB'))
+
+
+def test_schema_mismatch(tmp_path):
+    import pytest
+    file = tmp_path / 'bad.csv'
+    file.write_text('Rank\tSpeaker\tR1\n1\tJohn Doe\t70\n', encoding='utf-8')
+    with pytest.raises(csvio.TabbycatSchemaError, match='team'):
+        csvio.load_speaker_tab(str(file))
+    file.write_text('Rank\tName\tTeam\tR1\n1\tJohn Doe\tTeamA\t70\n', encoding='utf-8')
+    with pytest.raises(csvio.TabbycatSchemaError, match='2 rounds expected'):
+        csvio.load_speaker_tab(str(file), no_of_rounds=2)
+    file.write_text('Rank\tName\tTeam\tR1\n1\tJohn Doe\n', encoding='utf-8')
+    with pytest.raises(csvio.TabbycatSchemaError, match='columns'):
+        csvio.load_speaker_tab(str(file))
+    file.write_text('Venue\tTeam 1\tTeam 2\nA1\tTeamA\tTeamB\n', encoding='utf-8')
+    with pytest.raises(csvio.TabbycatSchemaError, match='side'):
+        csvio.load_debates(str(file))
+
+
+def test_files_without_header(tmp_path):
+    file = tmp_path / 'ranks.csv'
+    file.write_text('TeamA\t1st\n', encoding='utf-8')
+    assert csvio.load_team_ranks(str(file), ignore_1=False, alt_instit=True) == {'TeamA': 1}
+    file.write_text('1\tJohn Doe\tUni\tTeamA\t70\t72\t71\n', encoding='utf-8')
+    assert csvio.uvezi_spikere(str(file), no_of_rounds=2, ignore_1=False) == {'john doe': ('TeamA', [70, 72], 71.0)}
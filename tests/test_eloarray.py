@@ -0,0 +1,126 @@
+import sys
+import types
+pyperclip = types.SimpleNamespace(paste=lambda: "", copy=lambda x: None)
+sys.modules.setdefault("pyperclip", pyperclip)
+cyr=types.SimpleNamespace(to_latin=lambda s,lang:s)
+service_mod=types.ModuleType("service")
+service_mod.Service=object
+wcm_mod=types.ModuleType("wcm")
+wcm_mod.ChromeDriverManager=object
+webdriver_mod=types.ModuleType("webdriver")
+webdriver_mod.Chrome=lambda *a,**k: None
+sys.modules.setdefault("cyrtranslit", cyr)
+sys.modules.setdefault("selenium", types.ModuleType("selenium"))
+sys.modules.setdefault("selenium.webdriver", webdriver_mod)
+sys.modules.setdefault("selenium.webdriver.chrome", types.ModuleType("chrome"))
+sys.modules.setdefault("selenium.webdriver.chrome.service", service_mod)
+sys.modules.setdefault("webdriver_manager.chrome", wcm_mod)
+import os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import random
+import numpy as np
+import pytest
+import main
+import eloarray
+
+
+def make_round(rng, no_of_teams=16, no_of_rounds=3):
+    speakers = {}
+    for i in range(no_of_teams):
+        for j in range(2):
+            speakers[f'spk{i}_{j}'] = (f'T{i}', [rng.randint(60,85) for _ in range(no_of_rounds)], 70.0)
+    elo = {name: (rng.uniform(900,1700), rng.randint(0,30)) for name in speakers}
+    return speakers, elo
+
+
+def test_k_factors_match():
+    ratings = np.array([1000, 1300, 1600, 1251, 1500, 1501], dtype=float)
+    debates = np.array([0, 5, 12, 25, 9, 19])
+    expected = [main.calculate_k_factor((r, d)) for r, d in zip(ratings, debates)]
+    assert list(eloarray.k_factors(ratings, debates)) == expected
+
+
+def test_speaker_modifiers_match():
+    deltas = np.arange(-25, 26)
+    for winner in (True, False):
+        expected = [main.speaker_modifier(d, winner) for d in deltas]
+        assert list(eloarray.speaker_modifiers(deltas, winner)) == expected
+
+
+def test_calculate_elo_parity():
+    rng = random.Random(3)
+    speakers, elo = make_round(rng)
+    deltas = main.build_speaker_deltas(speakers)
+    roster = main.build_team_roster({name: data[0] for name, data in speakers.items()})
+    state = eloarray.EloArrays.from_dict(elo)
+    for round_no in range(1, 4):
+        teams = [f'T{i}' for i in range(16)] + ['SWING']
+        rng.shuffle(teams)
+        debates = [set(teams[i:i+4]) for i in range(0, 16, 4)]
+        ranks = {team: i%4+1 for i, team in enumerate(teams)}
+        pairs = main.generate_pairs_debaters(main.generate_pairs_teams(ranks, debates), {}, roster)
+        elo = main.calculate_elo(pairs, elo, speakers, round_no, deltas)
+        eloarray.calculate_elo_arrays(pairs, state, deltas, round_no)
+    result = state.to_dict()
+    assert result.keys() == elo.keys()
+    for name in elo:
+        assert result[name][0] == pytest.approx(elo[name][0], rel=1e-12)
+        assert result[name][1] == elo[name][1]
+
+
+def test_calculate_elo_dict():
+    pairs = [('alice','bob'),('alice','swing')]
+    elo = {'alice':(1000,0),'bob':(1000,0)}
+    spk = {'alice':('A',[70],70),'bob':('B',[60],60)}
+    deltas = main.build_speaker_deltas(spk)
+    result = eloarray.calculate_elo(pairs, elo, deltas, 1)
+    expected = main.calculate_elo(pairs, elo, spk, 1, deltas)
+    assert result['alice'] == pytest.approx(expected['alice'])
+    assert result['bob'] == pytest.approx(expected['bob'])
+    assert 'swing' not in result
+
+
+def test_add_and_lookup():
+    state = eloarray.EloArrays()
+    assert state.add('alice') == 0
+    assert state.add('bob', 1200, 3) == 1
+    assert state.add('alice') == 0
+    assert list(state.lookup(['bob','carol'])) == [1, -1]
+    assert state.to_dict()['bob'] == (1200.0, 3)
+
+
+def test_events_parity():
+    rng = random.Random(5)
+    speakers, elo = make_round(rng, no_of_teams=8, no_of_rounds=1)
+    deltas = main.build_speaker_deltas(speakers)
+    roster = main.build_team_roster({name: data[0] for name, data in speakers.items()})
+    teams = [f'T{i}' for i in range(8)]
+    pairs_teams = main.generate_pairs_teams({team: i%4+1 for i, team in enumerate(teams)}, [set(teams[:4]), set(teams[4:])])
+    pairs = main.generate_pairs_debaters(pairs_teams, {}, roster)
+    python_events, numpy_events = [], []
+    main.calculate_elo(pairs, elo, speakers, 1, deltas, python_events)
+    eloarray.calculate_elo_arrays(pairs, eloarray.EloArrays.from_dict(elo), deltas, 1, numpy_events)
+    assert len(python_events) == len(numpy_events) == 16
+    for expected, event in zip(sorted(python_events), sorted(numpy_events)):
+        assert event[:2] == expected[:2] and event[4:6] == expected[4:6]
+        assert event[2:4] == pytest.approx(expected[2:4]) and event[6] == pytest.approx(expected[6])
+
+
+def test_custom_params_match():
+    from eloparams import EloParams
+    params = EloParams(base_k=40, rating_cuts=((1600, 15), (1400, 8), (1200, 2)), debate_multipliers=((3, 2.5), (15, 1.25)),
+                       speaker_scale=6, modifier_max=1.5, modifier_floor=0.2)
+    ratings = np.array([1000, 1201, 1401, 1601, 1399, 1700], dtype=float)
+    debates = np.array([0, 3, 14, 15, 2, 40])
+    expected = [main.calculate_k_factor((r, d), params) for r, d in zip(ratings, debates)]
+    assert list(eloarray.k_factors(ratings, debates, params)) == expected
+    assert expected[0] == 100 and expected[-1] == 25
+    deltas = np.arange(-12, 13)
+    for winner in (True, False):
+        assert list(eloarray.speaker_modifiers(deltas, winner, params)) == [main.speaker_modifier(d, winner, params) for d in deltas]
+    pairs = [('alice','bob'),('carol','alice')]
+    elo = {'alice':(1000,0),'bob':(1300,12),'carol':(1650,30)}
+    spk = {'alice':('A',[70],70),'bob':('B',[60],60),'carol':('C',[65],65)}
+    deltas = main.build_speaker_deltas(spk)
+    result = eloarray.calculate_elo(pairs, elo, deltas, 1, params)
+    assert result == pytest.approx(main.calculate_elo(pairs, elo, spk, 1, deltas, params=params))
+    assert result != pytest.approx(main.calculate_elo(pairs, elo, spk, 1, deltas))
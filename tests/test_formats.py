@@ -0,0 +1,103 @@
+import sys
+import types
+pyperclip = types.SimpleNamespace(paste=lambda: "", copy=lambda x: None)
+sys.modules.setdefault("pyperclip", pyperclip)
+cyr=types.SimpleNamespace(to_latin=lambda s,lang:s)
+service_mod=types.ModuleType("service")
+service_mod.Service=object
+wcm_mod=types.ModuleType("wcm")
+wcm_mod.ChromeDriverManager=object
+webdriver_mod=types.ModuleType("webdriver")
+webdriver_mod.Chrome=lambda *a,**k: None
+sys.modules.setdefault("cyrtranslit", cyr)
+sys.modules.setdefault("selenium", types.ModuleType("selenium"))
+sys.modules.setdefault("selenium.webdriver", webdriver_mod)
+sys.modules.setdefault("selenium.webdriver.chrome", types.ModuleType("chrome"))
+sys.modules.setdefault("selenium.webdriver.chrome.service", service_mod)
+sys.modules.setdefault("webdriver_manager.chrome", wcm_mod)
+sys.modules.pop('csvio', None) # Ensure real csvio module is loaded
+import os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import random
+import pytest
+import csvio
+import eloarray
+import formats
+import main
+import tabgen
+
+
+def test_bp_expansion_same_as_pairs_of_teams():
+    ranks = {'A':2, 'B':1, 'C':4, 'S':3}
+    debates = [{'A','B','C','S'}]
+    team_roster = {'A':['a1','a2'], 'B':['b1','b2','b3'], 'C':['c1']} # S is a swing team, C has a swing speaker
+    rosters = formats.team_rosters(team_roster, formats.BP)
+    assert rosters['B'] == ('b1','b2') and rosters['C'] == ('c1','UNKNOWN SINGLE SWING1')
+    expected = main.generate_pairs_debaters(main.generate_pairs_teams(ranks, debates), {}, team_roster)
+    ranked = formats.rank_debates(ranks, debates)
+    assert ranked == [('B','A','S','C')]
+    assert formats.expand_round(ranked, rosters) == expected
+    assert expected[:4] == [('b1','a1'), ('b2','a2'), ('b1','a2'), ('b2','a1')]
+    assert ('a1','UNKNOWN SWING 1') in expected and len(expected) == 6*4
+
+
+def test_tied_teams_dont_beat_each_other():
+    ranks = {team: csvio.convert_rank(result) for team, result in (('A','advancing'), ('B','eliminated'), ('C','Advancing'), ('D','eliminated'))}
+    ranked = formats.rank_debates(ranks, [{'A','B','C','D'}])
+    assert sorted(ranked) == [('A','B'), ('A','D'), ('C','B'), ('C','D')]
+    assert formats.rank_debates({'A':1, 'B':2}, [{'A','B'}]) == [('A','B')]
+
+
+def test_pairing_order_covers_every_pair():
+    assert formats.pairing_order(2, 2) == ((0,0), (1,1), (0,1), (1,0))
+    for winners, losers in ((3,3), (3,2), (1,4)):
+        order = formats.pairing_order(winners, losers)
+        assert sorted(order) == [(a, b) for a in range(winners) for b in range(losers)]
+
+
+def test_wsdc_pairs_speakers_who_spoke():
+    team_roster = {'Prop':['p1','p2','p3','p4'], 'Opp':['o1','o2','o3']} # p4 is the fourth member of the squad
+    points = {'p1':75, 'p2':74, 'p3':0, 'p4':72, 'o1':70, 'o2':71, 'o3':73}
+    rosters = formats.team_rosters(team_roster, formats.WSDC, points)
+    assert rosters == {'Prop':('p1','p2','p4'), 'Opp':('o1','o2','o3')}
+    ranked = formats.rank_debates({'Prop':csvio.convert_rank('lost'), 'Opp':csvio.convert_rank('won')}, [{'Prop','Opp'}], formats.WSDC)
+    pairs = formats.expand_round(ranked, rosters, formats.WSDC)
+    assert pairs[:3] == [('o1','p1'), ('o2','p2'), ('o3','p4')] and len(set(pairs)) == 9
+    assert formats.team_rosters({'Prop':['p1','p2','p3']}, formats.WSDC, {}) == {'Prop':('p1','p2','p3')} # Tab without points
+    assert formats.expand_round([('Prop','Swing')], rosters, formats.WSDC)[-1] == ('p4','UNKNOWN SWING 2')
+    with pytest.raises(ValueError):
+        formats.rank_debates({'A':1, 'B':2, 'C':3}, [{'A','B','C'}], formats.WSDC)
+    with pytest.raises(ValueError):
+        formats.get_format('lincoln-douglas')
+
+
+def test_expand_pairs_same_as_expand_round():
+    rng = random.Random(22)
+    state = eloarray.EloArrays()
+    team_roster = {}
+    for i in range(40):
+        team_roster[f'T{i}'] = [f'd{i}_{j}' for j in range(rng.randint(1, 4))] # Teams of different sizes
+        for name in team_roster[f'T{i}'][:-1]: # Last debater of every team isn't rated
+            state.add(name)
+    rosters = formats.team_rosters(team_roster, formats.OPEN)
+    teams = list(team_roster) + ['Swing 1', 'Swing 2']
+    rng.shuffle(teams)
+    ranked = [tuple(teams[i:i+rng.randint(1, 4)]) for i in range(0, len(teams), 4)] # Rooms with one to four teams
+    pairs = formats.expand_round(ranked, rosters, formats.OPEN)
+    winner_ids, loser_ids = eloarray.expand_pairs(*eloarray.round_arrays(ranked, rosters, state, formats.OPEN.speakers))
+    assert winner_ids.tolist() == state.lookup([pair[0] for pair in pairs]).tolist()
+    assert loser_ids.tolist() == state.lookup([pair[1] for pair in pairs]).tolist()
+
+
+@pytest.mark.parametrize('debate_format', ['wsdc', 'bp'])
+def test_backends_rate_formats_the_same(tmp_path, monkeypatch, debate_format):
+    monkeypatch.setattr(main, 'csvio', csvio)
+    info = tabgen.generate_tournament(str(tmp_path), no_of_teams=15, no_of_rounds=3, seed=5, debate_format=debate_format)
+    events = {}
+    results = {}
+    for backend in ('python', 'numpy'):
+        events[backend] = []
+        results[backend] = main.rate_tournament({}, str(tmp_path), 3, backend=backend, events=events[backend], debate_format=debate_format)
+    assert len(results['python']) == info['debaters'] == 15*formats.FORMATS[debate_format].speakers
+    assert all(abs(results['python'][name][0]-results['numpy'][name][0]) < 1e-9 for name in results['python'])
+    assert sorted(event[:2] for event in events['python']) == sorted(event[:2] for event in events['numpy'])
+    assert any(elo != 1000 for elo, _ in results['python'].values())
@@ -0,0 +1,102 @@
+import sys
+import types
+pyperclip = types.SimpleNamespace(paste=lambda: "", copy=lambda x: None)
+sys.modules.setdefault("pyperclip", pyperclip)
+cyr=types.SimpleNamespace(to_latin=lambda s,lang:s)
+service_mod=types.ModuleType("service")
+service_mod.Service=object
+wcm_mod=types.ModuleType("wcm")
+wcm_mod.ChromeDriverManager=object
+webdriver_mod=types.ModuleType("webdriver")
+webdriver_mod.Chrome=lambda *a,**k: None
+sys.modules.setdefault("cyrtranslit", cyr)
+sys.modules.setdefault("selenium", types.ModuleType("selenium"))
+sys.modules.setdefault("selenium.webdriver", webdriver_mod)
+sys.modules.setdefault("selenium.webdriver.chrome", types.ModuleType("chrome"))
+sys.modules.setdefault("selenium.webdriver.chrome.service", service_mod)
+sys.modules.setdefault("webdriver_manager.chrome", wcm_mod)
+sys.modules.pop('csvio', None) # Ensure real csvio module is loaded
+import os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import random
+import pytest
+import csvio
+import identity
+import main
+import tabgen
+
+
+def test_similarity():
+    assert identity.name_grams('nikola nikolic') == identity.name_grams('nikolic nikola')
+    assert identity.edit_similarity('nikolic', 'nikolik') == pytest.approx(6/7)
+    assert identity.similarity('nikolic nikola', 'nikola nikolic') == (1.0, 1.0)
+    assert identity.similarity('marko jovanovic', 'marija jovanovic')[1] == pytest.approx(0.5)
+    assert identity.similarity('ana petrovic', 'ana marija petrovic')[0] == pytest.approx(2/3)
+
+
+def test_resolver_merges_only_confident_names(tmp_path):
+    pool = {'nikola nikolic': (1200, 10), 'marko jovanovic': (1100, 4), 'ana petrovic': (1000, 1), 'stefan stojanovski': (1000, 2)}
+    resolver = identity.Resolver(identity.AliasTable(str(tmp_path / 'aliases.tsv')))
+    matches = resolver.resolve(['nikolic nikola', 'nikola nikolic', 'marija jovanovic', 'ana petrovic', 'stefan stojanovsky'], pool)
+    assert [(m.debater, m.status) for m in matches] == [
+        ('nikolic nikola', 'new'), # the same tab has nikola nikolic, two debaters are never merged into one
+        ('nikola nikolic', 'exact'),
+        ('marija jovanovic', 'new'),
+        ('ana petrovic', 'exact'),
+        ('stefan stojanovski', 'merged')]
+    resolver.aliases.save()
+    assert (tmp_path / 'aliases.tsv').read_text(encoding='utf-8') == 'stefan stojanovsky\tstefan stojanovski\t0.955\n'
+
+
+def test_alias_table_keeps_decisions(tmp_path):
+    aliases = tmp_path / 'aliases.tsv'
+    aliases.write_text('nikolic nikola\tnikolic nikola\t\nn. nikolic\tnikola nikolic\n', encoding='utf-8')
+    pool = {'nikola nikolic': (1200, 10), 'ana petrovic': (1000, 1)}
+    resolver = identity.Resolver(identity.AliasTable(str(aliases)))
+    assert resolver.rename(['nikolic nikola', 'n. nikolic', 'petrovic ana'], pool) == ['nikolic nikola', 'nikola nikolic', 'ana petrovic']
+    resolver.aliases.save()
+    again = identity.Resolver(identity.AliasTable(str(aliases)))
+    assert [m.status for m in again.resolve(['petrovic ana', 'nikolic nikola'], {**pool, 'nikolic nikola': (1000, 0)})] == ['alias', 'exact']
+
+
+def test_index_finds_typos_in_a_large_pool():
+    names = [csvio.clean_name(name) for name in tabgen.make_pool(20000, cyrillic_share=0, seed=4)]
+    index = identity.NameIndex(names)
+    rng = random.Random(4)
+    found = 0
+    for name in rng.sample(names, 100):
+        first, last = name.split(' ', 1)
+        i = rng.randrange(1, len(last)-1)
+        typo = f'{last[:i]}{"x" if last[i] != "x" else "y"}{last[i+1:]} {first}' # swapped order and a wrong letter
+        candidates = index.candidates(typo)
+        assert len(candidates) <= identity.CANDIDATES
+        found += index.best_match(typo)[0] == name
+    assert found >= 95
+
+
+def test_rate_tournament_with_resolver(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'csvio', csvio) # test_main may have imported main with a stub
+    info = tabgen.generate_tournament(str(tmp_path / 't1'), no_of_teams=8, no_of_rounds=2, cyrillic_share=0, seed=1)
+    elo = main.rate_tournament({}, info['dir'], 2)
+    speakers = (tmp_path / 't1' / 'speakers.csv').read_text(encoding='utf-8').split('\n')
+    columns = speakers[1].split('\t')
+    first, last = columns[1].split(' ', 1)
+    columns[1] = f'{last} {first}' # Name written the other way round on the next tab
+    speakers[1] = '\t'.join(columns)
+    (tmp_path / 't1' / 'speakers.csv').write_text('\n'.join(speakers), encoding='utf-8')
+    plain = main.rate_tournament(dict(elo), info['dir'], 2)
+    resolved = main.rate_tournament(dict(elo), info['dir'], 2, identities=identity.Resolver())
+    assert len(plain) == len(elo)+1 and len(resolved) == len(elo)
+    assert resolved[csvio.clean_name(f'{first} {last}')][1] == 4
+
+
+def test_run_cli_match(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(main, 'csvio', csvio)
+    (tmp_path / 'elo.csv').write_text('"nikola nikolic" 1200 10\n"stefan stojanovski" 1000 2\n', encoding='utf-8')
+    (tmp_path / 'tab').mkdir()
+    (tmp_path / 'tab' / 'speakers.csv').write_text('Rank\tName\tTeam\tR1\n1\tNikolić Nikola\tA\t75\n2\tStefan Stojanovsky\tA\t74\n3\tMarko Marković\tB\t70\n',
+                                                  encoding='utf-8')
+    main.run_cli(['match', str(tmp_path / 'tab'), '--elo-file', str(tmp_path / 'elo.csv'), '--aliases', str(tmp_path / 'aliases.tsv')])
+    assert capsys.readouterr().out.splitlines() == ['merged   1.00  nikolic nikola -> nikola nikolic',
+                                                    'merged   0.95  stefan stojanovsky -> stefan stojanovski',
+                                                    'new      0.33  marko markovic']
+    assert not (tmp_path / 'aliases.tsv').exists() # match doesn't save anything
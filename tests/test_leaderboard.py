@@ -0,0 +1,40 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import random
+import leaderboard
+
+
+def ranking(ratings):
+    return [(name, elo, debates) for name, (elo, debates) in sorted(ratings.items(), key=lambda item: (-item[1][0], item[0]))]
+
+
+def test_queries_match_sorting():
+    rng = random.Random(1)
+    ratings = {f'd{i}': (float(rng.randint(900, 1100)), rng.randint(0, 9)) for i in range(300)} # Many ties
+    board = leaderboard.Leaderboard(ratings, bucket_size=8)
+    for step in range(2000):
+        name = f'd{rng.randrange(400)}'
+        if name in ratings and rng.random() < 0.1:
+            board.remove(name)
+            del ratings[name]
+        else:
+            ratings[name] = (float(rng.randint(900, 1100)), rng.randint(0, 9))
+            board.update(name, *ratings[name])
+        if step % 100 == 0:
+            expected = ranking(ratings)
+            assert board.top(len(ratings)+5) == expected
+            assert board.top(10, 20) == expected[20:30]
+            for rank, (name, elo, _) in enumerate(expected, 1):
+                assert board.rank(name) == rank
+                assert board.percentile(name) == 100*sum(1 for e in ratings.values() if e[0] < elo)/len(ratings)
+            assert board.between(950, 1000.0) == [entry for entry in expected if 950 <= entry[1] <= 1000]
+    assert len(board) == len(ratings)
+
+
+def test_events_keep_ranking_current():
+    board = leaderboard.Leaderboard({'alice': (1000.0, 1), 'bob': (1010.0, 2)})
+    assert board.rank('alice') == 2
+    board.apply_event(('alice', 1, 1000.0, 1020.0, 2, 30, 1.0))
+    board.apply_event(('carol', 1, 1000.0, 990.0, 1, 30, 1.0))
+    assert board.top(3) == [('alice', 1020.0, 2), ('bob', 1010.0, 2), ('carol', 990.0, 1)]
+    assert board.percentile('alice') == 100*2/3
+    assert board.between(2000, 3000) == [] and leaderboard.Leaderboard().top() == []
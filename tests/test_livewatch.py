@@ -0,0 +1,187 @@
+import sys
+import types
+cyr=types.SimpleNamespace(to_latin=lambda s,lang:s)
+sys.modules.setdefault("cyrtranslit", cyr)
+sys.modules.pop('csvio', None) # Ensure real csvio module is loaded
+import os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+import csvio
+import livewatch
+import main
+import tabhttp
+import tabrounds
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'tabbycat')
+ROUNDS = {1: 'Round 1', 2: 'Round 2', 3: 'Open Semifinals'}
+
+
+class ScheduledTab(BaseHTTPRequestHandler):
+    '''Stand-in for a running Tabbycat tournament: recorded rounds (fixture pages) are released on a schedule,
+    round N after the results page was requested schedule[N] times, and pages of rounds that aren't released are missing.
+    Speaker tab is hidden until tab_released is set, the participants page is public.'''
+    protocol_version = 'HTTP/1.1'
+    schedule = {}
+    tab_released = False
+    index_requests = 0
+    requests = []
+
+    def released(self, number):
+        return ScheduledTab.index_requests >= ScheduledTab.schedule.get(number, float('inf'))
+
+    def do_GET(self):
+        ScheduledTab.requests.append(self.path)
+        body = None
+        if self.path == '/prva2025/results/':
+            ScheduledTab.index_requests += 1
+            links = ''.join(f'<a href="/prva2025/results/round/{number}/">{name}</a>\n' for number, name in ROUNDS.items() if self.released(number))
+            body = f'<html><body>{links}</body></html>'.encode('utf-8')
+        elif self.path == '/prva2025/tab/speaker/' and ScheduledTab.tab_released:
+            body = self.page('speaker_tab.html')
+        elif self.path == '/prva2025/participants/list/':
+            body = self.page('participants.html')
+        elif self.path.startswith('/prva2025/results/round/'):
+            number = int(self.path.split('/')[4])
+            if self.released(number):
+                body = self.page(f'round_{number}_{self.path.split("view=")[1]}.html')
+        self.send_response(200 if body is not None else 404)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body or b'')))
+        self.end_headers()
+        self.wfile.write(body or b'')
+
+    @staticmethod
+    def page(name):
+        with open(os.path.join(FIXTURES, name), 'rb') as f:
+            return f.read()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def running_tab(monkeypatch):
+    monkeypatch.setattr(main, 'csvio', csvio)
+    ScheduledTab.index_requests = 0
+    ScheduledTab.requests = []
+    ScheduledTab.tab_released = False
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ScheduledTab)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/prva2025/'
+    server.shutdown()
+    server.server_close()
+
+
+def rated_at_once(url, tmp_path, outrounds=[], points=False):
+    '''Ratings after the whole tab, without speaker points (as provisional ratings are) unless points is True.'''
+    ScheduledTab.schedule = {1: 0, 2: 0, 3: 0}
+    ScheduledTab.tab_released = True
+    os.makedirs(tmp_path, exist_ok=True)
+    tabhttp.download_whole_tournament(url, None, out_dir=str(tmp_path), outrounds=outrounds)
+    if not points:
+        session = tabhttp.HttpSession()
+        with open(os.path.join(tmp_path, 'speakers.csv'), 'w', encoding='utf-8') as f:
+            f.write(tabhttp.load_participants_text(session, url.rstrip('/')))
+        session.close()
+    return main.rate_tournament({'ana anic': (1200, 12)}, str(tmp_path), None, outrounds=outrounds)
+
+
+def test_rounds_are_rated_as_released(running_tab, tmp_path):
+    ScheduledTab.schedule = {1: 2, 2: 3, 3: 5}
+    live = livewatch.LiveTournament(running_tab, {'ana anic': (1200, 12)}, outrounds=[], tab_dir=str(tmp_path / 'live'))
+    released = [[tab_round.number for tab_round in live.poll()] for _ in range(5)]
+    assert released == [[], [1], [2], [], [3]]
+    round_requests = [path for path in ScheduledTab.requests if '/results/round/' in path]
+    assert len(round_requests) == len(set(round_requests)) == 6 # Every round is downloaded once
+    assert ScheduledTab.requests.count('/prva2025/participants/list/') == 1 and '/prva2025/tab/speaker/' not in ScheduledTab.requests
+    assert live.elo_debaters == rated_at_once(running_tab, tmp_path / 'whole')
+    assert live.elo_debaters != rated_at_once(running_tab, tmp_path / 'points', points=True) # Speaker modifiers are 1.0
+    assert [tab_round.stage for tab_round in live.rated] == ['inround', 'inround', 'semifinal']
+    assert tabrounds.load_rounds(str(tmp_path / 'live' / tabrounds.ROUNDS_FILE)) == live.rated
+    assert main.rate_tournament({'ana anic': (1200, 12)}, str(tmp_path / 'live'), None, outrounds=[]) == live.elo_debaters
+    live.close()
+
+
+def test_participants_text(running_tab):
+    session = tabhttp.HttpSession()
+    text = tabhttp.load_participants_text(session, running_tab.rstrip('/'))
+    session.close()
+    assert text.splitlines()[0] == 'Name\tInstitution\tTeam' and len(text.splitlines()) == 9
+    with pytest.raises(ValueError):
+        tabhttp.load_participants_text(types.SimpleNamespace(get=lambda url: '<script>tablesData: [{"head": [{"title": "Name"}], "data": []}]</script>'), 'x')
+
+
+def test_late_round_rates_again(running_tab, tmp_path):
+    ScheduledTab.schedule = {1: 2, 2: 1}
+    live = livewatch.LiveTournament(running_tab, {'ana anic': (1200, 12)})
+    assert [tab_round.number for tab_round in live.poll()] == [2]
+    assert [tab_round.number for tab_round in live.poll()] == [1, 2]
+    assert live.elo_debaters == rated_at_once(running_tab, tmp_path, None)
+    live.close()
+
+
+def test_serve_provisional_ratings(running_tab):
+    ScheduledTab.schedule = {1: 1}
+    live = livewatch.LiveTournament(running_tab, {'ana anic': (1200, 12), 'nobody': (1500, 40)})
+    stop = threading.Event()
+    livewatch.watch(live, interval=0, stop=stop, max_polls=2)
+    assert [tab_round.number for tab_round in live.rated] == [1]
+    server = livewatch.serve(live, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    def get(path):
+        connection = http.client.HTTPConnection(*server.server_address[:2])
+        connection.request('GET', path)
+        response = connection.getresponse()
+        body = json.loads(response.read())
+        connection.close()
+        return response.status, body
+    try:
+        status, body = get('/status')
+        assert status == 200 and body['polls'] == 2 and [r['name'] for r in body['rounds']] == ['Round 1']
+        status, body = get('/ratings?top=1')
+        assert body == [{'rank': 1, 'name': 'nobody', 'elo': 1500.0, 'debates': 40}]
+        status, body = get('/tournament')
+        assert len(body) == 8 and 'nobody' not in [row['name'] for row in body]
+        assert sum(row['change'] for row in body) != 0 and body == sorted(body, key=lambda row: -row['elo'])
+        status, body = get('/debater?name=Ana%20Ani%C4%87')
+        assert status == 200 and body['change'] == live.elo_debaters['ana anic'][0]-1200 and body['debates'] == 13
+        assert get('/debater?name=Nema%20Nikog')[0] == 404 and get('/standings')[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+        live.close()
+
+
+def test_failed_poll_keeps_ratings(running_tab, monkeypatch):
+    ScheduledTab.schedule = {1: 1, 2: 2}
+    live = livewatch.LiveTournament(running_tab, {})
+    live.poll()
+    after_first = dict(live.elo_debaters)
+    rate = main.rate_tournament
+    calls = []
+    def failing(elo_debaters, tab_dir, *args, **kwargs):
+        rate(elo_debaters, tab_dir, *args, **kwargs)
+        calls.append(tab_dir)
+        if len(calls) == 1: # New round fails after changing ratings, rounds before it are rated again
+            raise ValueError('Team Omega not found in rankings!')
+    monkeypatch.setattr(main, 'rate_tournament', failing)
+    livewatch.watch(live, interval=0, max_polls=1) # Error is logged, watching goes on
+    assert live.elo_debaters == after_first and [tab_round.number for tab_round in live.rated] == [1]
+    monkeypatch.setattr(main, 'rate_tournament', rate)
+    assert [tab_round.number for tab_round in live.poll()] == [2]
+    live.close()
+
+
+def test_run_cli_watch(running_tab, tmp_path, capsys):
+    ScheduledTab.schedule = {1: 1, 2: 2}
+    elo_file = tmp_path / 'elo.csv'
+    csvio.export_debater_elo({'ana anic': (1200, 12)}, str(elo_file))
+    main.run_cli(['watch', running_tab, '--polls', '2', '--interval', '0', '--port', '0', '--elo-file', str(elo_file),
+                  '--tab-dir', str(tmp_path / 'live'), '--top', '3'])
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3 and lines[0].split()[0] == '1'
+    assert csvio.load_debater_elo(str(elo_file)) == {'ana anic': (1200, 12)} # Provisional ratings aren't saved
+    assert sorted(os.listdir(tmp_path / 'live'))[:2] == [tabrounds.ROUNDS_FILE, 'speakers.csv']
@@ -14,7 +14,7 @@ webdriver_mod.Chrome=lambda *a,**k: None
 sys.modules.setdefault("cyrtranslit", cyr)
 sys.modules.setdefault("selenium", selenium_mod)
 csvio_stub = types.SimpleNamespace(load_debater_elo=lambda f:{}, add_debaters=lambda d,f:None, load_teams_participants=lambda f,no_of_rounds=5:{}, uvezi_spikere=lambda f,no_of_rounds=5:{}, load_team_ranks=lambda f,alt_instit=True:{}, load_debates=lambda f:[], export_debater_elo=lambda data,file:None); sys.modules["csvio"] = csvio_stub
-webio_stub = types.SimpleNamespace(download_whole_tournament=lambda url,n:None); sys.modules["webio"] = webio_stub
+webio_stub = types.SimpleNamespace(download_whole_tournament=lambda url,n,out_dir=None:None); sys.modules["webio"] = webio_stub
 sys.modules.setdefault("selenium.webdriver", webdriver_mod)
 sys.modules.setdefault("selenium.webdriver.chrome", types.ModuleType("chrome"))
 sys.modules.setdefault("selenium.webdriver.chrome.service", service_mod)
@@ -22,6 +22,13 @@ sys.modules.setdefault("webdriver_manager.chrome", wcm_mod)
 import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 import main
 import csvio
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_webio(monkeypatch):
+    # main imports webio only when downloading, other test files may replace it in sys.modules
+    monkeypatch.setitem(sys.modules, 'webio', webio_stub)
 
 
 def test_generate_pairs_teams():
@@ -39,6 +46,19 @@ def test_generate_pairs_debaters():
     result = main.generate_pairs_debaters(pairs, speakers)
     # expecting four combinations
     assert len(result) == 4
+    assert ('alice','bob') in result
+
+
+def test_build_team_roster():
+    speakers = {'alice':'A','bob':'B','carol':'A'}
+    assert main.build_team_roster(speakers) == {'A':['alice','carol'],'B':['bob']}
+
+
+def test_generate_pairs_debaters_roster():
+    speakers = {'alice':'A','carol':'A','bob':'B','dave':'B'}
+    roster = main.build_team_roster(speakers)
+    result = main.generate_pairs_debaters([('A','B')], speakers, roster)
+    assert result == [('alice','bob'),('carol','dave'),('alice','dave'),('carol','bob')]
 
 
 def test_calculate_k_factor():
@@ -55,6 +75,46 @@ def test_apply_speaker_modifier():
     assert main.apply_speaker_modifier('alice', speakers, True, 1) > 1
 
 
+def test_build_partner_map():
+    speakers = {'alice':('A',[70],70),'bob':('B',[60],60),'carol':('A',[75],75)}
+    partners = main.build_partner_map(speakers)
+    for name in speakers:
+        assert partners[name] == main.find_partner(name, speakers)
+
+
+def test_speaker_deltas_match_modifier():
+    import random
+    rng = random.Random(7)
+    speakers = {}
+    for i in range(40):
+        team = f'T{i//2}' if i < 36 else f'T{i}' # last four debated alone
+        speakers[f'spk{i}'] = (team, [rng.randint(60,85) for _ in range(5)], 70.0)
+    deltas = main.build_speaker_deltas(speakers)
+    for name in list(speakers)+['swing']:
+        for round_no in range(1,6):
+            for winner in (True, False):
+                expected = main.apply_speaker_modifier(name, speakers, winner, round_no)
+                assert main.apply_speaker_modifier(name, speakers, winner, round_no, deltas) == expected
+
+
+def test_speaker_modifier_bounds():
+    assert main.speaker_modifier(15, True) == 2
+    assert main.speaker_modifier(-15, True) == 0.1
+    assert main.speaker_modifier(-5, False) == 1.5
+
+
+def test_calculate_elo_events():
+    pairs = [('alice','bob'),('alice','carol'),('alice','swing')]
+    elo = {'alice':(1000,0),'bob':(1000,0),'carol':(1100,12)}
+    spk = {'alice':('A',[70],70),'bob':('B',[60],60),'carol':('C',[65],65)}
+    events = []
+    result = main.calculate_elo(pairs, elo, spk, 1, events=events)
+    by_name = {event[0]: event for event in events}
+    assert set(by_name) == {'alice','bob','carol'}
+    assert by_name['carol'] == ('carol', 1, 1100, result['carol'][0], 13, 45, 1.0)
+    assert by_name['alice'][2:5] == (1000, result['alice'][0], 1)
+
+
 def test_calculate_elo():
     pairs = [('alice','bob')]
     elo = {'alice':(1000,0),'bob':(1000,0)}
@@ -63,18 +123,286 @@ def test_calculate_elo():
     assert result['alice'][0] != 1000
 
 
-def test_enter_tournament(monkeypatch):
+def fake_speaker_tab(calls):
+    tab = types.SimpleNamespace(names=['a'], teams=['A'], points=[[70]], averages=[70],
+                                speaker_teams=lambda: {'a':'A'}, speaker_points=lambda: {'a':('A',[70],70)})
+    tab.add_to_elo = lambda e: calls.append('add')
+    return tab
+
+
+def test_enter_tournament(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
     calls = []
-    monkeypatch.setattr(main.webio, 'download_whole_tournament', lambda u,r: calls.append('web'))
+    monkeypatch.setattr(webio_stub, 'download_whole_tournament', lambda u,r,out_dir=None: calls.append('web'))
     monkeypatch.setattr(main.csvio, 'load_debater_elo', lambda f: {})
-    monkeypatch.setattr(main.csvio, 'add_debaters', lambda e,f: calls.append('add'))
-    monkeypatch.setattr(main.csvio, 'load_teams_participants', lambda f,no_of_rounds: {'a':'A'})
-    monkeypatch.setattr(main.csvio, 'uvezi_spikere', lambda f,no_of_rounds: {'a':('A',[70],70)})
+    monkeypatch.setattr(main.csvio, 'load_speaker_tab', lambda f,no_of_rounds: fake_speaker_tab(calls), raising=False)
     monkeypatch.setattr(main.csvio, 'load_team_ranks', lambda f,alt_instit=True: {'A':1,'B':2})
     monkeypatch.setattr(main.csvio, 'load_debates', lambda f: [{'A','B'}])
     monkeypatch.setattr(main, 'generate_pairs_teams', lambda ranks,debates: [('A','B')])
-    monkeypatch.setattr(main, 'generate_pairs_debaters', lambda pairs,st: [('a','b')])
-    monkeypatch.setattr(main, 'calculate_elo', lambda pairs,elo,spk,i: {'a':(1000,1)})
+    monkeypatch.setattr(main, 'generate_pairs_debaters', lambda pairs,st,roster=None: [('a','b')])
+    monkeypatch.setattr(main, 'elo_updates', lambda pairs,elo,spk,i,deltas=None,events=None,params=None,weight=1.0: {'a':(1000,1)})
     monkeypatch.setattr(main.csvio, 'export_debater_elo', lambda elo,file: calls.append(file))
     main.enter_tournament('url',num_of_rounds=1, spk_file='spk.csv', new_elo_file='elo.csv')
     assert 'web' in calls
+
+
+def test_enter_tournament_unknown_backend():
+    import pytest
+    with pytest.raises(ValueError):
+        main.enter_tournament('url', num_of_rounds=1, backend='fortran')
+
+
+def test_load_manifest(tmp_path):
+    file = tmp_path / 'season.tsv'
+    file.write_text('# season\nhttps://a.calicotab.com/t1/\t5\n\nfiles/t2\t3\n', encoding='utf-8')
+    dated = tmp_path / 'dated.tsv'
+    dated.write_text('files/t1\t5\t2025-03-01\n', encoding='utf-8')
+    assert main.load_manifest(str(dated)) == [('files/t1', 5, '2025-03-01')]
+    assert main.load_manifest(str(file)) == [('https://a.calicotab.com/t1/', 5, None), ('files/t2', 3, None)]
+
+
+def test_replay_season(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    manifest = tmp_path / 'season.tsv'
+    manifest.write_text('https://a.calicotab.com/t1/\t2\nfiles/t2\t3\nfiles/t3\t1\n', encoding='utf-8')
+    calls = []
+    monkeypatch.setattr(webio_stub, 'download_whole_tournament', lambda u,r,out_dir=None: calls.append(('web',u)))
+    monkeypatch.setattr(main.csvio, 'load_debater_elo', lambda f: calls.append(('load',f)) or {})
+    monkeypatch.setattr(main.csvio, 'export_debater_elo', lambda elo,file: calls.append(('export',file)))
+    rated = []
+    def fake_rate(elo, tab_dir, rounds, spk_file, backend, events=None, ready=None, identities=None, debate_format=None, outrounds=None, params=None, board=None):
+        rated.append((tab_dir, rounds))
+        return dict(elo, **{tab_dir:(1000, rounds)})
+    monkeypatch.setattr(main, 'rate_tournament', fake_rate)
+    result = main.replay_season(str(manifest), 'elo.csv', checkpoint_every=2)
+    assert rated == [('tournament_files', 2), ('files/t2', 3), ('files/t3', 1)]
+    assert calls == [('load','elo.csv'), ('web','https://a.calicotab.com/t1/'), ('export','elo.csv'), ('export','elo.csv')]
+    assert set(result) == {'tournament_files', 'files/t2', 'files/t3'}
+
+
+def test_rate_tournament_reads_tab_dir(monkeypatch):
+    files = []
+    monkeypatch.setattr(main.csvio, 'load_speaker_tab', lambda f,no_of_rounds: files.append(f) or fake_speaker_tab([]), raising=False)
+    monkeypatch.setattr(main.csvio, 'load_team_ranks', lambda f,alt_instit=True: files.append(f) or {'A':1})
+    monkeypatch.setattr(main.csvio, 'load_debates', lambda f: files.append(f) or [{'A'}])
+    result = main.rate_tournament({'a':(1000,0)}, 'tabs', 1)
+    assert files == [os.path.join('tabs','speakers.csv'), os.path.join('tabs','teams_ranks_round_1.csv'), os.path.join('tabs','teams_debates_round_1.csv')]
+    assert result == {'a':(1000,0)}
+
+
+def test_rate_tournament_duplicate_names(monkeypatch):
+    # "Ana Marija Petrović" and "Ana Petrović" are both sanitized to the same name, the later row is kept
+    tab = types.SimpleNamespace(names=['ana petrovic','b','ana petrovic'], teams=['X','B','A'], points=[[60],[70],[75]], averages=[60,70,75])
+    tab.speaker_teams = lambda: dict(zip(tab.names, tab.teams))
+    tab.add_to_elo = lambda e: [e.setdefault(name, (1000,0)) for name in tab.names]
+    monkeypatch.setattr(main.csvio, 'load_speaker_tab', lambda f,no_of_rounds: tab, raising=False)
+    monkeypatch.setattr(main.csvio, 'load_team_ranks', lambda f,alt_instit=True: {'A':1,'B':2})
+    monkeypatch.setattr(main.csvio, 'load_debates', lambda f: [{'A','B'}])
+    result = main.rate_tournament({}, 'tabs', 1)
+    assert result['ana petrovic'][0] > 1000 > result['b'][0]
+    assert result['ana petrovic'][1] == result['b'][1] == 1
+
+def test_download_tournament_fetchers(monkeypatch, tmp_path):
+    import pytest
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    monkeypatch.setattr(webio_stub, 'download_whole_tournament', lambda u,r,out_dir=None: calls.append((u,r)))
+    main.download_tournament('url', 3)
+    assert calls == [('url', 3)]
+    with pytest.raises(ValueError):
+        main.download_tournament('url', 3, fetcher='carrier pigeon')
+
+
+def test_download_tournament_cached(monkeypatch, tmp_path):
+    import tabcache
+    monkeypatch.chdir(tmp_path)
+    os.mkdir('tournament_files')
+    cache = tabcache.TabCache(str(tmp_path / 'cache'))
+    fetched = []
+    monkeypatch.setattr(webio_stub, 'fetch_whole_tournament', lambda u,r: fetched.append(u) or {n: n for n in main.tournament_file_names(r)}, raising=False)
+    main.download_tournament('https://t/', 1, cache=cache)
+    main.download_tournament('https://t', 1, cache=cache)
+    assert fetched == ['https://t/'] # second run is served from the cache
+    assert (tmp_path / 'tournament_files' / 'teams_debates_round_1.csv').read_text(encoding='utf-8') == 'teams_debates_round_1.csv'
+
+
+def test_enter_tournament_store(monkeypatch, tmp_path):
+    import ratingstore
+    db = str(tmp_path / 'elo.db')
+    monkeypatch.chdir(tmp_path)
+    with ratingstore.RatingStore(db) as store:
+        store.save({'a':(1000,0),'b':(1000,0)})
+    monkeypatch.setattr(webio_stub, 'download_whole_tournament', lambda u,r,out_dir=None: None)
+    monkeypatch.setattr(main, 'rate_tournament', lambda elo,d,r,s,b,ev,identities=None,debate_format=None,outrounds=None,params=None,board=None: ev.append(('a',1,1000.0,1010.0,1,90,1.0)) or dict(elo, a=(1010.0,1)))
+    exported = []
+    monkeypatch.setattr(main.csvio, 'export_debater_elo', lambda elo,file: exported.append(file))
+    main.enter_tournament('https://t/', num_of_rounds=1, new_elo_file=db)
+    assert exported == [] # no full rewrite and no archival copy
+    with ratingstore.RatingStore(db) as store:
+        assert store.load() == {'a':(1010.0,1),'b':(1000.0,0)}
+        (_, imported, _), (seq, name, _) = store.tournaments()
+        assert (imported, name) == (ratingstore.IMPORT_TOURNAMENT, 'https://t/')
+        assert store.snapshot(seq) == {'a':(1010.0,1)}
+        assert store.ratings_after(seq) == {'a':(1010.0,1),'b':(1000.0,0)} # b was only imported
+        assert store.history('a') == [('https://t/',1,1000.0,1010.0,1,90,1.0)]
+
+
+def test_replay_season_without_dates(monkeypatch, tmp_path):
+    import datetime
+    import ratingstore
+    def fake_rate(elo, tab_dir, rounds, spk_file, backend, events=None, ready=None, identities=None, debate_format=None, outrounds=None, params=None, board=None):
+        events.append(('a', 1, 1000.0, 1010.0, 1, 30, 1.0))
+        return dict(elo, a=(1010.0, 1))
+    monkeypatch.setattr(main, 'rate_tournament', fake_rate)
+    manifest = tmp_path / 'season.tsv'
+    manifest.write_text('t1\t1\n', encoding='utf-8')
+    db = str(tmp_path / 'elo.db')
+    main.replay_season(str(manifest), db)
+    today = datetime.date.today()
+    with ratingstore.RatingStore(db) as store:
+        assert store.rating_as_of('a', (today + datetime.timedelta(days=1)).isoformat()) == (1010.0, 1)
+        assert store.rating_as_of('a', (today - datetime.timedelta(days=1)).isoformat()) is None
+
+
+def test_recompute_from(monkeypatch, tmp_path):
+    import ratingstore
+    results = {'t1': {'a': 10}, 't2': {'b': 5}, 't3': {'b': None}, 't4': {'a': 3}, 't5': {'c': 1}}
+    rated = []
+    def fake_rate(elo, tab_dir, rounds, spk_file, backend, events=None, ready=None, identities=None, debate_format=None, outrounds=None, params=None, board=None):
+        rated.append((tab_dir, identities))
+        elo = dict(elo)
+        for name, delta in results[tab_dir].items():
+            before = elo.get(name, (1000.0, 0))
+            elo[name] = (1000.0 if delta is None else before[0]+delta, before[1]+1) # None resets the rating
+            events.append((name, 1, before[0], elo[name][0], elo[name][1], 30, 1.0))
+        return elo
+    monkeypatch.setattr(main, 'rate_tournament', fake_rate)
+    manifest = tmp_path / 'season.tsv'
+    manifest.write_text(''.join(f'{t}\t1\n' for t in results), encoding='utf-8')
+    db = str(tmp_path / 'elo.db')
+    main.replay_season(str(manifest), db)
+    results['t2'] = {'b': 7, 'c': 2} # corrected tab
+    rated.clear()
+    aliases = []
+    identities = type('Resolver', (), {'aliases': type('Aliases', (), {'save': lambda self: aliases.append(True)})()})()
+    assert main.recompute_from(str(manifest), 't2', db, identities=identities) == (3, 1)
+    # t3 resets b, and nobody whose rating changed debated in t4, but c did in t5
+    assert rated == [('t2', identities), ('t3', identities), ('t5', identities)]
+    assert aliases == [True]
+    full = str(tmp_path / 'full.db')
+    main.replay_season(str(manifest), full)
+    with ratingstore.RatingStore(db) as store, ratingstore.RatingStore(full) as expected:
+        assert store.load() == expected.load()
+        assert store.rebuild_ratings() == expected.load()
+        for name in 'abc':
+            assert store.history(name) == expected.history(name)
+        for (seq, _, _), (expected_seq, _, _) in zip(store.tournaments(), expected.tournaments()):
+            assert store.leaderboard_after(seq, 10) == expected.leaderboard_after(expected_seq, 10)
+    import pytest
+    with pytest.raises(ValueError):
+        main.recompute_from(str(manifest), 't2', str(tmp_path / 'elo.csv'))
+
+
+def test_recompute_from_rewrites_last_tournament(monkeypatch, tmp_path):
+    import ratingstore
+    results = {'t1': {'a': 10}, 't2': {'b': 5}, 't3': {'b': None}}
+    def fake_rate(elo, tab_dir, rounds, spk_file, backend, events=None, ready=None, identities=None, debate_format=None, outrounds=None, params=None, board=None):
+        elo = dict(elo)
+        for name, delta in results[tab_dir].items():
+            before = elo.get(name, (1000.0, 0))
+            elo[name] = (1000.0 if delta is None else before[0]+delta, before[1]+1)
+            events.append((name, 1, before[0], elo[name][0], elo[name][1], 30, 1.0))
+        return elo
+    monkeypatch.setattr(main, 'rate_tournament', fake_rate)
+    manifest = tmp_path / 'season.tsv'
+    manifest.write_text(''.join(f'{t}\t1\n' for t in results), encoding='utf-8')
+    db = str(tmp_path / 'elo.db')
+    main.replay_season(str(manifest), db)
+    results['t2'] = {'b': 7}
+    assert main.recompute_from(str(manifest), 't2', db) == (2, 0) # ratings after t3 are the same again
+    with ratingstore.RatingStore(db) as store:
+        assert store.history('b') == [('t2',1,1000.0,1007.0,1,30,1.0), ('t3',1,1007.0,1000.0,2,30,1.0)]
+
+
+def test_calculate_elo_is_quiet_and_counts_swings(capsys):
+    import metrics
+    metrics.METRICS.reset()
+    elo = {'alice': (1000, 0), 'bob': (1000, 0)}
+    spk = {'alice': ('A', [70], 70), 'bob': ('B', [60], 60)}
+    main.calculate_elo([('alice', 'bob'), ('swing', 'bob')], elo, spk, 1)
+    assert capsys.readouterr().out == ''
+    assert metrics.METRICS.counters['swings_defaulted'] == 1
+
+
+def test_run_cli_metrics_and_profile(monkeypatch, tmp_path):
+    import json
+    monkeypatch.setattr(main.csvio, 'load_debater_elo', lambda f: {'a': (1000.0, 1)})
+    main.run_cli(['-q', '--metrics', str(tmp_path / 'm.json'), '--profile', str(tmp_path / 'p.prof'),
+                  'leaderboard', '--elo-file', str(tmp_path / 'elo.csv'), '--top', '1'])
+    assert set(json.loads((tmp_path / 'm.json').read_text(encoding='utf-8'))) == {'timers', 'counters'}
+    assert (tmp_path / 'p.prof').exists()
+
+
+def test_run_cli_leaderboard_from_store(monkeypatch, tmp_path, capsys):
+    import ratingstore
+    db = str(tmp_path / 'elo.db')
+    with ratingstore.RatingStore(db) as store:
+        store.save({'alice': (1000.0, 1), 'bob': (1100.0, 2), 'carol': (1050.0, 3)}, 't1')
+    monkeypatch.setattr(ratingstore.RatingStore, 'load', lambda self: pytest.fail('all ratings were loaded'))
+    main.run_cli(['leaderboard', '--elo-file', db, '--top', '2', '--start', '1'])
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[:2] for line in lines] == [['2', 'carol'], ['3', 'alice']]
+
+
+def test_import_has_no_web_dependencies():
+    import subprocess
+    code = ('import sys, types; sys.modules["cyrtranslit"] = types.SimpleNamespace(to_latin=lambda s,lang: s); import main; '
+            'print(sorted(m for m in ("webio", "selenium", "webdriver_manager", "pyperclip", "tabhttp") if m in sys.modules))')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    assert result.stdout.strip() == '[]'
+    assert result.stderr == '' # nothing is downloaded or logged at import
+
+
+def test_run_cli_fetch(monkeypatch, tmp_path):
+    downloaded = []
+    monkeypatch.setattr(webio_stub, 'download_whole_tournament', lambda u,r,out_dir=None: downloaded.append((u,r,out_dir)))
+    rated = []
+    monkeypatch.setattr(main, 'rate_tournament', lambda *args, **kwargs: rated.append(args))
+    main.run_cli(['fetch', 'https://t/', '--rounds', '3', '--out-dir', str(tmp_path / 'tab'), '--no-cache'])
+    assert downloaded == [('https://t/', 3, str(tmp_path / 'tab'))]
+    assert rated == [] # fetching doesn't rate
+
+
+def test_run_cli_rate(monkeypatch, tmp_path):
+    import tabcache
+    entered = []
+    def fake_enter(tab_dir, tournament, rounds, new_elo_file, backend, identities=None, debate_format=None, outrounds=None, params=None, board=None):
+        entered.append((tournament, rounds, new_elo_file, backend, sorted(os.listdir(tab_dir))))
+    monkeypatch.setattr(main, 'enter_tab', fake_enter)
+    monkeypatch.setattr(main, 'import_fetcher', lambda fetcher: pytest.fail('rate must not download'))
+    cache_dir = str(tmp_path / 'cache')
+    with pytest.raises(ValueError):
+        main.run_cli(['rate', 'https://t/', '--rounds', '1', '--cache-dir', cache_dir])
+    tabcache.TabCache(cache_dir).put_tournament('https://t/', {n: n for n in main.tournament_file_names(1)})
+    main.run_cli(['rate', 'https://t/', '--rounds', '1', '--cache-dir', cache_dir, '--elo-file', 'elo.db'])
+    tab_dir = tmp_path / 'tab'
+    tab_dir.mkdir()
+    main.run_cli(['rate', str(tab_dir), '--rounds', '2', '--backend', 'numpy'])
+    assert entered == [('https://t/', 1, 'elo.db', 'python', sorted(main.tournament_file_names(1))),
+                       (str(tab_dir), 2, 'elo.csv', 'numpy', [])]
+
+
+def test_run_cli_outrounds(monkeypatch, tmp_path):
+    entered = []
+    def fake_enter(tab_dir, tournament, rounds, new_elo_file, backend, identities=None, debate_format=None, outrounds=None, params=None, board=None):
+        entered.append((rounds, outrounds, dict(params.round_weights)))
+    monkeypatch.setattr(main, 'enter_tab', fake_enter)
+    main.run_cli(['rate', str(tmp_path), '--outrounds', '--round-weight', 'final=1.5', '--round-weight', 'break=0.5'])
+    main.run_cli(['rate', str(tmp_path), '--rounds', '5', '--outrounds', 'Open', 'ESL'])
+    main.run_cli(['rate', str(tmp_path)])
+    assert entered == [(None, [], {'break': 0.5, 'semifinal': 1.0, 'final': 1.5}),
+                       (5, ['Open', 'ESL'], {'break': 1.0, 'semifinal': 1.0, 'final': 1.0}),
+                       (None, None, {'break': 1.0, 'semifinal': 1.0, 'final': 1.0})]
+    with pytest.raises(SystemExit):
+        main.run_cli(['rate', str(tmp_path), '--round-weight', 'inround=2'])
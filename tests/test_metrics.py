@@ -0,0 +1,67 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import logging
+import pstats
+import threading
+import metrics
+
+
+def test_stage_and_count(tmp_path):
+    m = metrics.Metrics()
+    for _ in range(3):
+        with m.stage('parse'):
+            pass
+    m.count('pairs', 6)
+    m.count('pairs')
+    assert m.timers['parse'][1] == 3 and m.timers['parse'][0] >= 0
+    assert m.counters == {'pairs': 7}
+    m.write_json(str(tmp_path / 'm.json'))
+    data = json.loads((tmp_path / 'm.json').read_text(encoding='utf-8'))
+    assert data['counters'] == {'pairs': 7} and data['timers']['parse']['calls'] == 3
+    m.reset()
+    assert m.to_dict() == {'timers': {}, 'counters': {}}
+
+
+def test_record_from_threads():
+    m = metrics.Metrics()
+    def record():
+        for _ in range(2000):
+            m.count('pairs')
+            with m.stage('elo'):
+                pass
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert m.counters == {'pairs': 8000} and m.timers['elo'][1] == 8000
+
+
+def test_stage_timed_when_it_fails():
+    m = metrics.Metrics()
+    try:
+        with m.stage('download'):
+            raise ConnectionError
+    except ConnectionError:
+        pass
+    assert m.timers['download'][1] == 1
+
+
+def test_profiled(tmp_path):
+    with metrics.profiled(None):
+        pass
+    with metrics.profiled(str(tmp_path / 'run.prof')):
+        sum(range(1000))
+    assert pstats.Stats(str(tmp_path / 'run.prof')).total_calls > 0
+
+
+def test_configure_logging(tmp_path):
+    log_file = str(tmp_path / 'run.log')
+    metrics.configure_logging(2, log_file)
+    assert logging.getLogger().level == logging.DEBUG
+    logging.getLogger('main').debug('visible')
+    metrics.configure_logging(-1)
+    assert logging.getLogger().level == logging.ERROR
+    assert 'visible' in open(log_file, encoding='utf-8').read()
+    metrics.configure_logging(0)
+    assert logging.getLogger().level == logging.WARNING
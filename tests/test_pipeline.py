@@ -0,0 +1,133 @@
+import sys
+import types
+pyperclip = types.SimpleNamespace(paste=lambda: "", copy=lambda x: None)
+sys.modules.setdefault("pyperclip", pyperclip)
+cyr=types.SimpleNamespace(to_latin=lambda s,lang:s)
+service_mod=types.ModuleType("service")
+service_mod.Service=object
+wcm_mod=types.ModuleType("wcm")
+wcm_mod.ChromeDriverManager=object
+webdriver_mod=types.ModuleType("webdriver")
+webdriver_mod.Chrome=lambda *a,**k: None
+sys.modules.setdefault("cyrtranslit", cyr)
+sys.modules.setdefault("selenium", types.ModuleType("selenium"))
+sys.modules.setdefault("selenium.webdriver", webdriver_mod)
+sys.modules.setdefault("selenium.webdriver.chrome", types.ModuleType("chrome"))
+sys.modules.setdefault("selenium.webdriver.chrome.service", service_mod)
+sys.modules.setdefault("webdriver_manager.chrome", wcm_mod)
+sys.modules.pop('csvio', None) # Ensure real csvio module is loaded
+import os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading
+import time
+import pytest
+import csvio
+import main
+import pipeline
+import tabcache
+import tabgen
+
+
+class FakeFetcher:
+    '''Serves tabs of synthetic tournaments by URL, slowly, and records what happened in which order.'''
+    def __init__(self, tabs, log, delay=0.005, fail_after=None):
+        self.tabs = tabs
+        self.log = log
+        self.delay = delay
+        self.fail_after = fail_after
+
+    def iter_whole_tournament(self, url, rounds):
+        for i, file_name in enumerate(main.tournament_file_names(rounds)):
+            if self.fail_after is not None and i == self.fail_after:
+                raise ConnectionError(f'{url} went down')
+            time.sleep(self.delay)
+            self.log.append(('fetch', url, file_name))
+            with open(os.path.join(self.tabs[url], file_name), encoding='utf-8') as f:
+                yield file_name, f.read()
+
+
+@pytest.fixture
+def season(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'csvio', csvio) # test_main may have imported main with a stub
+    manifest = tabgen.generate_season(str(tmp_path / 'tabs'), no_of_tournaments=3, no_of_debaters=60, no_of_teams=12, no_of_rounds=3, seed=5)
+    tournaments = main.load_manifest(manifest)
+    tabs = {f'https://t{i}.calicotab.com/open/': source for i, (source, _, _) in enumerate(tournaments)}
+    url_manifest = tmp_path / 'urls.tsv'
+    url_manifest.write_text(''.join(f'{url}\t3\n' for url in tabs), encoding='utf-8')
+    return manifest, str(url_manifest), tabs
+
+
+def rate_logged(log, delay=0.02):
+    rate = main.rate_tournament
+    def logged(elo, tab_dir, rounds, spk_file='speakers.csv', backend='python', events=None, params=main.DEFAULT_PARAMS, ready=None, identities=None, debate_format='bp', outrounds=None, board=None):
+        def logged_ready(file_name):
+            if ready is not None:
+                ready(file_name)
+            log.append(('rate', file_name))
+            time.sleep(delay) # rating is slower than downloading
+        return rate(elo, tab_dir, rounds, spk_file, backend, events, params, logged_ready, identities, debate_format, outrounds, board)
+    return logged
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_replay_keeps_board_current(season, tmp_path, backend):
+    import leaderboard
+    manifest, _, _ = season
+    board = leaderboard.Leaderboard()
+    result = main.replay_season(manifest, str(tmp_path / 'elo.csv'), backend=backend, board=board)
+    expected = leaderboard.Leaderboard(dict(result.items()))
+    assert len(board) == len(expected) == len(result)
+    assert board.top(len(result)) == expected.top(len(result))
+
+
+def test_pipeline_gives_same_ratings_and_overlaps(season, tmp_path, monkeypatch):
+    manifest, url_manifest, tabs = season
+    expected = main.replay_season(manifest, str(tmp_path / 'dirs.csv'))
+    log = []
+    monkeypatch.setattr(main, 'import_fetcher', lambda fetcher: FakeFetcher(tabs, log))
+    monkeypatch.setattr(main, 'rate_tournament', rate_logged(log))
+    result = main.replay_season(url_manifest, str(tmp_path / 'urls.csv'), fetcher='http', prefetch=1)
+    assert result == expected
+    rated = [entry[1] for entry in log if entry[0] == 'rate']
+    assert rated == main.tournament_file_names(3)*3 # strict order of tournaments and rounds
+    fetches = [i for i, entry in enumerate(log) if entry[0] == 'fetch']
+    rates = [i for i, entry in enumerate(log) if entry[0] == 'rate']
+    assert all(fetch < rate for fetch, rate in zip(fetches, rates)) # every file is rated after it was downloaded
+    assert rates[0] < fetches[-1] # rating started before everything was downloaded
+    assert fetches[7] < rates[6] # next tournament was downloading while the first one was rated
+
+
+def test_queues_are_bounded(season, monkeypatch):
+    _, _, tabs = season
+    log = []
+    monkeypatch.setattr(main, 'import_fetcher', lambda fetcher: FakeFetcher(tabs, log, delay=0))
+    tournaments = [(url, 3, None) for url in tabs]
+    with pipeline.TabPipeline(tournaments, 'http', tournaments_ahead=1, rounds_ahead=1) as tabs_ahead:
+        time.sleep(0.3) # nothing is rated, so fetching has to stop
+        assert len(log) <= 3 # speaker tab and one round of the first tournament
+        source, rounds, _, tab_dir, ready = next(iter(tabs_ahead))
+        assert source == tournaments[0][0] and rounds == 3
+        ready('teams_debates_round_1.csv')
+        assert os.path.exists(os.path.join(tab_dir, 'teams_debates_round_1.csv'))
+    temp_dir = tab_dir
+    assert not os.path.exists(temp_dir) # removed when the pipeline is closed
+
+
+def test_fetch_error_reaches_rating(season, tmp_path, monkeypatch):
+    _, url_manifest, tabs = season
+    monkeypatch.setattr(main, 'import_fetcher', lambda fetcher: FakeFetcher(tabs, [], fail_after=3))
+    with pytest.raises(ConnectionError):
+        main.replay_season(url_manifest, str(tmp_path / 'elo.csv'), fetcher='http', prefetch=2)
+    assert not (tmp_path / 'elo.csv').exists()
+    assert not any(thread.name == 'tab-pipeline' for thread in threading.enumerate()) # fetching thread stopped
+
+
+def test_pipeline_fills_and_uses_cache(season, tmp_path, monkeypatch):
+    _, url_manifest, tabs = season
+    log = []
+    monkeypatch.setattr(main, 'import_fetcher', lambda fetcher: FakeFetcher(tabs, log))
+    cache = tabcache.TabCache(str(tmp_path / 'cache'))
+    first = main.replay_season(url_manifest, str(tmp_path / 'first.csv'), fetcher='http', cache=cache, prefetch=3)
+    fetched = len(log)
+    second = main.replay_season(url_manifest, str(tmp_path / 'second.csv'), fetcher='http', cache=cache, prefetch=3)
+    assert fetched == 3*7 and len(log) == fetched # second season is served from the cache
+    assert first == second
@@ -0,0 +1,82 @@
+import sys
+import types
+pyperclip = types.SimpleNamespace(paste=lambda: "", copy=lambda x: None)
+sys.modules.setdefault("pyperclip", pyperclip)
+cyr=types.SimpleNamespace(to_latin=lambda s,lang:s)
+service_mod=types.ModuleType("service")
+service_mod.Service=object
+wcm_mod=types.ModuleType("wcm")
+wcm_mod.ChromeDriverManager=object
+webdriver_mod=types.ModuleType("webdriver")
+webdriver_mod.Chrome=lambda *a,**k: None
+sys.modules.setdefault("cyrtranslit", cyr)
+sys.modules.setdefault("selenium", types.ModuleType("selenium"))
+sys.modules.setdefault("selenium.webdriver", webdriver_mod)
+sys.modules.setdefault("selenium.webdriver.chrome", types.ModuleType("chrome"))
+sys.modules.setdefault("selenium.webdriver.chrome.service", service_mod)
+sys.modules.setdefault("webdriver_manager.chrome", wcm_mod)
+sys.modules.pop('csvio', None) # Ensure real csvio module is loaded
+import os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import itertools
+import random
+import numpy as np
+import pytest
+import csvio
+import main
+import predict
+import tabgen
+
+
+def brute_force(strengths, rating_scale=400):
+    '''Plackett-Luce placements of one room, order by order.'''
+    weights = [10 ** (s / rating_scale) for s in strengths]
+    placements = np.zeros((len(strengths), len(strengths)))
+    for order in itertools.permutations(range(len(strengths))):
+        probability = 1.0
+        for place, team in enumerate(order):
+            probability *= weights[team] / sum(weights[other] for other in order[place:])
+        for place, team in enumerate(order):
+            placements[team, place] += probability
+    return placements
+
+
+def test_placements_match_plackett_luce():
+    rng = random.Random(25)
+    for size in (1, 2, 3, 4):
+        strengths = np.array([[rng.uniform(800, 1800) for _ in range(size)] for _ in range(20)])
+        placements = predict.placement_probabilities(strengths)
+        assert placements.shape == (20, size, size)
+        for room in range(20):
+            assert placements[room] == pytest.approx(brute_force(strengths[room]))
+        assert placements.sum(axis=1) == pytest.approx(np.ones((20, size))) # Every place is taken by someone
+        assert placements.sum(axis=2) == pytest.approx(np.ones((20, size))) # Every team takes a place
+    assert predict.placement_probabilities(np.full((1, 4), 1300.0))[0] == pytest.approx(np.full((4, 4), 0.25))
+    win = predict.placement_probabilities(np.array([[1600.0, 1450.0]]))[0, 0, 0]
+    assert win == pytest.approx(1 / (1 + 10 ** ((1450 - 1600) / 400))) # ELO expected score
+    assert np.isfinite(predict.placement_probabilities(np.array([[1e6, 0.0, 0.0, 0.0]]))).all()
+
+
+def test_forecast_draw():
+    elo = {'a1': (1500, 10), 'a2': (1300, 10), 'b1': (1000, 3), 'c1': (1200, 5), 'c2': (1200, 5), 'c3': (2000, 5)}
+    team_roster = {'A': ['a1', 'a2'], 'B': ['b1', 'b2'], 'C': ['c1', 'c2', 'c3']}
+    forecasts = predict.forecast_draw([{'B', 'A', 'Swing', 'C'}, {'A', 'B'}], team_roster, elo)
+    room = forecasts[0]
+    assert room.teams == ('A', 'B', 'C', 'Swing')
+    assert room.strengths.tolist() == [1400, 1000, 1200, 1000] # b2 and the swing team aren't rated, c3 isn't paired in BP
+    assert room.placements[0, 0] == max(room.placements[:, 0]) and room.placements[1] == pytest.approx(room.placements[3])
+    assert room.expected_points().sum() == pytest.approx(6)
+    assert forecasts[1].placements.shape == (2, 2) and forecasts[1].expected_points((1, 0))[0] > 0.5
+    open_room = predict.forecast_draw([{'C'}], team_roster, elo, 'open')[0]
+    assert open_room.strengths.tolist() == [pytest.approx(4400/3)] and open_room.placements.tolist() == [[1.0]]
+
+
+def test_run_cli_predict(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(main, 'csvio', csvio)
+    tabgen.generate_tournament(str(tmp_path), no_of_teams=8, no_of_rounds=1, seed=25)
+    elo = main.rate_tournament({}, str(tmp_path), 1)
+    csvio.export_debater_elo(elo, str(tmp_path / 'elo.csv'))
+    main.run_cli(['predict', str(tmp_path / 'teams_debates_round_1.csv'), '--speakers', str(tmp_path / 'speakers.csv'),
+                  '--elo-file', str(tmp_path / 'elo.csv')])
+    lines = capsys.readouterr().out.splitlines()
+    assert [line for line in lines if line.startswith('Room')] == ['Room 1', 'Room 2']
+    assert len(lines) == 10 and all(line.count('%') == 4 for line in lines if not line.startswith('Room'))
@@ -0,0 +1,104 @@
+import sys
+import types
+cyr=types.SimpleNamespace(to_latin=lambda s,lang:s)
+sys.modules.setdefault("cyrtranslit", cyr)
+sys.modules.pop('csvio', None) # Ensure real csvio module is loaded
+import os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import importlib
+import csvio
+ratingstore = importlib.reload(importlib.import_module('ratingstore'))
+
+
+def test_save_and_load(tmp_path):
+    with ratingstore.RatingStore(str(tmp_path / 'elo.db')) as store:
+        assert store.load() == {}
+        assert store.save({'alice': (1000, 0), 'bob': (1100.5, 3)}) == 2
+    with ratingstore.RatingStore(str(tmp_path / 'elo.db')) as store:
+        assert store.load() == {'alice': (1000.0, 0), 'bob': (1100.5, 3)}
+
+
+def test_only_changed_are_written(tmp_path):
+    with ratingstore.RatingStore(str(tmp_path / 'elo.db')) as store:
+        elo = {f'd{i}': (1000.0, 0) for i in range(100)}
+        assert store.save(elo) == 100
+        elo['d3'] = (1010.0, 1)
+        elo['new'] = (1000.0, 0)
+        assert store.save(elo) == 2
+        assert store.save(elo) == 0
+
+
+def test_snapshots_are_deltas(tmp_path):
+    with ratingstore.RatingStore(str(tmp_path / 'elo.db')) as store:
+        elo = {'alice': (1000.0, 0), 'bob': (1000.0, 0)}
+        store.save(elo, tournament='t1')
+        elo['alice'] = (1020.0, 4)
+        store.save(elo, tournament='t2')
+        elo['bob'] = (990.0, 4)
+        store.save(elo, tournament='t3')
+        (seq1, name1, _), (seq2, _, _), (seq3, _, _) = store.tournaments()
+        assert name1 == 't1'
+        assert store.conn.execute('SELECT COUNT(*) FROM snapshots WHERE seq = ?', (seq2,)).fetchone()[0] == 1
+        assert store.ratings_after(seq1) == {'alice': (1000.0, 0), 'bob': (1000.0, 0)}
+        assert store.ratings_after(seq2) == {'alice': (1020.0, 4), 'bob': (1000.0, 0)}
+        assert store.ratings_after(seq3) == elo
+
+
+def test_csv_interchange(tmp_path):
+    (tmp_path / 'elo.csv').write_text('john 1200.0 3\njane 1100.0 4\n', encoding='utf-8')
+    with ratingstore.RatingStore(str(tmp_path / 'elo.db')) as store:
+        assert store.import_csv(str(tmp_path / 'elo.csv')) == 2
+        store.export_csv(str(tmp_path / 'out.csv'))
+        assert store.ratings_after(store.tournaments()[-1][0]) == {'john': (1200.0, 3), 'jane': (1100.0, 4)}
+    assert csvio.load_debater_elo(str(tmp_path / 'out.csv')) == {'john': (1200.0, 3), 'jane': (1100.0, 4)}
+
+
+def test_is_store():
+    assert ratingstore.is_store('elo.db')
+    assert not ratingstore.is_store('elo.csv')
+
+
+def test_event_log(tmp_path):
+    with ratingstore.RatingStore(str(tmp_path / 'elo.db')) as store:
+        store.save({'alice': (1000.0, 0), 'bob': (1000.0, 0), 'carol': (1200.0, 9)}, tournament='import')
+        store.save({'alice': (1015.0, 2), 'bob': (985.0, 2), 'carol': (1200.0, 9)}, 't1',
+                   [('alice', 1, 1000.0, 1010.0, 1, 90, 1.0), ('bob', 1, 1000.0, 990.0, 1, 90, 1.0),
+                    ('alice', 2, 1010.0, 1015.0, 2, 90, 0.5), ('bob', 2, 990.0, 985.0, 2, 90, 1.5)], held_on='2025-03-01')
+        store.save({'alice': (1030.0, 3), 'bob': (985.0, 2), 'carol': (1200.0, 9)}, 't2',
+                   [('alice', 1, 1015.0, 1030.0, 3, 90, 1.0)], held_on='2025-04-05')
+        assert store.rating_as_of('alice', '2025-02-01') is None
+        assert store.rating_as_of('alice', '2025-03-01') == (1015.0, 2)
+        assert store.rating_as_of('alice', '2025-12-31') == (1030.0, 3)
+        assert [event[:2] for event in store.history('alice')] == [('t1', 1), ('t1', 2), ('t2', 1)]
+        seq = store.tournament_seq('t1')
+        assert store.leaderboard_after(seq, top=2) == [('carol', 1200.0, 9), ('alice', 1015.0, 2)]
+        assert store.leaderboard_after(seq)[:2] == store.leaderboard_after(seq, top=2)
+        assert store.rating_after('bob', store.tournament_seq('t2')) == (985.0, 2)
+        assert store.rebuild_ratings() == store.load()
+        import pytest
+        with pytest.raises(ValueError):
+            store.save({}, events=[('alice', 1, 1.0, 2.0, 1, 1, 1.0)])
+
+
+def test_save_without_tournament_is_an_import(tmp_path):
+    with ratingstore.RatingStore(str(tmp_path / 'elo.db')) as store:
+        store.save({'alice': (1000.0, 0), 'bob': (1100.0, 3)})
+        store.save({'alice': (1015.0, 1), 'bob': (1100.0, 3)}, 't1', [('alice', 1, 1000.0, 1015.0, 1, 90, 1.0)])
+        store.save({'alice': (1015.0, 1), 'bob': (1120.0, 4)}) # edited by hand
+        assert store.save({'alice': (1015.0, 1), 'bob': (1120.0, 4)}) == 0
+        assert [name for _, name, _ in store.tournaments()] == [ratingstore.IMPORT_TOURNAMENT, 't1', ratingstore.IMPORT_TOURNAMENT]
+        seq = store.tournament_seq('t1')
+        assert store.ratings_after(seq) == {'alice': (1015.0, 1), 'bob': (1100.0, 3)}
+        assert store.rebuild_ratings() == store.load() == {'alice': (1015.0, 1), 'bob': (1120.0, 4)}
+        assert store.sync_current() == 0
+        assert len(store.tournaments()) == 3
+
+
+def test_old_store_gets_dates(tmp_path):
+    import sqlite3
+    conn = sqlite3.connect(str(tmp_path / 'old.db'))
+    conn.execute('CREATE TABLE tournaments (seq INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, rated_at REAL NOT NULL)')
+    conn.commit()
+    conn.close()
+    with ratingstore.RatingStore(str(tmp_path / 'old.db')) as store:
+        store.save({'alice': (1000.0, 0)}, 't1', held_on='2025-01-01')
+        assert store.conn.execute('SELECT held_on FROM tournaments').fetchone() == ('2025-01-01',)
@@ -0,0 +1,118 @@
+import sys
+import types
+pyperclip = types.SimpleNamespace(paste=lambda: "", copy=lambda x: None)
+sys.modules.setdefault("pyperclip", pyperclip)
+cyr=types.SimpleNamespace(to_latin=lambda s,lang:s)
+service_mod=types.ModuleType("service")
+service_mod.Service=object
+wcm_mod=types.ModuleType("wcm")
+wcm_mod.ChromeDriverManager=object
+webdriver_mod=types.ModuleType("webdriver")
+webdriver_mod.Chrome=lambda *a,**k: None
+sys.modules.setdefault("cyrtranslit", cyr)
+sys.modules.setdefault("selenium", types.ModuleType("selenium"))
+sys.modules.setdefault("selenium.webdriver", webdriver_mod)
+sys.modules.setdefault("selenium.webdriver.chrome", types.ModuleType("chrome"))
+sys.modules.setdefault("selenium.webdriver.chrome.service", service_mod)
+sys.modules.setdefault("webdriver_manager.chrome", wcm_mod)
+import os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import pickle
+import random
+import pytest
+import main
+import eloarray
+import registry
+
+
+def make_tab(rng, no_of_teams=12, no_of_rounds=4):
+    speakers = {}
+    for i in range(no_of_teams):
+        for j in range(1 if i == 0 else 2): # first team has only one speaker
+            speakers[f'spk{i}_{j}'] = (f'T{i}', [rng.randint(60,85) for _ in range(no_of_rounds)], 70.0+j)
+    elo = {name: (rng.uniform(900,1700), rng.randint(0,30)) for name in speakers}
+    return speakers, elo
+
+
+def make_pairs(rng, speakers):
+    names = list(speakers) + ['swing']
+    rng.shuffle(names)
+    return [(names[i], names[i+1]) for i in range(0, len(names)-1, 2)] + [(names[0], names[3])]
+
+
+def test_registry_works_as_dict():
+    reg = registry.DebaterRegistry({'a': (1000.0, 0), 'b': (1200.5, 7)})
+    reg['c'] = (900, 1)
+    reg['a'] = (1010.0, 1)
+    assert len(reg) == 3 and list(reg) == ['a', 'b', 'c']
+    assert reg['a'] == (1010.0, 1) and reg.get('x') is None and 'x' not in reg
+    assert reg.id_of('c') == 2 and reg.id_of('x') == -1
+    assert reg == {'a': (1010.0, 1), 'b': (1200.5, 7), 'c': (900.0, 1)}
+    assert reg.to_dict() == dict(reg.items())
+    with pytest.raises(TypeError):
+        del reg['a']
+
+
+def test_points_table_matches_speaker_tab():
+    rng = random.Random(1)
+    speakers, _ = make_tab(rng)
+    table = registry.PointsTable.from_speaker_points(speakers)
+    assert len(table) == len(speakers) and table.names == list(speakers)
+    for name, data in speakers.items():
+        assert table[name] == data
+    deltas = table.deltas()
+    expected = main.build_speaker_deltas(speakers)
+    assert len(deltas) == len(expected)
+    for round_deltas, expected_round in zip(deltas, expected):
+        assert {name: round_deltas[name] for name in speakers} == expected_round
+        assert 'swing' not in round_deltas and round_deltas.get('swing', 0) == 0
+    with pytest.raises(ValueError):
+        registry.PointsTable.from_speaker_points({'a': ('A', [70], 70.0), 'b': ('B', [70, 71], 70.5)})
+    table.add(table.names[0], 'Other', [1]*table.no_of_rounds, 1.0) # same sanitized name twice, the later row is kept
+    assert table.names == list(speakers) and table[table.names[0]] == ('Other', [1]*table.no_of_rounds, 1.0)
+    assert table[table.names[1]] == speakers[table.names[1]]
+
+
+def test_points_table_from_speaker_tab_and_rounds():
+    import csvio
+    import formats
+    speakers, elo = make_tab(random.Random(3))
+    tab = csvio.SpeakerTab()
+    for name, (team, points, average) in speakers.items():
+        tab.names.append(name)
+        tab.teams.append(team)
+        tab.points.append(points)
+        tab.averages.append(average)
+    table = registry.PointsTable.from_speaker_tab(tab)
+    assert [table[name] for name in table] == [speakers[name] for name in tab.names]
+    for round_no in range(1, 6):
+        assert table.round_points(round_no) == formats.points_in_round(speakers, round_no) # nothing for round 5
+    state = eloarray.EloArrays.from_dict(elo)
+    for round_deltas, expected in zip(table.deltas(), main.build_speaker_deltas(speakers)):
+        assert dict(zip(round_deltas, round_deltas.values())) == expected
+        eloarray.np.testing.assert_array_equal(eloarray.delta_array(state, round_deltas), eloarray.delta_array(state, expected))
+
+
+def test_calculate_elo_with_packed_tables():
+    rng = random.Random(5)
+    speakers, elo = make_tab(rng)
+    table = registry.PointsTable.from_speaker_points(speakers)
+    reg = registry.DebaterRegistry(elo)
+    deltas = main.build_speaker_deltas(speakers)
+    for round_no in range(1, 5):
+        pairs = make_pairs(rng, speakers)
+        events, packed_events = [], []
+        before = dict(elo)
+        elo = main.calculate_elo(pairs, elo, speakers, round_no, deltas, events)
+        reg.update(main.elo_updates(pairs, reg, table, round_no, table.deltas(), packed_events))
+        assert before != elo # calculate_elo returns a new dictionary
+        assert reg == pytest.approx(elo) and packed_events == events
+    state = eloarray.EloArrays.from_dict(reg)
+    eloarray.calculate_elo_arrays(pairs, state, table.deltas(), 4)
+    assert state.to_dict() == pytest.approx(eloarray.calculate_elo(pairs, elo, deltas, 4))
+
+
+def test_tables_pickle():
+    speakers, elo = make_tab(random.Random(2))
+    table = pickle.loads(pickle.dumps(registry.PointsTable.from_speaker_points(speakers)))
+    reg = pickle.loads(pickle.dumps(registry.DebaterRegistry(elo)))
+    assert table['spk3_1'] == speakers['spk3_1'] and reg == elo
@@ -0,0 +1,74 @@
+import sys
+import types
+pyperclip = types.SimpleNamespace(paste=lambda: "", copy=lambda x: None)
+sys.modules.setdefault("pyperclip", pyperclip)
+cyr=types.SimpleNamespace(to_latin=lambda s,lang:s)
+service_mod=types.ModuleType("service")
+service_mod.Service=object
+wcm_mod=types.ModuleType("wcm")
+wcm_mod.ChromeDriverManager=object
+webdriver_mod=types.ModuleType("webdriver")
+webdriver_mod.Chrome=lambda *a,**k: None
+sys.modules.setdefault("cyrtranslit", cyr)
+sys.modules.setdefault("selenium", types.ModuleType("selenium"))
+sys.modules.setdefault("selenium.webdriver", webdriver_mod)
+sys.modules.setdefault("selenium.webdriver.chrome", types.ModuleType("chrome"))
+sys.modules.setdefault("selenium.webdriver.chrome.service", service_mod)
+sys.modules.setdefault("webdriver_manager.chrome", wcm_mod)
+sys.modules.pop('csvio', None) # Ensure real csvio module is loaded
+import os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import pytest
+import csvio
+import main
+import sweep
+import tabgen
+import tabrounds
+from eloparams import DEFAULT_PARAMS
+
+
+@pytest.fixture(scope='module')
+def season(tmp_path_factory):
+    out_dir = tmp_path_factory.mktemp('season')
+    manifest = tabgen.generate_season(str(out_dir), no_of_tournaments=4, no_of_debaters=80, no_of_teams=16, no_of_rounds=3, seed=3)
+    return sweep.load_season(manifest)
+
+
+def test_load_season(season):
+    assert len(season) == 4
+    assert all(len(tournament.rounds) == 3 and tournament.numbers == [1, 2, 3] and len(tournament.names) == 32 for tournament in season)
+    assert len(season[0].rounds[0]) == 4*6*4 # 4 rooms, 6 pairs of teams in each, 4 pairs of debaters for every pair of teams
+
+
+def test_replay_uses_tab_round_numbers(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'csvio', csvio)
+    tabgen.generate_tournament(str(tmp_path), no_of_teams=8, no_of_rounds=3, seed=5)
+    rounds = [tabrounds.TabRound(2, 'Round 2'), tabrounds.TabRound(3, 'Round 3')] # Rounds file without round 1, as livewatch writes it
+    (tmp_path / tabrounds.ROUNDS_FILE).write_text(tabrounds.rounds_text(rounds), encoding='utf-8')
+    tournament = sweep.prepare_tournament(str(tmp_path), None)
+    assert tournament.numbers == [2, 3]
+    assert sweep.replay(DEFAULT_PARAMS, [tournament])['ratings'] == main.rate_tournament({}, str(tmp_path), None)
+
+def test_replay_scores(season):
+    result = sweep.replay(DEFAULT_PARAMS, season)
+    assert result['pairs'] > 0 and 0 <= result['accuracy'] <= 1 and result['brier'] > 0
+    assert sweep.replay(DEFAULT_PARAMS, season, min_debates=10**6)['pairs'] == 0
+    assert len(result['ratings']) <= 80
+
+
+def test_sweep_in_parallel(season):
+    configs = sweep.param_grid(base_k=[20, 30], speaker_scale=[5, 10])
+    assert len(configs) == 4 and configs[3] == DEFAULT_PARAMS
+    parallel = sweep.run_sweep(season, configs, workers=2)
+    sequential = sweep.run_sweep(season, configs, workers=1)
+    assert parallel == sequential
+    assert [result['params'] for result in parallel] == configs
+    assert parallel[0]['log_loss'] != parallel[3]['log_loss']
+    lines = sweep.format_results(parallel)
+    assert len(lines) == 5 and any(line.endswith('defaults') for line in lines)
+
+
+def test_url_must_be_cached(tmp_path):
+    manifest = tmp_path / 'season.tsv'
+    manifest.write_text('https://t.calicotab.com/t1/\t5\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        sweep.load_season(str(manifest))
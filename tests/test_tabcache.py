@@ -0,0 +1,49 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import tabcache
+
+
+def test_put_and_get(tmp_path):
+    cache = tabcache.TabCache(str(tmp_path))
+    digest = cache.put('https://t.calicotab.com/t1/', 'speakers.csv', 'spk')
+    assert cache.get('https://t.calicotab.com/t1', 'speakers.csv') == 'spk'
+    assert cache.get('https://t.calicotab.com/t1', 'teams_ranks_round_1.csv') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert os.path.exists(cache.object_path(digest))
+    reloaded = tabcache.TabCache(str(tmp_path))
+    entry = reloaded.manifest[tabcache.TabCache.key('https://t.calicotab.com/t1', 'speakers.csv')]
+    assert entry['hash'] == digest and entry['size'] == 3
+
+
+def test_same_content_stored_once(tmp_path):
+    cache = tabcache.TabCache(str(tmp_path))
+    cache.put_tournament('u1', {'teams_ranks_round_1.csv': 'same', 'teams_ranks_round_2.csv': 'same'})
+    objects = [f for _, _, files in os.walk(tmp_path / 'objects') for f in files]
+    assert len(objects) == 1
+
+
+def test_get_tournament_partial(tmp_path):
+    cache = tabcache.TabCache(str(tmp_path))
+    cache.put_tournament('u1', {'speakers.csv': 'a', 'teams_ranks_round_1.csv': 'b'})
+    assert cache.get_tournament('u1', ['speakers.csv', 'teams_ranks_round_1.csv']) == {'speakers.csv': 'a', 'teams_ranks_round_1.csv': 'b'}
+    assert cache.get_tournament('u1', ['speakers.csv', 'teams_debates_round_1.csv']) is None
+
+
+def test_evict_by_age(tmp_path):
+    cache = tabcache.TabCache(str(tmp_path))
+    cache.put('old', 'speakers.csv', 'old content')
+    cache.put('new', 'speakers.csv', 'new content')
+    cache.manifest[cache.key('old', 'speakers.csv')]['fetched_at'] -= 3600
+    assert cache.evict(max_age=60) == 1
+    assert cache.get('old', 'speakers.csv') is None
+    assert cache.get('new', 'speakers.csv') == 'new content'
+    objects = [f for _, _, files in os.walk(tmp_path / 'objects') for f in files]
+    assert len(objects) == 1
+
+
+def test_evict_by_size(tmp_path):
+    cache = tabcache.TabCache(str(tmp_path))
+    for i in range(5):
+        cache.put(f'u{i}', 'speakers.csv', 'x'*100 + str(i))
+        cache.manifest[cache.key(f'u{i}', 'speakers.csv')]['fetched_at'] = i
+    assert cache.evict(max_bytes=250) == 3
+    assert sorted(key.split('|')[0] for key in cache.manifest) == ['u3', 'u4']
@@ -0,0 +1,48 @@
+import sys
+import types
+cyr=types.SimpleNamespace(to_latin=lambda s,lang:s)
+sys.modules.setdefault("cyrtranslit", cyr)
+sys.modules.pop('csvio', None) # Ensure real csvio module is loaded
+import os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import csvio
+import tabgen
+
+
+def test_generated_tab_loads_with_csvio(tmp_path):
+    info = tabgen.generate_tournament(str(tmp_path), no_of_teams=10, no_of_rounds=3, seed=4)
+    assert info['debaters'] == 20 and info['swing_teams'] == 2 and info['debates'] == 9
+    tab = csvio.load_speaker_tab(str(tmp_path / 'speakers.csv'), no_of_rounds=3)
+    assert len(set(tab.names)) == 20 and all(len(points) == 3 for points in tab.points)
+    teams = set(tab.teams)
+    assert len(teams) == 10
+    for round_no in range(1, 4):
+        debates = csvio.load_debates(str(tmp_path / f'teams_debates_round_{round_no}.csv'))
+        ranks = csvio.load_team_ranks(str(tmp_path / f'teams_ranks_round_{round_no}.csv'))
+        assert len(debates) == 3 and all(len(debate) == 4 for debate in debates)
+        assert set().union(*debates) - teams == {'Swing 1', 'Swing 2'} # Swings aren't on the speaker tab
+        for debate in debates:
+            assert sorted(ranks[team] for team in debate) == [1, 2, 3, 4]
+
+
+def test_same_seed_same_tournament(tmp_path):
+    tabgen.generate_tournament(str(tmp_path / 'a'), no_of_teams=8, no_of_rounds=2, seed=1)
+    tabgen.generate_tournament(str(tmp_path / 'b'), no_of_teams=8, no_of_rounds=2, seed=1)
+    for name in os.listdir(tmp_path / 'a'):
+        assert (tmp_path / 'a' / name).read_text(encoding='utf-8') == (tmp_path / 'b' / name).read_text(encoding='utf-8')
+
+
+def test_pool_and_cyrillic():
+    assert tabgen.to_cyrillic('Ljiljana Đurić') == 'Љиљана Ђурић'
+    pool = tabgen.make_pool(5000, cyrillic_share=0.5, seed=2)
+    assert len(pool) == 5000 and len({name.lower() for name in pool}) == 5000
+    assert 1500 < sum(1 for name in pool if name[0] in 'АБВГДЂЕЖЗИЈКЛЉМНЊОПРСТЋУФХЦЧЏШ') < 3500
+
+
+def test_generate_season(tmp_path):
+    manifest = tabgen.generate_season(str(tmp_path), no_of_tournaments=3, no_of_debaters=50, no_of_teams=8, no_of_rounds=2)
+    lines = open(manifest, encoding='utf-8').read().splitlines()
+    assert [line.split('\t')[1] for line in lines] == ['2', '2', '2']
+    names = set()
+    for line in lines:
+        names.update(csvio.load_speaker_tab(os.path.join(line.split('\t')[0], 'speakers.csv')).names)
+    assert len(names) <= 50 # Debaters come from the same pool
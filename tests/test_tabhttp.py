@@ -0,0 +1,113 @@
+import sys
+import types
+cyr=types.SimpleNamespace(to_latin=lambda s,lang:s)
+sys.modules.setdefault("cyrtranslit", cyr)
+sys.modules.pop('csvio', None) # Ensure real csvio module is loaded
+import os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+import tabhttp
+import tabrounds
+import csvio
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'tabbycat')
+PAGES = {
+    '/prva2025/tab/speaker/': 'speaker_tab.html',
+    '/prva2025/results/round/1/?view=team': 'round_1_team.html',
+    '/prva2025/results/round/1/?view=debate': 'round_1_debate.html',
+    '/prva2025/results/round/2/?view=team': 'round_2_team.html',
+    '/prva2025/results/round/2/?view=debate': 'round_2_debate.html',
+}
+OUTROUND_PAGES = { # Results page, where rounds are found, and an outround
+    '/prva2025/results/': 'results_index.html',
+    '/prva2025/results/round/3/?view=team': 'round_3_team.html',
+    '/prva2025/results/round/3/?view=debate': 'round_3_debate.html',
+}
+
+
+class TabbycatHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # keep-alive, like a real server
+    requests = []
+
+    def do_GET(self):
+        TabbycatHandler.requests.append(self.path)
+        page = PAGES.get(self.path, OUTROUND_PAGES.get(self.path))
+        if page is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        with open(os.path.join(FIXTURES, page), 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def tab_server():
+    TabbycatHandler.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), TabbycatHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/prva2025/'
+    server.shutdown()
+    server.server_close()
+
+
+def test_extract_tables():
+    page = '<script>window.vueData = { tablesData: [{"head": [], "data": []}], other: 1 }</script>'
+    assert tabhttp.extract_tables(page) == [{'head': [], 'data': []}]
+    with pytest.raises(ValueError):
+        tabhttp.extract_tables('<html></html>')
+
+
+def test_table_to_text():
+    table = {'head': [{'key': 'rank', 'tooltip': 'Rank'}, {'key': 'name', 'title': 'Name'}],
+             'data': [[{'text': '1', 'sort': 1}, {'text': '<span>Ana &amp;\tAnić</span>'}]]}
+    assert tabhttp.table_to_text(table) == 'Rank\tName\n1\tAna & Anić\n'
+
+
+def test_fetch_whole_tournament(tab_server):
+    files = tabhttp.fetch_whole_tournament(tab_server, br_rundi=2, workers=3)
+    assert sorted(files) == ['speakers.csv', 'teams_debates_round_1.csv', 'teams_debates_round_2.csv',
+                             'teams_ranks_round_1.csv', 'teams_ranks_round_2.csv']
+    assert files['speakers.csv'].splitlines()[0] == 'Rank\tName\tInstitution\tTeam\tR1\tR2\tAvg\tStdev'
+    assert sorted(TabbycatHandler.requests) == sorted(PAGES)
+
+
+def test_download_loads_with_csvio(tab_server, tmp_path):
+    tabhttp.download_whole_tournament(tab_server, br_rundi=2, out_dir=str(tmp_path))
+    speakers = csvio.uvezi_spikere(str(tmp_path / 'speakers.csv'), no_of_rounds=2)
+    assert speakers['ana anic'] == ('Alfa', [73, 74], 73.5)
+    ranks = csvio.load_team_ranks(str(tmp_path / 'teams_ranks_round_2.csv'))
+    assert ranks == {'Alfa': 4, 'Beta': 3, 'Gama': 2, 'Delta': 1}
+    debates = csvio.load_debates(str(tmp_path / 'teams_debates_round_1.csv'))
+    assert debates == [{'Alfa', 'Beta', 'Gama', 'Delta'}]
+
+
+def test_fetch_finds_rounds(tab_server, tmp_path):
+    files = list(tabhttp.iter_whole_tournament(tab_server, br_rundi=None, outrounds=['open']))
+    assert [name for name, _ in files[:2]] == [tabrounds.ROUNDS_FILE, 'speakers.csv']
+    assert tabrounds.parse_rounds(files[0][1]) == [tabrounds.TabRound(1, 'Round 1'), tabrounds.TabRound(2, 'Round 2'),
+                                                   tabrounds.TabRound(3, 'Open Semifinals', 'semifinal', 'Open')]
+    assert dict(files)['teams_ranks_round_3.csv'].splitlines()[1] == 'Alfa\teliminated\tSala 1'
+    TabbycatHandler.requests = []
+    tabhttp.download_whole_tournament(tab_server, br_rundi=None, out_dir=str(tmp_path)) # Inrounds only, all of them
+    assert sorted(os.listdir(tmp_path)) == [tabrounds.ROUNDS_FILE, 'speakers.csv', 'teams_debates_round_1.csv', 'teams_debates_round_2.csv',
+                                           'teams_ranks_round_1.csv', 'teams_ranks_round_2.csv']
+    assert '/prva2025/results/round/3/?view=team' not in TabbycatHandler.requests
+    assert sorted(TabbycatHandler.requests) == sorted(list(PAGES) + ['/prva2025/results/'])
+
+
+def test_missing_page(tab_server):
+    session = tabhttp.HttpSession()
+    with pytest.raises(ConnectionError):
+        tabhttp.load_teams_ranks_text(session, tab_server.rstrip('/'), '4')
+    session.close()
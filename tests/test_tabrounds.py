@@ -0,0 +1,136 @@
+import sys
+import types
+pyperclip = types.SimpleNamespace(paste=lambda: "", copy=lambda x: None)
+sys.modules.setdefault("pyperclip", pyperclip)
+cyr=types.SimpleNamespace(to_latin=lambda s,lang:s)
+service_mod=types.ModuleType("service")
+service_mod.Service=object
+wcm_mod=types.ModuleType("wcm")
+wcm_mod.ChromeDriverManager=object
+webdriver_mod=types.ModuleType("webdriver")
+webdriver_mod.Chrome=lambda *a,**k: None
+sys.modules.setdefault("cyrtranslit", cyr)
+sys.modules.setdefault("selenium", types.ModuleType("selenium"))
+sys.modules.setdefault("selenium.webdriver", webdriver_mod)
+sys.modules.setdefault("selenium.webdriver.chrome", types.ModuleType("chrome"))
+sys.modules.setdefault("selenium.webdriver.chrome.service", service_mod)
+sys.modules.setdefault("webdriver_manager.chrome", wcm_mod)
+sys.modules.pop('csvio', None) # Ensure real csvio module is loaded
+import os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import pytest
+import csvio
+import main
+import tabcache
+import tabgen
+import tabrounds
+from eloparams import DEFAULT_PARAMS
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'tabbycat')
+
+
+def write_outround(tab_dir, number, name, results):
+    '''Adds an outround of one debate to a generated tab, results are (team, result) in the order of the sides.'''
+    with open(os.path.join(tab_dir, f'teams_ranks_round_{number}.csv'), 'w', encoding='utf-8') as f:
+        f.write('Team\tResult\tVenue\n' + ''.join(f'{team}\t{result}\tSala 1\n' for team, result in results))
+    with open(os.path.join(tab_dir, f'teams_debates_round_{number}.csv'), 'w', encoding='utf-8') as f:
+        f.write('Venue\tOG\tOO\tCG\tCO\nSala 1\t' + '\t'.join(team for team, _ in results) + '\n')
+
+
+def test_round_stage():
+    assert tabrounds.round_stage('Round 3') == ('inround', '')
+    assert tabrounds.round_stage('Open Quarterfinals') == ('break', 'Open')
+    assert tabrounds.round_stage('ESL Semi-Finals') == ('semifinal', 'ESL')
+    assert tabrounds.round_stage('Novice Grand Final') == ('final', 'Novice')
+    assert tabrounds.round_stage('Grand Final') == ('final', '')
+
+
+@pytest.mark.parametrize('name, category', [
+    ('Open Octofinals', 'Open'),
+    ('Open Double-Octofinals', 'Open'),
+    ('ESL Double Octofinals', 'ESL'),
+    ('ESL Triple-Octofinals', 'ESL'),
+    ('Open Partial Octofinals', 'Open'),
+    ('Open Partial Double-Octofinals', 'Open'),
+    ('Partial Double-Octofinals', ''),
+    ('Triple-Octofinals', ''),
+])
+def test_round_stage_octofinals(name, category):
+    assert tabrounds.round_stage(name) == ('break', category)
+    rounds = [tabrounds.TabRound(5, name, *tabrounds.round_stage(name))]
+    assert tabrounds.select_rounds(rounds, None, [category] if category else True) == rounds
+
+
+def test_rounds_from_index_and_file():
+    with open(os.path.join(FIXTURES, 'results_index.html'), encoding='utf-8') as f:
+        rounds = tabrounds.rounds_from_index(f.read())
+    assert rounds == [tabrounds.TabRound(1, 'Round 1'), tabrounds.TabRound(2, 'Round 2'),
+                      tabrounds.TabRound(3, 'Open Semifinals', 'semifinal', 'Open')]
+    assert tabrounds.parse_rounds(tabrounds.rounds_text(rounds)) == rounds
+    assert tabrounds.parse_rounds('Round\tName\n7\tESL Final\n') == [tabrounds.TabRound(7, 'ESL Final', 'final', 'ESL')]
+    with pytest.raises(ValueError):
+        tabrounds.parse_rounds('Round\tName\tStage\n1\tRound 1\tplayoff\n')
+
+
+def test_select_rounds():
+    rounds = [tabrounds.TabRound(1, 'Round 1'), tabrounds.TabRound(2, 'Round 2'), tabrounds.TabRound(3, 'Open Semifinals', 'semifinal', 'Open'),
+              tabrounds.TabRound(4, 'ESL Final', 'final', 'ESL'), tabrounds.TabRound(5, 'Open Final', 'final', 'Open')]
+    numbers = lambda *args: [tab_round.number for tab_round in tabrounds.select_rounds(rounds, *args)]
+    assert numbers() == [1, 2]
+    assert numbers(1) == [1]
+    assert numbers(None, []) == numbers(None, True) == [1, 2, 3, 4, 5]
+    assert numbers(2, ['open']) == [1, 2, 3, 5]
+
+
+def test_iter_rounds_is_lazy(tmp_path):
+    tabgen.generate_tournament(str(tmp_path), no_of_teams=8, no_of_rounds=3, seed=3)
+    assert [tab_round.number for tab_round in tabrounds.iter_rounds(str(tmp_path / 'missing'), 2)] == [1, 2] # Tab isn't looked at
+    assert [tab_round.number for tab_round in tabrounds.iter_rounds(str(tmp_path))] == [1, 2, 3] # Rounds whose files are there
+    rounds = [tabrounds.TabRound(1, 'Round 1'), tabrounds.TabRound(2, 'Round 2'), tabrounds.TabRound(3, 'Round 3'),
+              tabrounds.TabRound(4, 'Grand Final', 'final')]
+    (tmp_path / tabrounds.ROUNDS_FILE).write_text(tabrounds.rounds_text(rounds), encoding='utf-8')
+    waited = []
+    rounds_iter = tabrounds.iter_rounds(str(tmp_path), None, True, waited.append)
+    assert waited == [] # Nothing is read before the first round is taken
+    assert next(rounds_iter).number == 1 and waited == [tabrounds.ROUNDS_FILE]
+    assert [tab_round.number for tab_round in rounds_iter] == [2, 3, 4]
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_rate_outrounds(tmp_path, monkeypatch, backend):
+    monkeypatch.setattr(main, 'csvio', csvio)
+    tabgen.generate_tournament(str(tmp_path), no_of_teams=8, no_of_rounds=2, seed=4)
+    teams = list(dict.fromkeys(csvio.load_speaker_tab(str(tmp_path / 'speakers.csv')).teams))
+    write_outround(str(tmp_path), 3, 'Semifinals', [(teams[0], 'advancing'), (teams[1], 'eliminated'), (teams[2], 'advancing'), (teams[3], 'eliminated')])
+    write_outround(str(tmp_path), 4, 'Grand Final', [(teams[0], '1st'), (teams[2], '2nd'), (teams[4], '3rd'), (teams[5], '4th')])
+    rounds = tabrounds.numbered_rounds(2) + [tabrounds.TabRound(3, 'Semifinals', 'semifinal'), tabrounds.TabRound(4, 'Grand Final', 'final')]
+    (tmp_path / tabrounds.ROUNDS_FILE).write_text(tabrounds.rounds_text(rounds), encoding='utf-8')
+
+    inrounds = main.rate_tournament({}, str(tmp_path), None, backend=backend)
+    assert inrounds == main.rate_tournament({}, str(tmp_path), 2, backend=backend) # All inrounds by default
+    events = {}
+    weights = {'default': DEFAULT_PARAMS, 'weighted': DEFAULT_PARAMS.replace(round_weights=(('semifinal', 2.0), ('final', 0.0)))}
+    for key, params in weights.items():
+        events[key] = []
+        rated = main.rate_tournament({}, str(tmp_path), None, backend=backend, events=events[key], params=params, outrounds=True)
+        assert rated != inrounds and len(rated) == len(inrounds)
+    advancing = [name for name, data in csvio.uvezi_spikere(str(tmp_path / 'speakers.csv')).items() if data[0] in (teams[0], teams[2])]
+    semifinal = {key: {event[0]: event[3]-event[2] for event in round_events if event[1] == 3} for key, round_events in events.items()}
+    assert all(semifinal['default'][name] > 0 for name in advancing) # Advancing teams didn't play against each other
+    assert all(semifinal['weighted'][name] == pytest.approx(2*semifinal['default'][name]) for name in advancing)
+    assert all(event[2] == event[3] for event in events['weighted'] if event[1] == 4) # Final with weight 0 changes nothing
+    assert any(event[2] != event[3] for event in events['default'] if event[1] == 4)
+
+
+def test_manifest_rounds_and_cache(tmp_path):
+    manifest = tmp_path / 'season.tsv'
+    manifest.write_text('tabs/t1\nhttps://t/\t5\nhttps://u/\t\t2025-03-01\n', encoding='utf-8')
+    assert main.load_manifest(str(manifest)) == [('tabs/t1', None, None), ('https://t/', 5, None), ('https://u/', None, '2025-03-01')]
+    cache = tabcache.TabCache(str(tmp_path / 'cache'))
+    rounds = [tabrounds.TabRound(1, 'Round 1'), tabrounds.TabRound(2, 'Open Final', 'final', 'Open'), tabrounds.TabRound(3, 'ESL Final', 'final', 'ESL')]
+    files = {tabrounds.ROUNDS_FILE: tabrounds.rounds_text(rounds), 'speakers.csv': 'spk', 'teams_ranks_round_1.csv': 'r1',
+             'teams_debates_round_1.csv': 'd1', 'teams_ranks_round_2.csv': 'r2', 'teams_debates_round_2.csv': 'd2'}
+    cache.put_tournament('https://t/', files)
+    assert list(main.cached_tab(cache, 'https://t/', 1)) == ['speakers.csv', 'teams_ranks_round_1.csv', 'teams_debates_round_1.csv']
+    assert main.cached_tab(cache, 'https://t/', None) == {name: files[name] for name in list(files)[:4]}
+    assert main.cached_tab(cache, 'https://t/', None, ['open']) == files
+    assert main.cached_tab(cache, 'https://t/', None, []) is None # ESL final isn't cached
@@ -68,3 +68,164 @@ def test_download_whole_tournament(monkeypatch):
     monkeypatch.setattr(webio, 'export_file', lambda n,c: exports.append((n,c)))
     webio.download_whole_tournament('url', br_rundi=1)
     assert ('tournament_files/speakers.csv', 'spk') in exports
+
+
+def test_wait_for_element_retries():
+    driver = MagicMock()
+    element = object()
+    driver.find_element.side_effect = [Exception('loading'), Exception('loading'), element]
+    assert webio.wait_for_element(driver, '//button', timeout=5, poll=0) is element
+    assert driver.find_element.call_count == 3
+
+
+def test_wait_for_element_timeout():
+    driver = MagicMock()
+    driver.find_element.side_effect = Exception('missing')
+    import pytest
+    with pytest.raises(TimeoutError):
+        webio.wait_for_element(driver, '//button', timeout=0.05, poll=0.01)
+
+
+def test_fetch_whole_tournament_parallel(monkeypatch):
+    import threading
+    import time
+    drivers = []
+    def make_driver():
+        driver = MagicMock()
+        drivers.append(driver)
+        return driver
+    monkeypatch.setattr(webio, 'webdriver', MagicMock(Chrome=make_driver))
+    busy = set()
+    lock = threading.Lock()
+    def loader(d, u, r='spk'):
+        with lock:
+            assert d not in busy # one page at a time per browser
+            busy.add(d)
+        time.sleep(0.01)
+        with lock:
+            busy.discard(d)
+        return f'{u}:{r}'
+    monkeypatch.setattr(webio, 'load_speakers_text', loader)
+    monkeypatch.setattr(webio, 'load_teams_ranks_text', loader)
+    monkeypatch.setattr(webio, 'load_teams_debates_text', loader)
+    result = webio.fetch_whole_tournament('http://t/', br_rundi=3, workers=2)
+    assert len(drivers) == 2
+    assert all(d.quit.called for d in drivers)
+    assert result['speakers.csv'] == 'http://t:spk'
+    assert result['teams_ranks_round_3.csv'] == 'http://t:3'
+    assert len(result) == 7
+
+
+def test_fetch_finds_rounds_with_first_browser(monkeypatch):
+    drivers = []
+    def make_driver():
+        driver = MagicMock()
+        with open(os.path.join(os.path.dirname(__file__), 'fixtures', 'tabbycat', 'results_index.html'), encoding='utf-8') as f:
+            driver.page_source = f.read()
+        drivers.append(driver)
+        return driver
+    monkeypatch.setattr(webio, 'webdriver', MagicMock(Chrome=make_driver))
+    monkeypatch.setattr(webio, 'load_speakers_text', lambda d, u: 'spk')
+    monkeypatch.setattr(webio, 'load_teams_ranks_text', lambda d, u, r: f'rank {r}')
+    monkeypatch.setattr(webio, 'load_teams_debates_text', lambda d, u, r: f'deb {r}')
+    files = list(webio.iter_whole_tournament('http://t/', br_rundi=1, workers=2, outrounds=[]))
+    drivers[0].get.assert_any_call('http://t/results/')
+    assert len(drivers) == 2 and all(d.quit.called for d in drivers)
+    assert [name for name, _ in files] == ['rounds.csv', 'speakers.csv', 'teams_ranks_round_1.csv', 'teams_debates_round_1.csv',
+                                           'teams_ranks_round_3.csv', 'teams_debates_round_3.csv']
+    assert files[-1][1] == 'deb 3'
+
+
+def tab_page(csv_text, teams_link=None):
+    '''XHTML page with the CSV button and the teams view link where webio looks for them,
+    the button keeps the text it copies in data-csv, as a stand-in for the table Tabbycat copies.'''
+    from xml.sax.saxutils import quoteattr
+    link = f'<a href="?view=debate">Debates</a><a href={quoteattr(teams_link)}>Teams</a>' if teams_link else ''
+    return ('<html><body><div><div>Tab</div>'
+            f'<div><div><div><div>{link}</div></div></div></div><div>Menu</div>'
+            f'<div><div><div><div><div><div><div>Title</div><div><button data-csv={quoteattr(csv_text)}>CSV</button></div></div></div>'
+            '</div></div></div></div></div></body></html>')
+
+
+class FakeBrowser:
+    '''Browser over real HTTP: loads pages from the server, finds elements by the absolute xpaths webio uses,
+    follows links when they are clicked and copies data-csv of a clicked button to the clipboard.
+    Every page is still loading (no elements) for the first `loading` lookups after it is opened.'''
+    def __init__(self, clipboard, loading=2):
+        self.clipboard = clipboard
+        self.loading = loading
+        self.current_url = None
+        self.root = None
+
+    def get(self, url):
+        import urllib.request
+        import xml.etree.ElementTree as ET
+        with urllib.request.urlopen(url) as response:
+            self.root = ET.fromstring(response.read())
+        self.current_url = url
+        self.pending = self.loading
+
+    def find_element(self, by, xpath):
+        assert by == 'xpath' and xpath.startswith('/html/')
+        if self.pending:
+            self.pending -= 1
+            raise Exception('NoSuchElementException: page is loading')
+        element = self.root.find('./' + xpath[len('/html/'):])
+        if element is None:
+            raise Exception(f'NoSuchElementException: {xpath}')
+        return FakeElement(self, element)
+
+
+class FakeElement:
+    def __init__(self, browser, element):
+        self.browser = browser
+        self.element = element
+
+    def click(self):
+        from urllib.parse import urljoin
+        if self.element.tag == 'a':
+            self.browser.get(urljoin(self.browser.current_url, self.element.get('href')))
+        else:
+            self.browser.clipboard.copy(self.element.get('data-csv'))
+
+
+def test_loaders_over_served_pages(monkeypatch):
+    import threading
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    pages = {
+        '/t/tab/speaker/': tab_page('Name\tTeam\nAna\tA\n'),
+        '/t/results/round/1/?view=team': tab_page('Team\tResult\nA\t1st\n'),
+        '/t/results/round/1/?view=debate': tab_page('Adjudicators\nMarko\n', teams_link='?view=debate&teams=1'),
+        '/t/results/round/1/?view=debate&teams=1': tab_page('OG\tOO\tCG\tCO\nA\tB\tC\tD\n'),
+    }
+    requests = []
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            body = pages[self.path].encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/xhtml+xml; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        def log_message(self, *args):
+            pass
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    clipboard = types.SimpleNamespace(text='')
+    clipboard.copy = lambda text: setattr(clipboard, 'text', text)
+    clipboard.paste = lambda: clipboard.text
+    monkeypatch.setattr(webio, 'pyperclip', clipboard)
+    monkeypatch.setattr(webio, 'wait_for_element', lambda d, x, timeout=5, poll=0.001, wait=webio.wait_for_element: wait(d, x, timeout, poll))
+    url = f'http://127.0.0.1:{server.server_address[1]}/t'
+    browser = FakeBrowser(clipboard)
+    try:
+        assert webio.load_speakers_text(browser, url) == 'Name\tTeam\nAna\tA\n'
+        assert webio.load_teams_ranks_text(browser, url, '1') == 'Team\tResult\nA\t1st\n'
+        assert webio.load_teams_debates_text(browser, url, '1') == 'OG\tOO\tCG\tCO\nA\tB\tC\tD\n'
+    finally:
+        server.shutdown()
+        server.server_close()
+    # Debates page is loaded once, then the teams view is opened from it
+    assert requests == ['/t/tab/speaker/', '/t/results/round/1/?view=team', '/t/results/round/1/?view=debate',
+                        '/t/results/round/1/?view=debate&teams=1']
@@ -1,8 +1,45 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
+from concurrent.futures import ThreadPoolExecutor # Za paralelno preuzimanje rundi
+import queue
+import threading
 import time
+from typing import Iterator
 import pyperclip
+import tabrounds
+
+CSV_BUTTON = "/html/body/div[1]/div[4]/div/div/div/div[1]/div/div[2]/button"
+TEAMS_VIEW_BUTTON = '/html/body/div[1]/div[2]/div/div/div/a[2]'
+
+# All browsers share one system clipboard, so clicking the CSV button and pasting must not overlap between workers
+clipboard_lock = threading.Lock()
+
+def wait_for_element(driver, xpath:str, timeout:float=30, poll:float=0.25):
+    '''Waits until the element is on the page and returns it, instead of sleeping for a fixed time.
+    Inputs:
+    driver: Selenium driver object
+    xpath: xpath of the element
+    timeout: seconds after which TimeoutError is raised
+    poll: seconds between two checks'''
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            element = driver.find_element("xpath", xpath)
+            if element is not None:
+                return element
+        except Exception: # Selenium raises NoSuchElementException while the page is still loading
+            pass
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f'Element {xpath} did not appear on {driver.current_url} in {timeout} seconds')
+        time.sleep(poll)
+
+def copy_csv(driver)->str:
+    '''Clicks the CSV button on the current page and returns copied text.'''
+    csvbutton = wait_for_element(driver, CSV_BUTTON)
+    with clipboard_lock:
+        csvbutton.click()
+        return pyperclip.paste()
 
 def load_speakers_text(driver,url:str)->str:
     '''Function opens a tab with speakers and returns CSV text.
@@ -11,10 +48,7 @@ def load_speakers_text(driver,url:str)->str:
     URL: url of the tournament
     Output: copy-paste text of CSV'''
     driver.get(f'{url}/tab/speaker/')
-    time.sleep(10)
-    csvbutton = driver.find_element("xpath", "/html/body/div[1]/div[4]/div/div/div/div[1]/div/div[2]/button")
-    csvbutton.click()
-    return pyperclip.paste()
+    return copy_csv(driver)
 
 def load_teams_ranks_text(driver,url:str,round:str)->str:
     '''Opens a tab with team ranking for a given round and returns CSV text.
@@ -24,12 +58,7 @@ def load_teams_ranks_text(driver,url:str,round:str)->str:
     round: number of the round whose data function is getting
     Output: copy-paste text of CSV'''
     driver.get(f'{url}/results/round/{round}/?view=team')
-    time.sleep(5)
-    driver.get(f'{url}/results/round/{round}/?view=team')
-    time.sleep(5)
-    csvbutton = driver.find_element("xpath", "/html/body/div[1]/div[4]/div/div/div/div[1]/div/div[2]/button")
-    csvbutton.click()
-    return pyperclip.paste()
+    return copy_csv(driver)
 
 def load_teams_debates_text(driver,url:str,round:str)->str:
     '''Opens a tab with teams who debated together in a given round and returns a CSV text.
@@ -39,37 +68,82 @@ def load_teams_debates_text(driver,url:str,round:str)->str:
     round: number of the round whose data function is getting
     Output: copy-paste text of CSV'''
     driver.get(f'{url}/results/round/{round}/?view=debate')
-    time.sleep(5)
-    vidi_dugme = driver.find_element("xpath",'/html/body/div[1]/div[2]/div/div/div/a[2]')
-    vidi_dugme.click()
-    time.sleep(5)
-    driver.get(f'{url}/results/round/{round}/?view=debate')
-    time.sleep(5)
-    csvbutton = driver.find_element("xpath", "/html/body/div[1]/div[4]/div/div/div/div[1]/div/div[2]/button")
-    csvbutton.click()
-    return pyperclip.paste()
+    vidi_dugme = wait_for_element(driver, TEAMS_VIEW_BUTTON)
+    vidi_dugme.click() # Opens the view with teams, the page isn't loaded again, copy_csv waits for its CSV button
+    return copy_csv(driver)
 
 def export_file(file_name:str, content:str):
     '''Funkcija za izvoz podataka u csv fajl.'''
     with open(file_name, 'w', encoding='utf-8') as f:
         f.write(content)
 
-def download_whole_tournament(url:str,br_rundi:int=5):
-    '''Skida podatke sa celog turnira u formati koji Tabbycat daje kada se klikne na CSV dugme.
-    Prikupljene podatke zapisuje u CSV fajlove.'''
-    driver = webdriver.Chrome()
-    teams_ranks = []
-    teams_debates = []
+def find_rounds(driver,url:str)->list[tabrounds.TabRound]:
+    '''Opens the results page of the tab and finds rounds whose results are released, see tabrounds.rounds_from_index.'''
+    driver.get(f'{url}/results/')
+    return tabrounds.rounds_from_index(driver.page_source)
+
+def iter_whole_tournament(url:str,br_rundi:int=5,workers:int=3,outrounds=None)->Iterator[tuple[str,str]]:
+    '''Skida podatke sa celog turnira u formatu koji Tabbycat daje kada se klikne na CSV dugme.
+    Speaker tab and every round's pages are fetched in parallel by a pool of browsers, and given back in order
+    as soon as they are fetched: speakers.csv first, then teams_ranks_round_N.csv and teams_debates_round_N.csv of every round,
+    so rating of a round can start before the next rounds are downloaded.
+    If the rounds are looked up (see tabrounds.discovered), the first browser finds them on the results page
+    and tabrounds.ROUNDS_FILE with all rounds of the tab is given before speakers.csv.
+    Inputs:
+    url: url of the tournament
+    br_rundi: number of the inrounds, None for all inrounds of the tab
+    workers: number of browsers working at the same time
+    outrounds: None for no outrounds, otherwise which outrounds are downloaded, see tabrounds.wanted
+    Output: generator of tuples (file name, CSV text)'''
     if url.endswith('/'):
         url = url[:-1] # So the program works whether the URL ends with slash or not
 
-    speakers = load_speakers_text(driver,url)
-    for i in range(1, br_rundi+1):
-        teams_ranks = load_teams_ranks_text(driver,url,str(i))
-        teams_debates = load_teams_debates_text(driver,url,str(i))  # Učitajte debate za prvu rundu, možete promeniti round po potrebi
-        export_file(f'tournament_files/teams_ranks_round_{i}.csv', teams_ranks)
-        export_file(f'tournament_files/teams_debates_round_{i}.csv', teams_debates)
-    export_file('tournament_files/speakers.csv', speakers)
-    
+    drivers = queue.Queue()
+    all_drivers = []
+    try:
+        if tabrounds.discovered(br_rundi, outrounds):
+            driver = webdriver.Chrome()
+            all_drivers.append(driver)
+            drivers.put(driver)
+            rounds = find_rounds(driver, url)
+            yield tabrounds.ROUNDS_FILE, tabrounds.rounds_text(rounds) # All rounds, the selection is made when the tab is rated
+            rounds = tabrounds.select_rounds(rounds, br_rundi, outrounds)
+        else:
+            rounds = tabrounds.numbered_rounds(br_rundi)
+        jobs = [('speakers.csv', load_speakers_text, ())]
+        for tab_round in rounds:
+            ranks_file, debates_file = tab_round.file_names()
+            jobs.append((ranks_file, load_teams_ranks_text, (str(tab_round.number),)))
+            jobs.append((debates_file, load_teams_debates_text, (str(tab_round.number),)))
+
+        workers = max(1, min(workers, len(jobs)))
+        for _ in range(len(all_drivers), workers):
+            driver = webdriver.Chrome()
+            all_drivers.append(driver)
+            drivers.put(driver)
 
-    driver.quit()
\ No newline at end of file
+        def run(job):
+            file_name, loader, args = job
+            driver = drivers.get() # Every browser does one page at a time
+            try:
+                return file_name, loader(driver, url, *args)
+            finally:
+                drivers.put(driver)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(run, jobs) # In the order of jobs, whichever browser finishes first
+    finally:
+        for driver in all_drivers:
+            driver.quit()
+
+def fetch_whole_tournament(url:str,br_rundi:int=5,workers:int=3,outrounds=None)->dict[str,str]:
+    '''Skida podatke sa celog turnira, see iter_whole_tournament.
+    Output: dictionary whose keys are file names (speakers.csv, teams_ranks_round_1.csv...) and values are CSV texts'''
+    return dict(iter_whole_tournament(url,br_rundi,workers,outrounds))
+
+def download_whole_tournament(url:str,br_rundi:int=5,workers:int=3,out_dir:str='tournament_files',outrounds=None):
+    '''Skida podatke sa celog turnira u formati koji Tabbycat daje kada se klikne na CSV dugme.
+    Prikupljene podatke zapisuje u CSV fajlove u out_dir.
+    workers: number of browsers working at the same time'''
+    for file_name, content in fetch_whole_tournament(url,br_rundi,workers,outrounds).items():
+        export_file(f'{out_dir}/{file_name}', content)